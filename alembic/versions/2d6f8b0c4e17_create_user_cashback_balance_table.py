@@ -0,0 +1,42 @@
+"""create user cashback balance table
+
+Revision ID: 2d6f8b0c4e17
+Revises: 9e1c7a3b5d24
+Create Date: 2026-10-18 16:02:37.204518
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "2d6f8b0c4e17"
+down_revision = "9e1c7a3b5d24"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_cashback_balance",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("status_id", sa.Integer(), nullable=False),
+        sa.Column("cashback_value", sa.Numeric(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["status_id"], ["purchase_status.id"]),
+        sa.PrimaryKeyConstraint("user_id", "status_id"),
+    )
+    # backfill from the existing purchases
+    op.execute("""
+        INSERT INTO user_cashback_balance
+            (user_id, status_id, cashback_value)
+        SELECT user_id, status_id, SUM(cashback_value)
+        FROM purchase
+        WHERE user_id IS NOT NULL AND status_id IS NOT NULL
+        GROUP BY user_id, status_id
+        """)
+
+
+def downgrade():
+    op.drop_table("user_cashback_balance")
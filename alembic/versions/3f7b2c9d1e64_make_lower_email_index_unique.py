@@ -0,0 +1,69 @@
+"""make lower email index unique
+
+Revision ID: 3f7b2c9d1e64
+Revises: b8e4d1a6c3f9
+Create Date: 2026-10-19 09:12:33.481027
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3f7b2c9d1e64"
+down_revision = "b8e4d1a6c3f9"
+branch_labels = None
+depends_on = None
+
+
+def find_duplicated_emails():
+    # the ids of the users of each lowercased email used by more than one
+    result = op.get_bind().execute(sa.text("""
+        SELECT lower(email), id FROM "user"
+        WHERE lower(email) IN (
+            SELECT lower(email) FROM "user"
+            GROUP BY lower(email) HAVING count(*) > 1
+        )
+        ORDER BY lower(email), id
+        """))
+    duplicated = {}
+    for email, id in result:
+        duplicated.setdefault(email, []).append(id)
+    return duplicated
+
+
+def upgrade():
+    # the login is case insensitive, so the emails must be unique case
+    # insensitively too. The users that already share a lowercased email
+    # must be merged or have their email changed by hand before.
+    duplicated = find_duplicated_emails()
+    if duplicated:
+        conflicts = "; ".join(
+            f"{email}: users {', '.join(str(id) for id in ids)}"
+            for email, ids in duplicated.items()
+        )
+        raise RuntimeError(
+            "Can't make the emails unique case insensitively, as these "
+            f"users share an email (change them and retry): {conflicts}"
+        )
+    op.drop_index("ix_user_email_lower", table_name="user")
+    op.create_index(
+        "ix_user_email_lower",
+        "user",
+        [sa.text("lower(email)")],
+        unique=True,
+        postgresql_include=["id", "cpf", "hashed_password"],
+    )
+
+
+def downgrade():
+    # restores the non unique index of 8d41e0c7a2f3
+    op.drop_index("ix_user_email_lower", table_name="user")
+    op.create_index(
+        "ix_user_email_lower",
+        "user",
+        [sa.text("lower(email)")],
+        unique=False,
+        postgresql_include=["id", "cpf", "hashed_password"],
+    )
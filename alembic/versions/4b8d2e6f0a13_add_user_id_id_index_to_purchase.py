@@ -0,0 +1,28 @@
+"""add user_id id index to purchase
+
+Revision ID: 4b8d2e6f0a13
+Revises: e3a9f5c18d42
+Create Date: 2026-10-18 14:05:12.331904
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4b8d2e6f0a13"
+down_revision = "e3a9f5c18d42"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_purchase_user_id_id",
+        "purchase",
+        ["user_id", "id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_purchase_user_id_id", table_name="purchase")
@@ -0,0 +1,31 @@
+"""add lower email index to user
+
+Revision ID: 5f3c2a1d9b7e
+Revises: a21f59d1e97e
+Create Date: 2026-10-18 10:12:31.482113
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5f3c2a1d9b7e"
+down_revision = "a21f59d1e97e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_user_email_lower",
+        "user",
+        [sa.text("lower(email)")],
+        unique=False,
+        postgresql_include=["id", "hashed_password"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_user_email_lower", table_name="user")
@@ -0,0 +1,50 @@
+"""create user cashback monthly table
+
+Revision ID: 7a3c9e1f5b28
+Revises: 2d6f8b0c4e17
+Create Date: 2026-10-18 17:24:51.839127
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "7a3c9e1f5b28"
+down_revision = "2d6f8b0c4e17"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_cashback_monthly",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("month", sa.Date(), nullable=False),
+        sa.Column("status_id", sa.Integer(), nullable=False),
+        sa.Column("purchase_count", sa.Integer(), nullable=False),
+        sa.Column("value", sa.Numeric(), nullable=False),
+        sa.Column("cashback_value", sa.Numeric(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["status_id"], ["purchase_status.id"]),
+        sa.PrimaryKeyConstraint("user_id", "month", "status_id"),
+    )
+    # backfill from the existing purchases
+    if op.get_bind().dialect.name == "postgresql":
+        month = "CAST(date_trunc('month', date) AS DATE)"
+    else:
+        month = "date(date, 'start of month')"
+    op.execute(f"""
+        INSERT INTO user_cashback_monthly
+            (user_id, month, status_id, purchase_count, value, cashback_value)
+        SELECT user_id, {month}, status_id, COUNT(*), SUM(value),
+            SUM(cashback_value)
+        FROM purchase
+        WHERE user_id IS NOT NULL AND status_id IS NOT NULL
+        GROUP BY user_id, {month}, status_id
+        """)
+
+
+def downgrade():
+    op.drop_table("user_cashback_monthly")
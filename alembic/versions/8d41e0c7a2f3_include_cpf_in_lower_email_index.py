@@ -0,0 +1,41 @@
+"""include cpf in lower email index
+
+Revision ID: 8d41e0c7a2f3
+Revises: 5f3c2a1d9b7e
+Create Date: 2026-10-18 11:02:47.215904
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8d41e0c7a2f3"
+down_revision = "5f3c2a1d9b7e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the login also reads the cpf (signed in the token claims), so it is
+    # included to keep the login an index-only scan on PostgreSQL.
+    op.drop_index("ix_user_email_lower", table_name="user")
+    op.create_index(
+        "ix_user_email_lower",
+        "user",
+        [sa.text("lower(email)")],
+        unique=False,
+        postgresql_include=["id", "cpf", "hashed_password"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_user_email_lower", table_name="user")
+    op.create_index(
+        "ix_user_email_lower",
+        "user",
+        [sa.text("lower(email)")],
+        unique=False,
+        postgresql_include=["id", "hashed_password"],
+    )
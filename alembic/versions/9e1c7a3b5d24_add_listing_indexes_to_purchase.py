@@ -0,0 +1,42 @@
+"""add listing indexes to purchase
+
+Revision ID: 9e1c7a3b5d24
+Revises: 4b8d2e6f0a13
+Create Date: 2026-10-18 15:20:44.918310
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9e1c7a3b5d24"
+down_revision = "4b8d2e6f0a13"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_purchase_user_id_date",
+        "purchase",
+        ["user_id", "date", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_purchase_user_id_status_id_date",
+        "purchase",
+        ["user_id", "status_id", "date", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_purchase_user_id_value",
+        "purchase",
+        ["user_id", "value", "id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_purchase_user_id_value", table_name="purchase")
+    op.drop_index("ix_purchase_user_id_status_id_date", table_name="purchase")
+    op.drop_index("ix_purchase_user_id_date", table_name="purchase")
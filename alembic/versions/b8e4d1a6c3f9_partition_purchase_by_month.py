@@ -0,0 +1,123 @@
+"""partition purchase by month
+
+Revision ID: b8e4d1a6c3f9
+Revises: 7a3c9e1f5b28
+Create Date: 2026-10-18 18:41:09.562370
+
+"""
+
+from datetime import date
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b8e4d1a6c3f9"
+down_revision = "7a3c9e1f5b28"
+branch_labels = None
+depends_on = None
+
+# months after the current one created by the migration, the next ones are
+# created by the application (see app.database.partitioning).
+MONTHS_AHEAD = 3
+
+LISTING_INDEXES = [
+    ("ix_purchase_id", ["id"]),
+    ("ix_purchase_user_id_id", ["user_id", "id"]),
+    ("ix_purchase_user_id_date", ["user_id", "date", "id"]),
+    (
+        "ix_purchase_user_id_status_id_date",
+        ["user_id", "status_id", "date", "id"],
+    ),
+    ("ix_purchase_user_id_value", ["user_id", "value", "id"]),
+]
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def copy_purchase_table(partitioned):
+    # a table can't be partitioned (or unpartitioned) in place, so the rows
+    # are copied to a new table, which then takes the purchase name.
+    op.execute("ALTER TABLE purchase RENAME TO purchase_old")
+    op.execute(
+        "CREATE TABLE purchase (LIKE purchase_old INCLUDING DEFAULTS)"
+        + (" PARTITION BY RANGE (date)" if partitioned else "")
+    )
+    op.execute("ALTER SEQUENCE purchase_id_seq OWNED BY purchase.id")
+    if partitioned:
+        months = {
+            row[0]
+            for row in op.get_bind().execute(
+                sa.text(
+                    "SELECT DISTINCT CAST(date_trunc('month', date) AS DATE) "
+                    "FROM purchase_old"
+                )
+            )
+        }
+        current = date.today().replace(day=1)
+        months.update(add_months(current, i) for i in range(MONTHS_AHEAD + 1))
+        for month in sorted(months):
+            op.execute(
+                f"CREATE TABLE purchase_p{month:%Y_%m} PARTITION OF purchase "
+                f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+            )
+        op.execute(
+            "CREATE TABLE purchase_default PARTITION OF purchase DEFAULT"
+        )
+    op.execute("INSERT INTO purchase SELECT * FROM purchase_old")
+    # CASCADE drops the partitions too, when unpartitioning
+    op.execute("DROP TABLE purchase_old CASCADE")
+    # the constraints and indexes are created after the rows are copied,
+    # which is faster than updating them for every row.
+    op.create_primary_key(
+        "purchase_pkey",
+        "purchase",
+        ["id", "date"] if partitioned else ["id"],
+    )
+    op.create_foreign_key(
+        "purchase_status_id_fkey",
+        "purchase",
+        "purchase_status",
+        ["status_id"],
+        ["id"],
+    )
+    op.create_foreign_key(
+        "purchase_user_id_fkey", "purchase", "user", ["user_id"], ["id"]
+    )
+    for name, columns in LISTING_INDEXES:
+        op.create_index(name, "purchase", columns, unique=False)
+    if not partitioned:
+        op.create_index("ix_purchase_code", "purchase", ["code"], unique=True)
+
+
+def upgrade():
+    # the codes are unique through their own table, as the unique index of
+    # a partitioned table must include the partition key (the date).
+    op.create_table(
+        "purchase_code",
+        sa.Column("code", sa.String(), nullable=False),
+        sa.Column("purchase_id", sa.Integer(), nullable=False),
+        sa.Column("purchase_date", sa.Date(), nullable=False),
+        sa.PrimaryKeyConstraint("code"),
+    )
+    op.execute("""
+        INSERT INTO purchase_code (code, purchase_id, purchase_date)
+        SELECT code, id, date FROM purchase
+        """)
+    if op.get_bind().dialect.name != "postgresql":
+        # SQLite has no partitioning, only the code index moves
+        op.drop_index("ix_purchase_code", table_name="purchase")
+        return
+    copy_purchase_table(partitioned=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        copy_purchase_table(partitioned=False)
+    else:
+        op.create_index("ix_purchase_code", "purchase", ["code"], unique=True)
+    op.drop_table("purchase_code")
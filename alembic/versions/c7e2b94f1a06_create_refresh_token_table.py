@@ -0,0 +1,66 @@
+"""create refresh token table
+
+Revision ID: c7e2b94f1a06
+Revises: 8d41e0c7a2f3
+Create Date: 2026-10-18 14:21:09.537210
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c7e2b94f1a06"
+down_revision = "8d41e0c7a2f3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "refresh_token",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("token_hash", sa.String(length=64), nullable=False),
+        sa.Column("family_id", sa.String(length=32), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("used_at", sa.DateTime(), nullable=True),
+        sa.Column("revoked_at", sa.DateTime(), nullable=True),
+        sa.Column("time_created", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_refresh_token_family_id"),
+        "refresh_token",
+        ["family_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_refresh_token_id"), "refresh_token", ["id"], unique=False
+    )
+    op.create_index(
+        op.f("ix_refresh_token_token_hash"),
+        "refresh_token",
+        ["token_hash"],
+        unique=True,
+    )
+    op.create_index(
+        op.f("ix_refresh_token_user_id"),
+        "refresh_token",
+        ["user_id"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(op.f("ix_refresh_token_user_id"), table_name="refresh_token")
+    op.drop_index(
+        op.f("ix_refresh_token_token_hash"), table_name="refresh_token"
+    )
+    op.drop_index(op.f("ix_refresh_token_id"), table_name="refresh_token")
+    op.drop_index(
+        op.f("ix_refresh_token_family_id"), table_name="refresh_token"
+    )
+    op.drop_table("refresh_token")
@@ -0,0 +1,42 @@
+"""create revoked token table
+
+Revision ID: e3a9f5c18d42
+Revises: c7e2b94f1a06
+Create Date: 2026-10-18 15:37:52.118406
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e3a9f5c18d42"
+down_revision = "c7e2b94f1a06"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "revoked_token",
+        sa.Column("jti", sa.String(length=32), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("time_created", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("jti"),
+    )
+    op.create_index(
+        op.f("ix_revoked_token_expires_at"),
+        "revoked_token",
+        ["expires_at"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        op.f("ix_revoked_token_expires_at"), table_name="revoked_token"
+    )
+    op.drop_table("revoked_token")
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.api_v1.endpoints import auth, cashback, purchases, users
+from app.api.api_v1.endpoints import auth, cashback, metrics, purchases, users
 
 api_v1_router = APIRouter()
 
@@ -12,3 +12,6 @@ api_v1_router.include_router(
 api_v1_router.include_router(
     cashback.router, prefix="/cashback", tags=["Cashback"]
 )
+api_v1_router.include_router(
+    metrics.router, prefix="/metrics", tags=["Metrics"]
+)
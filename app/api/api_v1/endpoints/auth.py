@@ -1,12 +1,15 @@
-from typing import Any
+from datetime import datetime
+from typing import Any, Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, schemas
 from app.api import deps
-from app.core.security import create_jwt_token
+from app.core.config import settings
+from app.core.security import PasswordHashPoolBusyError, create_jwt_token
+from app.crud.crud_refresh_token import InvalidRefreshTokenError
 
 router = APIRouter()
 
@@ -15,19 +18,106 @@ router = APIRouter()
     "/login",
     response_model=schemas.Token,
     status_code=status.HTTP_200_OK,
-    responses={status.HTTP_401_UNAUTHORIZED: {"model": schemas.HTTPError}},
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {"model": schemas.HTTPError},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"model": schemas.HTTPError},
+    },
 )
 async def create_user_token(
     db: AsyncSession = Depends(deps.get_db),
     form_data: OAuth2PasswordRequestForm = Depends(),
 ) -> Any:
-    user = await crud.user.get_authenticated_user(
-        db=db, user_email=form_data.username, user_password=form_data.password
-    )
+    try:
+        user = await crud.user.get_authenticated_user(
+            db=db,
+            user_email=form_data.username,
+            user_password=form_data.password,
+        )
+    except PasswordHashPoolBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many logins in progress, please try again later.",
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
         )
-    access_token = create_jwt_token(subject=user.id)
-    return {"access_token": access_token, "token_type": "bearer"}
+    refresh_token = await crud.refresh_token.issue(db=db, user_id=user.id)
+    return create_token_response(
+        user_id=user.id, cpf=user.cpf, refresh_token=refresh_token
+    )
+
+
+@router.post(
+    "/refresh",
+    response_model=schemas.Token,
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_401_UNAUTHORIZED: {"model": schemas.HTTPError}},
+)
+async def refresh_user_token(
+    token_in: schemas.RefreshTokenRequest,
+    db: AsyncSession = Depends(deps.get_db),
+) -> Any:
+    # renews the access token without the password (no bcrypt). The used
+    # refresh token is replaced by a new one.
+    try:
+        refresh_token, user_id = await crud.refresh_token.rotate(
+            db=db, token=token_in.refresh_token
+        )
+    except InvalidRefreshTokenError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+        )
+    user = await crud.user.get_cached_by_id(db=db, id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+        )
+    return create_token_response(
+        user_id=user.id, cpf=user.cpf, refresh_token=refresh_token
+    )
+
+
+@router.post(
+    "/logout",
+    status_code=status.HTTP_204_NO_CONTENT,
+    response_class=Response,
+    responses=deps.GET_TOKEN_PAYLOAD_RESPONSES,
+)
+async def revoke_user_token(
+    token_in: Optional[schemas.RefreshTokenRequest] = None,
+    db: AsyncSession = Depends(deps.get_db),
+    payload: Dict[str, Any] = Depends(deps.get_token_payload),
+) -> None:
+    # revokes the access token used in the request and, if sent, the
+    # refresh token family (so the session can't be renewed).
+    if payload.get("jti"):
+        await crud.token_revocation_list.revoke(
+            db=db,
+            jti=payload["jti"],
+            expires_at=datetime.utcfromtimestamp(payload["exp"]),
+            user_id=int(payload["sub"]),
+        )
+    if token_in:
+        db_token = await crud.refresh_token.get_by_token(
+            db=db, token=token_in.refresh_token
+        )
+        if db_token and db_token.user_id == int(payload["sub"]):
+            await crud.refresh_token.revoke_family(
+                db=db, family_id=db_token.family_id
+            )
+
+
+def create_token_response(
+    *, user_id: int, cpf: str, refresh_token: str
+) -> Dict[str, str]:
+    claims = {"cpf": cpf} if settings.ACCESS_TOKEN_PRINCIPAL_CLAIMS else {}
+    access_token = create_jwt_token(subject=user_id, claims=claims)
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
@@ -1,14 +1,42 @@
-from typing import Any
+from datetime import date
+from decimal import Decimal
+from typing import Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app import models, schemas
+from app import crud, schemas, services
 from app.api import deps
-from app.core.config import settings
+from app.core.months import add_months, month_start
+from app.services.external_cashback import ExternalCashbackUnavailableError
 
 router = APIRouter()
 
+# YYYY-MM, from 0001-01 (year 0 is not a date)
+MONTH_REGEX = r"^(?!0000)\d{4}-(0[1-9]|1[0-2])$"
+
+
+def parse_month(value: str) -> date:
+    # YYYY-MM -> first day of the month
+    year, month = value.split("-")
+    return date(int(year), int(month), 1)
+
+
+def format_month(month: date) -> str:
+    # first day of the month -> YYYY-MM (strftime doesn't pad the years
+    # before 1000)
+    return f"{month.year:04d}-{month.month:02d}"
+
+
+def default_first_month(last: date) -> date:
+    # 11 months before the last one, but not before the first month of
+    # year 1
+    try:
+        return add_months(last, -11)
+    except ValueError:
+        return date.min
+
 
 @router.get(
     "/",
@@ -19,24 +47,19 @@ router = APIRouter()
 )
 async def get_cashback(
     async_client: AsyncClient = Depends(deps.get_async_client),
-    token_user: models.User = Depends(deps.get_token_user),
+    db: AsyncSession = Depends(deps.get_db),
+    token_user: schemas.TokenPrincipal = Depends(deps.get_token_principal),
 ) -> Any:
-    # get user purchases
-    user_purchases = token_user.purchases_
-
-    # sum internal cashback
-    accumulated_cashback = 0
-    for purchase in user_purchases:
-        accumulated_cashback += float(purchase.cashback_value)
-
-    # get cashback of external service
-    url = f"{settings.EXTERNAL_CASHBACK_API}?cpf={token_user.cpf}"
-    resp = await async_client.get(url)
-
-    external_cashback = resp.json().get("cashback")
-
-    # if external service is unavailable return 503
-    if resp.status_code != 200 or not external_cashback:
+    # the internal cashback and the external one are fetched concurrently
+    try:
+        return await services.cashback.get_cashback(
+            db=db,
+            client=async_client,
+            user_id=token_user.id,
+            cpf=token_user.cpf,
+        )
+    except ExternalCashbackUnavailableError:
+        # if external service is unavailable return 503
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=(
@@ -44,6 +67,61 @@ async def get_cashback(
             ),
         )
 
-    accumulated_cashback += external_cashback
 
-    return schemas.CashBack(cashback=accumulated_cashback)
+@router.get(
+    "/statement",
+    response_model=schemas.CashbackStatement,
+    status_code=status.HTTP_200_OK,
+    responses=deps.GET_TOKEN_USER_RESPONSES
+    | {400: {"model": schemas.HTTPError}},
+)
+async def get_cashback_statement(
+    month_from: Optional[str] = Query(
+        None,
+        alias="from",
+        regex=MONTH_REGEX,
+        description="First month (YYYY-MM), 11 months before 'to' if unset.",
+    ),
+    month_to: Optional[str] = Query(
+        None,
+        alias="to",
+        regex=MONTH_REGEX,
+        description="Last month (YYYY-MM), the current month if unset.",
+    ),
+    db: AsyncSession = Depends(deps.get_db),
+    token_user: schemas.TokenPrincipal = Depends(deps.get_token_principal),
+) -> Any:
+    # the totals by month and status come from the monthly rollups, so no
+    # purchase is read whatever the length of the period.
+    last = parse_month(month_to) if month_to else month_start(date.today())
+    first = (
+        parse_month(month_from) if month_from else default_first_month(last)
+    )
+    if first > last:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'from' must not be after 'to'.",
+        )
+    rollups = await crud.cashback_rollup.get_by_user_id(
+        db=db, user_id=token_user.id, month_from=first, month_to=last
+    )
+    entries = [
+        schemas.CashbackStatementEntry(
+            month=format_month(rollup.month),
+            status=await crud.purchase_status_registry.resolve_name(
+                db=db, id=rollup.status_id
+            ),
+            purchase_count=rollup.purchase_count,
+            value=rollup.value,
+            cashback_value=rollup.cashback_value,
+        )
+        for rollup in rollups
+    ]
+    return schemas.CashbackStatement(
+        month_from=format_month(first),
+        month_to=format_month(last),
+        entries=entries,
+        cashback_value=sum(
+            (entry.cashback_value for entry in entries), Decimal(0)
+        ),
+    )
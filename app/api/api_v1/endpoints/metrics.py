@@ -0,0 +1,23 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends, status
+
+from app import schemas
+from app.api import deps
+from app.core.metrics import metrics
+
+router = APIRouter()
+
+
+@router.get(
+    "/",
+    response_model=Dict[str, Dict[str, Any]],
+    status_code=status.HTTP_200_OK,
+    responses=deps.GET_TOKEN_PAYLOAD_RESPONSES,
+)
+async def get_metrics(
+    admin: schemas.TokenPrincipal = Depends(deps.get_admin_principal),
+) -> Any:
+    # in-process counters (caches, breakers...), so each worker has its own.
+    # Only the admins can read them, as the API is public.
+    return metrics.collect()
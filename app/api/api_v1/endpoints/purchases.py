@@ -1,30 +1,129 @@
-from typing import Any, List
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Any, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, models, schemas
 from app.api import deps
+from app.core.config import settings
+from app.core.pagination import (
+    InvalidCursorError,
+    cursor_int,
+    decode_cursor,
+    encode_cursor,
+)
+from app.crud.crud_purchase import (
+    PurchaseCodeAlreadyUsedError,
+    PurchaseUserNotFoundError,
+)
 
 router = APIRouter()
 
+GET_PURCHASES_RESPONSES = deps.GET_TOKEN_USER_RESPONSES | {
+    400: {"model": schemas.HTTPError}
+}
+
+
+def encode_purchase_cursor(
+    purchase: models.Purchase, sort: schemas.PurchaseSortEnum
+) -> str:
+    key, id = crud.purchase.sort_position(purchase, sort)
+    return encode_cursor({"sort": sort.value, "key": key, "id": id})
+
+
+def decode_purchase_cursor(
+    cursor: str, sort: schemas.PurchaseSortEnum
+) -> Tuple[Any, int]:
+    position = decode_cursor(cursor)
+    # a cursor only continues the sort order that created it
+    if position.get("sort", "id") != sort.value:
+        raise InvalidCursorError("The cursor is of another sort order.")
+    try:
+        key = position.get("key", position["id"])
+        id = cursor_int(position["id"])
+        if sort in (
+            schemas.PurchaseSortEnum.DATE,
+            schemas.PurchaseSortEnum.DATE_DESC,
+        ):
+            key = date.fromisoformat(key)
+        elif sort in (
+            schemas.PurchaseSortEnum.VALUE,
+            schemas.PurchaseSortEnum.VALUE_DESC,
+        ):
+            key = Decimal(key)
+            if not key.is_finite():
+                raise InvalidCursorError("Invalid cursor.")
+        else:
+            key = cursor_int(key)
+    except (InvalidOperation, KeyError, OverflowError, TypeError, ValueError):
+        raise InvalidCursorError("Invalid cursor.")
+    return key, id
+
 
 @router.get(
     "/",
     response_model=List[schemas.Purchase],
     status_code=status.HTTP_200_OK,
-    responses=deps.GET_TOKEN_USER_RESPONSES,
+    responses=GET_PURCHASES_RESPONSES,
 )
 async def get_purchases(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    response: Response,
+    filters: schemas.PurchaseFilter = Depends(),
+    sort: schemas.PurchaseSortEnum = schemas.PurchaseSortEnum.ID,
+    cursor: Optional[str] = None,
+    limit: int = Query(
+        settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX
+    ),
+    skip: int = Query(0, ge=0, deprecated=True),
     db: AsyncSession = Depends(deps.get_db),
-    token_user: models.User = Depends(deps.get_token_user),
+    token_user: schemas.TokenPrincipal = Depends(deps.get_token_principal),
 ) -> Any:
-    # return user purchases
+    """
+    Return the user purchases that match the filters (the ranges are
+    inclusive), in the sort order ("-" means descending, the ties are
+    ordered by id). When there are more, the cursor of the next page is
+    returned in the "X-Next-Cursor" header and its URL in the "Link"
+    header (rel="next").
+
+    "skip" is deprecated: deep pages are slow, use the cursor instead.
+    """
+    after = None
+    if cursor:
+        try:
+            after = decode_purchase_cursor(cursor, sort)
+        except InvalidCursorError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+            )
+    # one more purchase, to know if there is a next page
     purchases = await crud.purchase.get_multi_by_user_id(
-        db=db, user_id=token_user.id, skip=skip, limit=limit
+        db=db,
+        user_id=token_user.id,
+        skip=skip,
+        limit=limit + 1,
+        filters=filters,
+        sort=sort,
+        after=after,
     )
+    if len(purchases) > limit:
+        purchases = purchases[:limit]
+        next_cursor = encode_purchase_cursor(purchases[-1], sort)
+        next_url = request.url.remove_query_params(
+            "skip"
+        ).include_query_params(cursor=next_cursor, limit=limit)
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
     return purchases
 
 
@@ -36,7 +135,7 @@ async def get_purchases(
 )
 async def create_purchase(
     purchase_in: schemas.PurchaseCreate,
-    token_user: models.User = Depends(deps.get_token_user),
+    token_user: schemas.TokenPrincipal = Depends(deps.get_token_principal),
     db: AsyncSession = Depends(deps.get_db),
 ) -> Any:
     # access rules
@@ -49,16 +148,17 @@ async def create_purchase(
                 "different user. Please check the entered CPF."
             ),
         )
-    # if the purchase code has already been used.
-    target_code_purchase = await crud.purchase.get_by_code(
-        db=db, code=purchase_in.code
-    )
-    if target_code_purchase:
+    try:
+        purchase = await crud.purchase.create(db=db, purchase_in=purchase_in)
+    except PurchaseCodeAlreadyUsedError as exc:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="The purchase code has already been used.",
+            status_code=status.HTTP_403_FORBIDDEN, detail=str(exc)
+        )
+    except PurchaseUserNotFoundError as exc:
+        # the token claims outlived the user (see get_token_principal)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)
         )
-    purchase = await crud.purchase.create(db=db, purchase_in=purchase_in)
     return purchase
 
 
@@ -71,7 +171,7 @@ async def create_purchase(
 async def update_current_purchase(
     purchase_id: str,
     purchase_in: schemas.PurchaseUpdatePUT,
-    token_user: models.User = Depends(deps.get_token_user),
+    token_user: schemas.TokenPrincipal = Depends(deps.get_token_principal),
     db: AsyncSession = Depends(deps.get_db),
 ) -> Any:
     purchase = await crud.purchase.get_by_id(db=db, id=purchase_id)
@@ -96,20 +196,19 @@ async def update_current_purchase(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="It is not allowed to transfer purchases to other users.",
         )
-    # the "IF"s below have been separated only for readability.
-    # (Zen of python n.7)
-    if purchase_in.code != purchase.code:
-        target_code_purchase = await crud.purchase.get_by_code(
-            db=db, code=purchase_in.code
+    try:
+        purchase = await crud.purchase.update(
+            db=db, db_purchase=purchase, purchase_in=purchase_in
+        )
+    except PurchaseCodeAlreadyUsedError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=str(exc)
+        )
+    # deleted meanwhile by another request
+    if not purchase:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Purchase not found."
         )
-        if target_code_purchase:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="The purchase code has already been used.",
-            )
-    purchase = await crud.purchase.update(
-        db=db, db_purchase=purchase, purchase_in=purchase_in
-    )
     return purchase
 
 
@@ -122,7 +221,7 @@ async def update_current_purchase(
 async def delete_purchase_by_id(
     purchase_id: int,
     db: AsyncSession = Depends(deps.get_db),
-    token_user: models.User = Depends(deps.get_token_user),
+    token_user: schemas.TokenPrincipal = Depends(deps.get_token_principal),
 ):
     purchase = await crud.purchase.get_by_id(db=db, id=purchase_id)
     if not purchase:
@@ -140,5 +239,11 @@ async def delete_purchase_by_id(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only purchases in validation can be excluded.",
         )
-    deleted_user = await crud.purchase.delete_by_id(db=db, id=purchase_id)
-    return deleted_user
+    deleted_purchase = await crud.purchase.delete_by_id(db=db, id=purchase_id)
+    # deleted meanwhile by another request
+    if not deleted_purchase:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Purchase not found.",
+        )
+    return deleted_purchase
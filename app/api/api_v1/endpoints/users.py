@@ -1,34 +1,123 @@
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app import crud, schemas
+from app import crud, schemas, services
 from app.api import deps
+from app.core.config import settings
+from app.core.security import PasswordHashPoolBusyError
+from app.crud.crud_user import UserAlreadyExistsError
+from app.services.user_bulk import UserBulkBusyError, UserBulkError
 
 router = APIRouter()
 
 
+async def read_body(request: Request, *, max_bytes: int) -> bytes:
+    # the body is read up to max_bytes, so a huge body is rejected before
+    # it is kept in memory (or parsed).
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"The body must have at most {max_bytes} bytes.",
+    )
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        if int(content_length) > max_bytes:
+            raise too_large
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise too_large
+    return bytes(body)
+
+
 @router.post(
     "/",
     response_model=schemas.User,
     status_code=status.HTTP_201_CREATED,
-    responses={status.HTTP_400_BAD_REQUEST: {"model": schemas.HTTPError}},
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"model": schemas.HTTPError},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"model": schemas.HTTPError},
+    },
 )
 async def create_user(
     user_in: schemas.UserCreate, db: AsyncSession = Depends(deps.get_db)
 ) -> Any:
-    user = await crud.user.get_by_email(db=db, email=user_in.email)
-    if user:
+    try:
+        user = await crud.user.create(db=db, user_in=user_in)
+    except UserAlreadyExistsError as exc:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Already exists an user with this email.",
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
         )
-    user = await crud.user.get_by_cpf(db=db, cpf=user_in.cpf)
-    if user:
+    except PasswordHashPoolBusyError:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Already exists an user with this cpf.",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=(
+                "The service is currently unavailable, please try again later."
+            ),
         )
-    user = await crud.user.create(db=db, user_in=user_in)
     return user
+
+
+@router.post(
+    "/bulk",
+    response_model=schemas.UserBulkResult,
+    responses=deps.GET_TOKEN_PAYLOAD_RESPONSES
+    | {
+        status.HTTP_400_BAD_REQUEST: {"model": schemas.HTTPError},
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: {"model": schemas.HTTPError},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {"model": schemas.HTTPError},
+    },
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": {"$ref": "#/components/schemas/UserCreate"},
+                    }
+                },
+                "application/x-ndjson": {
+                    "schema": {"$ref": "#/components/schemas/UserCreate"}
+                },
+            },
+        }
+    },
+)
+async def create_users_bulk(
+    request: Request,
+    db: AsyncSession = Depends(deps.get_db),
+    admin: schemas.TokenPrincipal = Depends(deps.get_admin_principal),
+) -> Any:
+    """
+    Register many users at once (admins and partners only). The body is a
+    JSON array of users or, with the "application/x-ndjson" content type,
+    one user per line.
+
+    Each user gets its result (its id or the error), in the same order.
+    """
+    content_type = request.headers.get("content-type", "")
+    body = await read_body(
+        request, max_bytes=settings.USER_BULK_MAX_BODY_BYTES
+    )
+    try:
+        users = services.user_bulk.parse(
+            body, ndjson=content_type.startswith("application/x-ndjson")
+        )
+    except UserBulkError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        )
+    if len(users) > settings.USER_BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.USER_BULK_MAX_ROWS} users per request.",
+        )
+    try:
+        return await services.user_bulk.register(db=db, users=users)
+    except UserBulkBusyError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(exc)
+        )
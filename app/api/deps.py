@@ -3,13 +3,13 @@ from typing import Any, AsyncGenerator, Dict
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from httpx import AsyncClient
 from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app import crud, models, schemas
+from app import crud, schemas
 from app.core.config import settings
-from app.core.security import decode_jwt_token
+from app.core.http_client import shared_async_client
+from app.core.security import decode_jwt_token, verified_token_cache
 from app.database.session import async_session
 
 GET_TOKEN_PAYLOAD_RESPONSES = {403: {"model": schemas.HTTPError}}
@@ -29,11 +29,30 @@ async def get_db() -> AsyncGenerator:
 
 
 async def get_async_client() -> AsyncGenerator:
-    async with AsyncClient() as async_client:
-        yield async_client
+    # the client is shared by the whole application, so it is not closed
+    # at the end of the request.
+    yield shared_async_client.get()
 
 
-def get_token_payload(token: str = Depends(reusable_oauth2)) -> Dict[str, Any]:
+async def get_token_payload(
+    token: str = Depends(reusable_oauth2),
+) -> Dict[str, Any]:
+    payload = verified_token_cache.get(token)
+    if payload is None:
+        payload = decode_token(token)
+        verified_token_cache.set(token, payload)
+    # the revocation is checked in memory, only probable hits hit the db
+    if payload.get("jti") and await crud.token_revocation_list.is_revoked(
+        payload["jti"]
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The token has been revoked.",
+        )
+    return payload
+
+
+def decode_token(token: str) -> Dict[str, Any]:
     try:
         payload = decode_jwt_token(token)
     except jwt.ExpiredSignatureError:
@@ -57,7 +76,7 @@ def get_token_payload(token: str = Depends(reusable_oauth2)) -> Dict[str, Any]:
 async def get_token_user(
     db: AsyncSession = Depends(get_db),
     payload: Dict[str, Any] = Depends(get_token_payload),
-) -> models.User:
+) -> schemas.UserSnapshot:
     try:
         token_data = schemas.TokenPayload(**payload)
     except ValidationError:
@@ -65,9 +84,48 @@ async def get_token_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validade credentials",
         )
-    user = await crud.user.get_by_id(db, id=int(token_data.sub))
+    user = await crud.user.get_cached_by_id(db, id=int(token_data.sub))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
     return user
+
+
+async def get_token_principal(
+    db: AsyncSession = Depends(get_db),
+    payload: Dict[str, Any] = Depends(get_token_payload),
+) -> schemas.TokenPrincipal:
+    """
+    Lightweight alternative to get_token_user, for the endpoints that only
+    need the user id and cpf. They are read from the token claims, without
+    fetching the user, and only the tokens without them (or when disabled
+    by ACCESS_TOKEN_PRINCIPAL_CLAIMS) fall back to the database.
+    """
+    try:
+        token_data = schemas.TokenPayload(**payload)
+    except ValidationError:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validade credentials",
+        )
+    if settings.ACCESS_TOKEN_PRINCIPAL_CLAIMS and payload.get("cpf"):
+        return schemas.TokenPrincipal(id=token_data.sub, cpf=payload["cpf"])
+    user = await crud.user.get_cached_by_id(db, id=int(token_data.sub))
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
+        )
+    return schemas.TokenPrincipal(id=user.id, cpf=user.cpf)
+
+
+async def get_admin_principal(
+    principal: schemas.TokenPrincipal = Depends(get_token_principal),
+) -> schemas.TokenPrincipal:
+    # the admins and partners are listed in the settings (ADMIN_USER_IDS)
+    if principal.id not in settings.ADMIN_USER_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The user doesn't have enough privileges.",
+        )
+    return principal
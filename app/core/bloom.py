@@ -0,0 +1,64 @@
+import hashlib
+import math
+from typing import Any, Dict, Iterable
+
+
+class BloomFilter:
+    """
+    Probabilistic set: `item in bloom` is never False for an added item,
+    and is True for an item that wasn't added with about `error_rate`
+    probability. It uses a few bits per item, whatever the item size.
+
+    Items can't be removed, so the filter must be rebuilt to drop them.
+    """
+
+    def __init__(self, *, capacity: int, error_rate: float = 0.001) -> None:
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # optimal number of bits and hashes for the capacity and error rate
+        self.num_bits = max(
+            8,
+            math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)),
+        )
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def from_items(
+        cls, items: Iterable[str], *, capacity: int, error_rate: float
+    ) -> "BloomFilter":
+        bloom = cls(capacity=capacity, error_rate=error_rate)
+        for item in items:
+            bloom.add(item)
+        return bloom
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # double hashing: the k positions come from the two halves of a
+        # single digest, so only one hash is computed per item.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (first + i * second) % self.num_bits
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "capacity": self.capacity,
+            "num_bits": self.num_bits,
+            "num_hashes": self.num_hashes,
+        }
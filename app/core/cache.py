@@ -0,0 +1,101 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+FRESH = "fresh"
+STALE = "stale"
+EXPIRED = "expired"
+MISSING = "missing"
+
+
+class CacheEntry:
+    __slots__ = ("value", "expires_at", "stale_until")
+
+    def __init__(self, value: Any, expires_at: float, stale_until: float):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+
+class TTLCache:
+    """
+    In-memory cache with time to live, LRU eviction and an optional stale
+    window (used to serve a stale value while it is being refreshed).
+
+    Expired entries are kept until they are evicted, so a caller can still
+    use the last known value as a fallback.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float,
+        max_entries: int,
+        stale_ttl: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, key: Hashable) -> Tuple[Any, str]:
+        """
+        Method that returns the cached value and its state (FRESH, STALE,
+        EXPIRED or MISSING). Only FRESH counts as a hit.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None, MISSING
+        self._entries.move_to_end(key)
+        now = self._clock()
+        if now < entry.expires_at:
+            self.hits += 1
+            return entry.value, FRESH
+        if now < entry.stale_until:
+            self.stale_hits += 1
+            return entry.value, STALE
+        self.misses += 1
+        return entry.value, EXPIRED
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value, state = self.lookup(key)
+        return value if state == FRESH else default
+
+    def set(
+        self, key: Hashable, value: Any, ttl: Optional[float] = None
+    ) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        expires_at = self._clock() + ttl
+        self._entries[key] = CacheEntry(
+            value, expires_at, expires_at + self.stale_ttl
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
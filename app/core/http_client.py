@@ -0,0 +1,53 @@
+from typing import Optional
+
+from httpx import AsyncClient, Limits, Timeout
+
+from app.core.config import settings
+
+
+class SharedAsyncClient:
+    """
+    Class responsible for the application-lifetime httpx client used to
+    call the third services.
+
+    Reusing the same client keeps the connections alive between requests,
+    avoiding a new TCP + TLS handshake on every call. It is created at the
+    application startup (or on first use) and closed on shutdown.
+    """
+
+    def __init__(self) -> None:
+        self._client: Optional[AsyncClient] = None
+
+    def _create_client(self) -> AsyncClient:
+        return AsyncClient(
+            limits=Limits(
+                max_connections=settings.HTTP_CLIENT_MAX_CONNECTIONS,
+                max_keepalive_connections=(
+                    settings.HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS
+                ),
+                keepalive_expiry=settings.HTTP_CLIENT_KEEPALIVE_EXPIRY,
+            ),
+            timeout=Timeout(
+                settings.HTTP_CLIENT_READ_TIMEOUT,
+                connect=settings.HTTP_CLIENT_CONNECT_TIMEOUT,
+            ),
+            http2=settings.HTTP_CLIENT_HTTP2,
+        )
+
+    def start(self) -> None:
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()
+
+    def get(self) -> AsyncClient:
+        # created on first use when the startup event was not triggered
+        # (e.g. in tests that don't run the application lifespan).
+        self.start()
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+shared_async_client = SharedAsyncClient()
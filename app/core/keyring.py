@@ -0,0 +1,185 @@
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, ed448, ed25519, rsa
+from jwt.algorithms import get_default_algorithms
+
+HMAC_ALGORITHMS = ("HS256", "HS384", "HS512")
+ASYMMETRIC_ALGORITHMS = (
+    "RS256",
+    "RS384",
+    "RS512",
+    "PS256",
+    "PS384",
+    "PS512",
+    "ES256",
+    "ES384",
+    "ES512",
+    "EdDSA",
+)
+
+# key types expected by each family of algorithms (private, public)
+KEY_TYPES = {
+    "RS": ((rsa.RSAPrivateKey,), (rsa.RSAPublicKey,)),
+    "PS": ((rsa.RSAPrivateKey,), (rsa.RSAPublicKey,)),
+    "ES": ((ec.EllipticCurvePrivateKey,), (ec.EllipticCurvePublicKey,)),
+    "Ed": (
+        (ed25519.Ed25519PrivateKey, ed448.Ed448PrivateKey),
+        (ed25519.Ed25519PublicKey, ed448.Ed448PublicKey),
+    ),
+}
+
+
+class KeyRingError(Exception):
+    """
+    Raised when the key ring configuration is not valid.
+    """
+
+
+class JWTKey:
+    """
+    A key of the key ring, with the key objects already parsed, so they
+    are not parsed again for every token signed or verified.
+
+    A key without signing key (e.g. only the public key of a rotated out
+    key pair) is only used to verify the tokens it signed.
+    """
+
+    def __init__(
+        self,
+        *,
+        kid: str,
+        algorithm: str,
+        signing_key: Any = None,
+        verifying_key: Any = None,
+    ) -> None:
+        self.kid = kid
+        self.algorithm = algorithm
+        self.signing_key = signing_key
+        self.verifying_key = verifying_key
+
+    @property
+    def can_sign(self) -> bool:
+        return self.signing_key is not None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, str]) -> "JWTKey":
+        """
+        Method that creates a key from its configuration, a dict with:
+            - kid: id of the key (sent in the token header).
+            - alg: JWT algorithm (e.g. HS256, RS256, ES256, EdDSA).
+            - key / key_file: secret (HMAC) or private key (PEM).
+            - public_key / public_key_file: public key (PEM). Optional if
+            the private key is given, required for verify only keys.
+        """
+        kid = config.get("kid")
+        algorithm = config.get("alg")
+        if not kid or not algorithm:
+            raise KeyRingError("Every key must have a 'kid' and an 'alg'.")
+        if algorithm not in HMAC_ALGORITHMS + ASYMMETRIC_ALGORITHMS:
+            raise KeyRingError(f"Key '{kid}': unsupported alg {algorithm}.")
+        secret = _read(config, "key")
+        public = _read(config, "public_key")
+        prepare_key = get_default_algorithms()[algorithm].prepare_key
+        try:
+            if algorithm in HMAC_ALGORITHMS:
+                if secret is None:
+                    raise KeyRingError(f"Key '{kid}' has no secret.")
+                key = prepare_key(secret)
+                return cls(
+                    kid=kid,
+                    algorithm=algorithm,
+                    signing_key=key,
+                    verifying_key=key,
+                )
+            signing_key = prepare_key(secret) if secret else None
+            if public:
+                verifying_key = prepare_key(public)
+            elif signing_key is not None:
+                verifying_key = signing_key.public_key()
+            else:
+                raise KeyRingError(f"Key '{kid}' has no key.")
+        except (jwt.InvalidKeyError, ValueError) as exc:
+            raise KeyRingError(f"Key '{kid}' is not valid: {exc}") from exc
+        private_types, public_types = KEY_TYPES[algorithm[:2]]
+        if signing_key is not None and not isinstance(
+            signing_key, private_types
+        ):
+            raise KeyRingError(
+                f"Key '{kid}' is not a {algorithm} private key."
+            )
+        if not isinstance(verifying_key, public_types):
+            raise KeyRingError(f"Key '{kid}' is not a {algorithm} public key.")
+        return cls(
+            kid=kid,
+            algorithm=algorithm,
+            signing_key=signing_key,
+            verifying_key=verifying_key,
+        )
+
+
+def _read(config: Dict[str, str], name: str) -> Optional[str]:
+    # the key can be inline (e.g. from an env var) or in a file
+    if config.get(name):
+        return config[name]
+    if config.get(f"{name}_file"):
+        return Path(config[f"{name}_file"]).read_text()
+    return None
+
+
+class KeyRing:
+    """
+    Class responsible for the keys used to sign and verify the tokens.
+
+    The tokens are signed by the active key and carry its id in the "kid"
+    header, so they are verified by the key (and only the algorithm) that
+    signed them. To rotate, add a new key as the active one and keep the
+    old one (its public key is enough) until its tokens expire.
+    """
+
+    def __init__(self, keys: Iterable[JWTKey], active_kid: str) -> None:
+        self._keys = {key.kid: key for key in keys}
+        if active_kid not in self._keys:
+            raise KeyRingError(f"The active key '{active_kid}' is unknown.")
+        if not self._keys[active_kid].can_sign:
+            raise KeyRingError(f"The active key '{active_kid}' can't sign.")
+        self.active = self._keys[active_kid]
+
+    @property
+    def kids(self) -> List[str]:
+        return list(self._keys)
+
+    def get(self, kid: Optional[str]) -> JWTKey:
+        # tokens without "kid" were issued before the key ring existed
+        if kid is None:
+            return self.active
+        try:
+            return self._keys[kid]
+        except KeyError:
+            raise jwt.InvalidTokenError(f"Unknown key id '{kid}'.")
+
+    @classmethod
+    def from_config(
+        cls,
+        keys: Optional[List[Dict[str, str]]],
+        active_kid: Optional[str],
+        *,
+        default_secret: str,
+        default_algorithm: str,
+    ) -> "KeyRing":
+        """
+        Method that creates the key ring from the keys configuration. When
+        there are no keys, the key ring has a single HMAC key with the
+        default secret (the old SECRET_KEY behaviour).
+        """
+        if not keys:
+            keys = [
+                {
+                    "kid": "default",
+                    "alg": default_algorithm,
+                    "key": default_secret,
+                }
+            ]
+        jwt_keys = [JWTKey.from_config(config) for config in keys]
+        return cls(jwt_keys, active_kid or jwt_keys[0].kid)
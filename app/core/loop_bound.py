@@ -0,0 +1,30 @@
+import asyncio
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LoopBound(Generic[T]):
+    """
+    Class that holds an asyncio primitive (e.g. a semaphore or a lock) for
+    the running event loop. A primitive is bound to the loop where it is
+    first used, so it is created again when the holder starts being used
+    from another loop.
+
+    Usage:
+        semaphore = LoopBound(lambda: asyncio.Semaphore(8))
+        async with semaphore.get():
+            ...
+    """
+
+    def __init__(self, factory: Callable[[], T]) -> None:
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get(self) -> T:
+        loop = asyncio.get_running_loop()
+        if self._value is None or self._loop is not loop:
+            self._value = self._factory()
+            self._loop = loop
+        return self._value
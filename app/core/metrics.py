@@ -0,0 +1,24 @@
+from typing import Any, Callable, Dict
+
+
+class MetricsRegistry:
+    """
+    Class responsible for gathering the in-process metrics (caches,
+    breakers, etc) exposed by the metrics endpoint.
+    """
+
+    def __init__(self) -> None:
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def register(
+        self, name: str, collector: Callable[[], Dict[str, Any]]
+    ) -> None:
+        self._collectors[name] = collector
+
+    def collect(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: collector() for name, collector in self._collectors.items()
+        }
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,52 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict
+
+# range of the integer columns (BIGINT on PostgreSQL, INTEGER on SQLite), a
+# key outside of it can't be bound to a query
+INT64_MIN = -(2**63)
+INT64_MAX = 2**63 - 1
+
+
+class InvalidCursorError(Exception):
+    """
+    Raised when a pagination cursor can't be decoded.
+    """
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """
+    Function that encodes the position of the last item of a page (the
+    values of its sort keys) as an opaque cursor for the next page.
+    """
+    data = json.dumps(position, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    # the padding is stripped by encode_cursor
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError):
+        raise InvalidCursorError("Invalid cursor.")
+    if not isinstance(position, dict):
+        raise InvalidCursorError("Invalid cursor.")
+    return position
+
+
+def cursor_int(value: Any) -> int:
+    """
+    Function that reads an integer key of a cursor.
+
+    Raises:
+        InvalidCursorError: If it isn't an integer of the 64-bit range.
+    """
+    try:
+        value = int(value)
+    except (OverflowError, TypeError, ValueError):
+        raise InvalidCursorError("Invalid cursor.")
+    if not INT64_MIN <= value <= INT64_MAX:
+        raise InvalidCursorError("Invalid cursor.")
+    return value
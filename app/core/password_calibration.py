@@ -0,0 +1,95 @@
+import statistics
+import time
+from typing import Callable, Dict
+
+from passlib.context import CryptContext
+
+from app.core.security import build_pwd_context
+
+# passlib limits
+BCRYPT_MIN_ROUNDS = 4
+BCRYPT_MAX_ROUNDS = 31
+# argon2 memory is never lowered below this (KiB), the OWASP minimum
+ARGON2_MIN_MEMORY_COST = 19456
+
+
+def measure_hash_time(
+    context: CryptContext,
+    *,
+    samples: int = 5,
+    timer: Callable[[], float] = time.perf_counter,
+) -> float:
+    """
+    Function that returns the median time (seconds) of a hash with the
+    context on the current machine.
+    """
+    durations = []
+    for _ in range(samples):
+        start = timer()
+        context.hash("calibration-password")
+        durations.append(timer() - start)
+    return statistics.median(durations)
+
+
+def calibrate_bcrypt(
+    target: float, *, max_rounds: int = 16, samples: int = 5
+) -> Dict[str, int]:
+    """
+    Function that returns the highest bcrypt rounds whose hash takes at
+    most `target` seconds (or the minimum rounds if none does).
+
+    Each round doubles the hash time, so the rounds are tried in order
+    until the first one over the target.
+    """
+    rounds = BCRYPT_MIN_ROUNDS
+    max_rounds = min(max_rounds, BCRYPT_MAX_ROUNDS)
+    while rounds < max_rounds:
+        duration = measure_hash_time(
+            build_pwd_context(bcrypt_rounds=rounds + 1), samples=samples
+        )
+        if duration > target:
+            break
+        rounds += 1
+    return {"PASSWORD_BCRYPT_ROUNDS": rounds}
+
+
+def calibrate_argon2(
+    target: float,
+    *,
+    memory_cost: int = 65536,
+    parallelism: int = 4,
+    max_time_cost: int = 10,
+    samples: int = 5,
+) -> Dict[str, int]:
+    """
+    Function that returns the argon2id parameters whose hash takes at
+    most `target` seconds: the given memory with the highest time cost
+    that fits. If a single pass with that memory is already over the
+    target, the memory is halved (never below ARGON2_MIN_MEMORY_COST).
+    """
+
+    def duration(time_cost: int, memory_cost: int) -> float:
+        context = build_pwd_context(
+            "argon2",
+            argon2_time_cost=time_cost,
+            argon2_memory_cost=memory_cost,
+            argon2_parallelism=parallelism,
+        )
+        return measure_hash_time(context, samples=samples)
+
+    while (
+        memory_cost // 2 >= ARGON2_MIN_MEMORY_COST
+        and duration(1, memory_cost) > target
+    ):
+        memory_cost //= 2
+    time_cost = 1
+    while (
+        time_cost < max_time_cost
+        and duration(time_cost + 1, memory_cost) <= target
+    ):
+        time_cost += 1
+    return {
+        "PASSWORD_ARGON2_TIME_COST": time_cost,
+        "PASSWORD_ARGON2_MEMORY_COST": memory_cost,
+        "PASSWORD_ARGON2_PARALLELISM": parallelism,
+    }
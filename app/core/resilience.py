@@ -0,0 +1,176 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.loop_bound import LoopBound
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a call is rejected because the circuit breaker is open.
+    """
+
+
+class BulkheadFullError(Exception):
+    """
+    Raised when a call is rejected because the bulkhead has no free slot.
+    """
+
+
+class CircuitBreaker:
+    """
+    Class responsible for stopping the calls to a dependency that keeps
+    failing (or answering too slowly), so the callers fail fast instead of
+    waiting for it.
+
+    After `failure_threshold` consecutive failures (a call slower than
+    `slow_call_threshold` also counts as a failure) the circuit opens.
+    After `reset_timeout` seconds it becomes half-open and a single probe
+    call is allowed: if it succeeds the circuit closes, otherwise it opens
+    again.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int,
+        reset_timeout: float,
+        slow_call_threshold: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_threshold = slow_call_threshold
+        self._clock = clock
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self.rejected_calls = 0
+        self.slow_calls = 0
+
+    @property
+    def state(self) -> str:
+        if (
+            self._state == OPEN
+            and self._clock() - self._opened_at >= self.reset_timeout
+        ):
+            self._state = HALF_OPEN
+        return self._state
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self.times_opened += 1
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == OPEN or (state == HALF_OPEN and self._probe_in_flight):
+            self.rejected_calls += 1
+            raise CircuitOpenError("The circuit breaker is open.")
+        if state == HALF_OPEN:
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        self._probe_in_flight = False
+        self.consecutive_failures = 0
+        self._state = CLOSED
+
+    def record_failure(self) -> None:
+        self._probe_in_flight = False
+        self.consecutive_failures += 1
+        if (
+            self._state == HALF_OPEN
+            or self.consecutive_failures >= self.failure_threshold
+        ):
+            self._open()
+
+    async def call(
+        self, func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any
+    ) -> Any:
+        self.before_call()
+        started = self._clock()
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            # a cancelled call says nothing about the dependency health
+            self._probe_in_flight = False
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        if (
+            self.slow_call_threshold is not None
+            and self._clock() - started > self.slow_call_threshold
+        ):
+            # the result is still returned, but the slowness counts
+            self.slow_calls += 1
+            self.record_failure()
+        else:
+            self.record_success()
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected_calls": self.rejected_calls,
+            "slow_calls": self.slow_calls,
+        }
+
+
+class Bulkhead:
+    """
+    Class responsible for limiting the concurrent calls to a dependency,
+    so a slow dependency can't take every worker slot.
+
+    Usage:
+        async with bulkhead:
+            ...
+    """
+
+    def __init__(
+        self, *, max_concurrent_calls: int, max_wait: float = 0.0
+    ) -> None:
+        self.max_concurrent_calls = max_concurrent_calls
+        self.max_wait = max_wait
+        self.in_use = 0
+        self.rejected_calls = 0
+        self._semaphore = LoopBound(
+            lambda: asyncio.Semaphore(self.max_concurrent_calls)
+        )
+
+    async def __aenter__(self) -> "Bulkhead":
+        semaphore = self._semaphore.get()
+        if semaphore.locked():
+            if self.max_wait <= 0:
+                self.rejected_calls += 1
+                raise BulkheadFullError("The bulkhead is full.")
+            try:
+                await asyncio.wait_for(
+                    semaphore.acquire(), timeout=self.max_wait
+                )
+            except asyncio.TimeoutError:
+                self.rejected_calls += 1
+                raise BulkheadFullError("The bulkhead is full.")
+        else:
+            await semaphore.acquire()
+        self.in_use += 1
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.in_use -= 1
+        self._semaphore.get().release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_use": self.in_use,
+            "max_concurrent_calls": self.max_concurrent_calls,
+            "rejected_calls": self.rejected_calls,
+        }
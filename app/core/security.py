@@ -1,12 +1,194 @@
+import asyncio
+import hashlib
+import time
+import uuid
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
 from datetime import datetime, timedelta
-from typing import Any, Dict, Union
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 
 import jwt
 from passlib.context import CryptContext
+from passlib.hash import argon2
 
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.keyring import KeyRing
+from app.core.loop_bound import LoopBound
+from app.core.metrics import metrics
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def build_pwd_context(
+    scheme: str = "bcrypt",
+    *,
+    bcrypt_rounds: int = 12,
+    argon2_time_cost: int = 3,
+    argon2_memory_cost: int = 65536,
+    argon2_parallelism: int = 4,
+) -> CryptContext:
+    """
+    Function that creates the password context. New hashes use the given
+    scheme and cost, and both schemes are verified, so the hashes of the
+    other scheme or with another cost are flagged by needs_update (and
+    rehashed on the next login). argon2 hashes use the argon2id variant.
+
+    argon2 is only registered when its backend (argon2-cffi) is installed.
+
+    Raises:
+        ValueError: If the scheme is argon2 and its backend is missing, so
+        the application fails at the startup instead of at every login.
+    """
+    schemes = ["bcrypt"]
+    if argon2.has_backend():
+        schemes.append("argon2")
+    elif scheme == "argon2":
+        raise ValueError(
+            'PASSWORD_HASH_SCHEME is "argon2" but argon2-cffi is not '
+            "installed."
+        )
+    # min = max = the cost, so a lower and a higher cost are both outdated
+    return CryptContext(
+        schemes=schemes,
+        default=scheme,
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__type="ID",
+        argon2__rounds=argon2_time_cost,
+        argon2__min_rounds=argon2_time_cost,
+        argon2__max_rounds=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+
+pwd_context = build_pwd_context(
+    settings.PASSWORD_HASH_SCHEME,
+    bcrypt_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    argon2_time_cost=settings.PASSWORD_ARGON2_TIME_COST,
+    argon2_memory_cost=settings.PASSWORD_ARGON2_MEMORY_COST,
+    argon2_parallelism=settings.PASSWORD_ARGON2_PARALLELISM,
+)
+
+# the keys are parsed once, at the startup
+keyring = KeyRing.from_config(
+    settings.JWT_KEYS,
+    settings.JWT_ACTIVE_KID,
+    default_secret=settings.SECRET_KEY,
+    default_algorithm=settings.ACCESS_TOKEN_ALGORITHM,
+)
+
+
+class PasswordHashPoolBusyError(Exception):
+    """
+    Raised when a password hash could not get a free slot in the
+    password hash pool before the queue timeout.
+    """
+
+
+def _map_chunk(func: Callable[[Any], Any], chunk: Sequence[Any]) -> List[Any]:
+    # module level, so it can be sent to a process pool
+    return [func(item) for item in chunk]
+
+
+class PasswordHashPool:
+    """
+    Class responsible for running the CPU-bound password hashing outside
+    of the event loop, in a dedicated thread or process pool.
+
+    The number of hashes running or waiting for a worker is capped, so a
+    burst of logins only queues up logins and never the other requests.
+    """
+
+    def __init__(
+        self,
+        *,
+        executor_type: str = "thread",
+        max_workers: int = 4,
+        max_concurrency: int = 8,
+        queue_timeout: Optional[float] = None,
+    ) -> None:
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[Executor] = None
+        self._semaphore = LoopBound(
+            lambda: asyncio.Semaphore(self.max_concurrency)
+        )
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-hash",
+                )
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        semaphore = self._semaphore.get()
+        try:
+            await asyncio.wait_for(
+                semaphore.acquire(), timeout=self.queue_timeout
+            )
+        except asyncio.TimeoutError:
+            raise PasswordHashPoolBusyError(
+                "Timed out waiting for a free password hash slot."
+            )
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(), func, *args
+            )
+        finally:
+            semaphore.release()
+
+    async def map(
+        self,
+        func: Callable[[Any], Any],
+        items: Sequence[Any],
+        *,
+        chunk_size: int = 1,
+    ) -> List[Any]:
+        """
+        Method that applies func to every item in the pool, in chunks of
+        chunk_size items per task, and returns the results in order.
+        """
+        chunks = [
+            items[i : i + chunk_size] for i in range(0, len(items), chunk_size)
+        ]
+        results = await asyncio.gather(
+            *(self.run(_map_chunk, func, chunk) for chunk in chunks)
+        )
+        return [result for chunk in results for result in chunk]
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hash_pool = PasswordHashPool(
+    executor_type=settings.PASSWORD_HASH_EXECUTOR,
+    max_workers=settings.PASSWORD_HASH_MAX_WORKERS,
+    max_concurrency=settings.PASSWORD_HASH_MAX_CONCURRENCY,
+    queue_timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT,
+)
+bulk_password_hash_pool = PasswordHashPool(
+    executor_type=settings.PASSWORD_BULK_HASH_EXECUTOR,
+    max_workers=settings.PASSWORD_BULK_HASH_MAX_WORKERS,
+    # enough chunks queued to keep every worker busy
+    max_concurrency=settings.PASSWORD_BULK_HASH_MAX_WORKERS * 2,
+)
 
 
 def get_password_hash(password: str) -> str:
@@ -17,10 +199,52 @@ def verify_password(raw_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(raw_password, hashed_password)
 
 
+def verify_and_update_password(
+    raw_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Function that verifies the password and, if it matches and its hash
+    is outdated (see build_pwd_context), returns its new hash too.
+    """
+    return pwd_context.verify_and_update(raw_password, hashed_password)
+
+
+async def async_get_password_hash(password: str) -> str:
+    return await password_hash_pool.run(get_password_hash, password)
+
+
+async def async_get_password_hashes(passwords: Sequence[str]) -> List[str]:
+    """
+    Function that hashes many passwords in parallel, in the bulk pool.
+    """
+    return await bulk_password_hash_pool.map(
+        get_password_hash,
+        passwords,
+        chunk_size=settings.PASSWORD_BULK_HASH_CHUNK_SIZE,
+    )
+
+
+async def async_verify_password(
+    raw_password: str, hashed_password: str
+) -> bool:
+    return await password_hash_pool.run(
+        verify_password, raw_password, hashed_password
+    )
+
+
+async def async_verify_and_update_password(
+    raw_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    return await password_hash_pool.run(
+        verify_and_update_password, raw_password, hashed_password
+    )
+
+
 def create_jwt_token(
     subject: Union[str, int],
     starts_delta: timedelta = None,
     expires_delta: timedelta = None,
+    claims: Optional[Dict[str, Any]] = None,
 ) -> str:
     start = datetime.utcnow()
     if starts_delta:
@@ -33,17 +257,89 @@ def create_jwt_token(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
 
-    payload = {"exp": expire, "nbf": start, "sub": subject}
+    # the extra claims are signed with the token, but they can't override
+    # the registered ones. "jti" identifies the token to revoke it.
+    payload = {
+        **(claims or {}),
+        "exp": expire,
+        "nbf": start,
+        "sub": subject,
+        "jti": uuid.uuid4().hex,
+    }
+    key = keyring.active
     encoded_jwt = jwt.encode(
-        payload, settings.SECRET_KEY, algorithm=settings.ACCESS_TOKEN_ALGORITHM
+        payload,
+        key.signing_key,
+        algorithm=key.algorithm,
+        headers={"kid": key.kid},
     )
     return encoded_jwt
 
 
 def decode_jwt_token(token: str) -> Dict[str, Any]:
+    # only the algorithm of the key that signed the token is accepted
+    key = keyring.get(jwt.get_unverified_header(token).get("kid"))
     payload = jwt.decode(
         token,
-        settings.SECRET_KEY,
-        algorithms=[settings.ACCESS_TOKEN_ALGORITHM],
+        key.verifying_key,
+        algorithms=[key.algorithm],
     )
     return payload
+
+
+class VerifiedTokenCache:
+    """
+    Class responsible for caching the payload of the already verified
+    tokens, so a token reused by the client is not verified again on
+    every request.
+
+    The tokens are keyed by their sha256 digest and an entry never lives
+    beyond the token "exp" claim, so an expired token is always a miss and
+    goes through the full verification again.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float,
+        max_entries: int,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        # wall clock, because it is compared with the "exp" claim
+        self._clock = clock
+        self.cache = TTLCache(ttl=ttl, max_entries=max_entries, clock=clock)
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        payload = self.cache.get(self._key(token))
+        if payload is None:
+            return None
+        # copy, so the caller can't change the cached payload
+        return dict(payload)
+
+    def set(self, token: str, payload: Dict[str, Any]) -> None:
+        ttl = self.cache.ttl
+        if "exp" in payload:
+            ttl = min(ttl, float(payload["exp"]) - self._clock())
+        if ttl <= 0:
+            return
+        self.cache.set(self._key(token), dict(payload), ttl=ttl)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+verified_token_cache = VerifiedTokenCache(
+    ttl=settings.VERIFIED_TOKEN_CACHE_TTL,
+    max_entries=settings.VERIFIED_TOKEN_CACHE_MAX_ENTRIES,
+)
+metrics.register("verified_token_cache", verified_token_cache.stats)
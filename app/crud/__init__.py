@@ -1,3 +1,7 @@
+from .crud_cashback_balance import cashback_balance
+from .crud_cashback_rollup import cashback_rollup
 from .crud_purchase import purchase
-from .crud_purchasestatus import purchase_status
+from .crud_purchasestatus import purchase_status, purchase_status_registry
+from .crud_refresh_token import refresh_token
+from .crud_revoked_token import revoked_token, token_revocation_list
 from .crud_user import user
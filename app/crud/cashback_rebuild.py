@@ -0,0 +1,30 @@
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+
+# rebuilds a cashback aggregate of an user from its purchases and commits
+UserRebuild = Callable[[AsyncSession, int], Awaitable[None]]
+
+
+async def rebuild_by_user(
+    db: AsyncSession, *rebuilds: UserRebuild, user_id: Optional[int] = None
+) -> None:
+    """
+    Function that runs the rebuilds (e.g. the balances and the rollups)
+    for an user or for all of them, one user at a time. Each rebuild of an
+    user is its own transaction, holding the cashback lock of that user
+    only, so the purchase writes of the other users are never blocked.
+    """
+    if user_id is None:
+        result = await db.execute(
+            select(models.User.id).order_by(models.User.id)
+        )
+        user_ids = result.scalars().all()
+    else:
+        user_ids = [user_id]
+    for id in user_ids:
+        for rebuild in rebuilds:
+            await rebuild(db, id)
@@ -0,0 +1,121 @@
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, models, schemas
+from app.crud.cashback_rebuild import rebuild_by_user
+from app.database.dialects import insert_on_conflict
+from app.database.locks import lock_user_cashback
+
+# (user_id, status_id) -> cashback delta
+BalanceDeltas = Dict[Tuple[int, int], Decimal]
+
+
+class CrudCashbackBalance:
+    """
+    Class responsible for the cashback balance of the users (the running
+    total of the cashback of their purchases, by status), so reading it
+    is a primary key lookup instead of a sum over the purchase history.
+
+    The balance is changed by the purchase writes, as deltas executed in
+    the transaction of the write (see apply_deltas), so a failed write
+    leaves it untouched. Each delta is an atomic upsert, and the writes of
+    a same purchase compute theirs from its locked row, so concurrent
+    writes can't lose or repeat a delta. rebuild recomputes the balance of
+    an user under the same per-user lock that apply_deltas takes.
+    """
+
+    async def get_by_user_id(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        status: Optional[schemas.statusEnum] = None,
+    ) -> Decimal:
+        query = select(
+            func.coalesce(
+                func.sum(models.UserCashbackBalance.cashback_value), 0
+            )
+        ).where(models.UserCashbackBalance.user_id == user_id)
+        if status:
+            status_id = await crud.purchase_status_registry.resolve_id(
+                db=db, name=status
+            )
+            query = query.where(
+                models.UserCashbackBalance.status_id == status_id
+            )
+        result = await db.execute(query)
+        return Decimal(result.scalar())
+
+    async def apply_deltas(
+        self, db: AsyncSession, deltas: Iterable[Tuple[int, int, Decimal]]
+    ) -> None:
+        """
+        Method that adds the cashback deltas, given as (user_id,
+        status_id, delta), to the balances. It doesn't commit, so the
+        deltas are committed (or rolled back) with the purchase writes.
+        """
+        merged: BalanceDeltas = {}
+        for user_id, status_id, delta in deltas:
+            if user_id is None or status_id is None:
+                continue
+            key = (user_id, status_id)
+            merged[key] = merged.get(key, Decimal(0)) + Decimal(delta)
+        await lock_user_cashback(db, (user_id for user_id, _ in merged))
+        for (user_id, status_id), delta in merged.items():
+            if not delta:
+                continue
+            statement = insert_on_conflict(db, models.UserCashbackBalance)
+            statement = statement.values(
+                user_id=user_id, status_id=status_id, cashback_value=delta
+            )
+            await db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=["user_id", "status_id"],
+                    set_={
+                        "cashback_value": (
+                            models.UserCashbackBalance.cashback_value
+                            + statement.excluded.cashback_value
+                        )
+                    },
+                )
+            )
+
+    async def rebuild(
+        self, db: AsyncSession, user_id: Optional[int] = None
+    ) -> None:
+        """
+        Method that rebuilds the balances (of an user or of all of them)
+        from the purchases, e.g. to reconcile a drift (see rebuild_by_user).
+        """
+        await rebuild_by_user(db, self.rebuild_user, user_id=user_id)
+
+    async def rebuild_user(self, db: AsyncSession, user_id: int) -> None:
+        await lock_user_cashback(db, [user_id])
+        await db.execute(
+            delete(models.UserCashbackBalance).where(
+                models.UserCashbackBalance.user_id == user_id
+            )
+        )
+        purchases = (
+            select(
+                models.Purchase.user_id,
+                models.Purchase.status_id,
+                func.sum(models.Purchase.cashback_value),
+            )
+            .where(
+                models.Purchase.user_id == user_id,
+                models.Purchase.status_id.is_not(None),
+            )
+            .group_by(models.Purchase.user_id, models.Purchase.status_id)
+        )
+        await db.execute(
+            insert(models.UserCashbackBalance).from_select(
+                ["user_id", "status_id", "cashback_value"], purchases
+            )
+        )
+        await db.commit()
+
+
+cashback_balance = CrudCashbackBalance()
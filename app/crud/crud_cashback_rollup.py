@@ -0,0 +1,173 @@
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import Date, cast, delete, func, insert, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement
+
+from app import models
+from app.crud.cashback_rebuild import rebuild_by_user
+from app.database.dialects import insert_on_conflict
+from app.database.locks import lock_user_cashback
+
+# (user_id, month, status_id) -> [purchase_count, value, cashback_value]
+RollupDeltas = Dict[Tuple[int, date, int], List[Union[int, Decimal]]]
+
+
+class CrudCashbackRollup:
+    """
+    Class responsible for the monthly rollup of the purchases of the users
+    (count, value and cashback by month and status), so a statement is
+    read from a few rollup rows instead of the whole purchase history.
+
+    The purchase writes move their count, value and cashback between the
+    rollups of their (month, status) in the same transaction as the write
+    (see apply_deltas). A month left without purchases keeps its row with
+    zero totals, which get_by_user_id skips. rebuild recomputes the months
+    of an user from the purchases while holding its cashback lock, which
+    the deltas wait for.
+    """
+
+    async def get_by_user_id(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        month_from: Optional[date] = None,
+        month_to: Optional[date] = None,
+    ) -> List[models.UserCashbackMonthly]:
+        query = select(models.UserCashbackMonthly).where(
+            models.UserCashbackMonthly.user_id == user_id,
+            # the rows of the months left without purchases
+            models.UserCashbackMonthly.purchase_count > 0,
+        )
+        if month_from is not None:
+            query = query.where(models.UserCashbackMonthly.month >= month_from)
+        if month_to is not None:
+            query = query.where(models.UserCashbackMonthly.month <= month_to)
+        result = await db.execute(
+            query.order_by(
+                models.UserCashbackMonthly.month,
+                models.UserCashbackMonthly.status_id,
+            )
+        )
+        return result.scalars().all()
+
+    async def apply_deltas(
+        self,
+        db: AsyncSession,
+        deltas: Iterable[Tuple[int, date, int, int, Decimal, Decimal]],
+    ) -> None:
+        """
+        Method that adds the deltas, given as (user_id, purchase date,
+        status_id, count, value, cashback_value), to the rollups of their
+        months. It doesn't commit, so the deltas are committed (or rolled
+        back) with the purchase writes.
+        """
+        merged: RollupDeltas = {}
+        for user_id, day, status_id, count, value, cashback in deltas:
+            if user_id is None or status_id is None or day is None:
+                continue
+            key = (user_id, day.replace(day=1), status_id)
+            totals = merged.setdefault(key, [0, Decimal(0), Decimal(0)])
+            totals[0] += count
+            totals[1] += Decimal(value)
+            totals[2] += Decimal(cashback)
+        await lock_user_cashback(db, (key[0] for key in merged))
+        for (user_id, month, status_id), totals in merged.items():
+            count, value, cashback = totals
+            if not count and not value and not cashback:
+                continue
+            statement = insert_on_conflict(db, models.UserCashbackMonthly)
+            statement = statement.values(
+                user_id=user_id,
+                month=month,
+                status_id=status_id,
+                purchase_count=count,
+                value=value,
+                cashback_value=cashback,
+            )
+            rollup = models.UserCashbackMonthly
+            await db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=["user_id", "month", "status_id"],
+                    set_={
+                        "purchase_count": (
+                            rollup.purchase_count
+                            + statement.excluded.purchase_count
+                        ),
+                        "value": rollup.value + statement.excluded.value,
+                        "cashback_value": (
+                            rollup.cashback_value
+                            + statement.excluded.cashback_value
+                        ),
+                    },
+                )
+            )
+
+    @staticmethod
+    def _month(db: AsyncSession) -> ColumnElement:
+        # first day of the month of the purchase date. The modifiers are
+        # literals, so the expression is the same in the GROUP BY.
+        if db.bind.dialect.name == "postgresql":
+            return cast(
+                func.date_trunc(
+                    literal_column("'month'"), models.Purchase.date
+                ),
+                Date,
+            )
+        return func.date(
+            models.Purchase.date, literal_column("'start of month'")
+        )
+
+    async def rebuild(
+        self, db: AsyncSession, user_id: Optional[int] = None
+    ) -> None:
+        """
+        Method that rebuilds the monthly rollups (of an user or of all of them)
+        from the purchases, e.g. to reconcile a drift (see rebuild_by_user).
+        """
+        await rebuild_by_user(db, self.rebuild_user, user_id=user_id)
+
+    async def rebuild_user(self, db: AsyncSession, user_id: int) -> None:
+        await lock_user_cashback(db, [user_id])
+        await db.execute(
+            delete(models.UserCashbackMonthly).where(
+                models.UserCashbackMonthly.user_id == user_id
+            )
+        )
+        month = self._month(db)
+        purchases = (
+            select(
+                models.Purchase.user_id,
+                month,
+                models.Purchase.status_id,
+                func.count(),
+                func.sum(models.Purchase.value),
+                func.sum(models.Purchase.cashback_value),
+            )
+            .where(
+                models.Purchase.user_id == user_id,
+                models.Purchase.status_id.is_not(None),
+            )
+            .group_by(
+                models.Purchase.user_id, month, models.Purchase.status_id
+            )
+        )
+        await db.execute(
+            insert(models.UserCashbackMonthly).from_select(
+                [
+                    "user_id",
+                    "month",
+                    "status_id",
+                    "purchase_count",
+                    "value",
+                    "cashback_value",
+                ],
+                purchases,
+            )
+        )
+        await db.commit()
+
+
+cashback_rollup = CrudCashbackRollup()
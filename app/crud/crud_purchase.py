@@ -1,9 +1,30 @@
-from typing import Any, Dict, List, Optional, Union
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
-from sqlalchemy import select
+from sqlalchemy import Column, delete, func, insert, select, tuple_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement
 
 from app import crud, domain, models, schemas
+from app.database.errors import is_unique_violation
+
+# (id, code, user_id, status_id, date, value, cashback_value) of a purchase
+PurchaseEntry = Tuple[int, str, int, int, date, Decimal, Decimal]
+
+
+class PurchaseCodeAlreadyUsedError(Exception):
+    """
+    Raised when the code of a purchase already belongs to another purchase.
+    """
+
+
+class PurchaseUserNotFoundError(Exception):
+    """
+    Raised when no user has the cpf of a purchase (e.g. the user was
+    deleted while their token, which carries the cpf, is still valid).
+    """
 
 
 class CrudPurchase:
@@ -18,8 +39,34 @@ class CrudPurchase:
     async def get_by_code(
         self, db: AsyncSession, code: Union[int, str]
     ) -> Optional[models.Purchase]:
+        # through purchase_code, so only the partition of the purchase is
+        # read (instead of an index of every partition).
         result = await db.execute(
-            select(models.Purchase).where(models.Purchase.code == code)
+            select(models.Purchase)
+            .join(
+                models.PurchaseCode,
+                (models.PurchaseCode.purchase_id == models.Purchase.id)
+                & (models.PurchaseCode.purchase_date == models.Purchase.date),
+            )
+            .where(models.PurchaseCode.code == code)
+        )
+        return result.scalar()
+
+    async def _get_for_update(
+        self, db: AsyncSession, id: Union[int, str]
+    ) -> Optional[models.Purchase]:
+        # the current values of the purchase (not the ones loaded before in
+        # the session), locked until the end of the transaction. So the
+        # deltas of concurrent writes of the same purchase are computed one
+        # after the other, each from the values left by the previous one.
+        # Like get_by_id, it probes the id index of every partition, as
+        # the date of the purchase isn't known yet; the writes that follow
+        # filter on it (see models.Purchase).
+        result = await db.execute(
+            select(models.Purchase)
+            .where(models.Purchase.id == id)
+            .with_for_update(of=models.Purchase)
+            .execution_options(populate_existing=True)
         )
         return result.scalar()
 
@@ -31,17 +78,103 @@ class CrudPurchase:
         )
         return result.scalars().unique().all()
 
+    @staticmethod
+    def _sort_column(sort: schemas.PurchaseSortEnum) -> Tuple[Column, bool]:
+        # the column and if it's descending. The id breaks the ties.
+        name = sort.value.lstrip("-")
+        return models.Purchase.__table__.c[name], sort.value.startswith("-")
+
+    def sort_position(
+        self, purchase: models.Purchase, sort: schemas.PurchaseSortEnum
+    ) -> Tuple[Any, int]:
+        """
+        Method that returns the position of the purchase in the sort order,
+        to get the purchases after it (see get_multi_by_user_id).
+        """
+        column, _ = self._sort_column(sort)
+        return getattr(purchase, column.name), purchase.id
+
+    async def _filter_clauses(
+        self, db: AsyncSession, filters: schemas.PurchaseFilter
+    ) -> List[ColumnElement]:
+        clauses = []
+        if filters.date_from is not None:
+            clauses.append(models.Purchase.date >= filters.date_from)
+        if filters.date_to is not None:
+            clauses.append(models.Purchase.date <= filters.date_to)
+        if filters.status is not None:
+            status_id = await crud.purchase_status_registry.resolve_id(
+                db=db, name=filters.status
+            )
+            clauses.append(models.Purchase.status_id == status_id)
+        if filters.value_min is not None:
+            clauses.append(models.Purchase.value >= filters.value_min)
+        if filters.value_max is not None:
+            clauses.append(models.Purchase.value <= filters.value_max)
+        return clauses
+
     async def get_multi_by_user_id(
-        self, db: AsyncSession, user_id: int, skip: int = 0, limit: int = 100
+        self,
+        db: AsyncSession,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        filters: Optional[schemas.PurchaseFilter] = None,
+        sort: schemas.PurchaseSortEnum = schemas.PurchaseSortEnum.ID,
+        after: Optional[Tuple[Any, int]] = None,
     ) -> Optional[List[models.Purchase]]:
+        """
+        Method that returns the purchases of the user that match the
+        filters, in the sort order. Pass the sort_position of the last
+        purchase of a page as after to get the next one: it seeks on the
+        (user_id, <sort column>, id) indexes, so a deep page is as fast as
+        the first (skip has to read the skipped purchases).
+        """
+        query = select(models.Purchase).where(
+            models.Purchase.user_id == user_id
+        )
+        if filters is not None:
+            query = query.where(*await self._filter_clauses(db, filters))
+        column, descending = self._sort_column(sort)
+        id_column = models.Purchase.__table__.c.id
+        if column is id_column:
+            keys = [id_column]
+        else:
+            keys = [column, id_column]
+        if after is not None:
+            position = tuple_(*keys)
+            bound = tuple_(*after[-len(keys) :])
+            query = query.where(
+                position < bound if descending else position > bound
+            )
         result = await db.execute(
-            select(models.Purchase)
-            .where(models.Purchase.user_id == user_id)
+            query.order_by(
+                *(key.desc() if descending else key for key in keys)
+            )
             .offset(skip)
             .limit(limit)
         )
         return result.scalars().unique().all()
 
+    async def get_cashback_sum_by_user_id(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        status: Optional[schemas.statusEnum] = None,
+    ) -> Decimal:
+        # the sum is done by the database, so no purchase is loaded no
+        # matter how long the user's purchase history is.
+        query = select(
+            func.coalesce(func.sum(models.Purchase.cashback_value), 0)
+        ).where(models.Purchase.user_id == user_id)
+        if status:
+            status_id = await crud.purchase_status_registry.resolve_id(
+                db=db, name=status
+            )
+            query = query.where(models.Purchase.status_id == status_id)
+        result = await db.execute(query)
+        return Decimal(result.scalar())
+
     async def create(
         self,
         db: AsyncSession,
@@ -54,9 +187,11 @@ class CrudPurchase:
 
         # treats the dictionary to insert the user_id instead of the cpf.
         if create_data.get("cpf"):
-            user = await crud.user.get_by_cpf(
+            user = await crud.user.get_cached_by_cpf(
                 db=db, cpf=create_data.pop("cpf")
             )
+            if not user:
+                raise PurchaseUserNotFoundError("User not found")
             create_data["user_id"] = user.id
 
         # treats the dictionary to insert the status_id.
@@ -64,10 +199,10 @@ class CrudPurchase:
             if create_data.get("status"):
                 # treats the dictionary to insert the status_id instead
                 # of the name.
-                status = await crud.purchase_status.get_by_name(
+                status_id = await crud.purchase_status_registry.resolve_id(
                     db=db, name=create_data.pop("status")
                 )
-                create_data["status_id"] = status.id
+                create_data["status_id"] = status_id
             else:
                 # get default domain status
                 status_id = (
@@ -87,7 +222,7 @@ class CrudPurchase:
 
         db_purchase = models.Purchase(**create_data)
         db.add(db_purchase)
-        await db.commit()
+        await self._commit_unique(db, db_purchase)
         await db.refresh(db_purchase)
         return db_purchase
 
@@ -100,7 +235,7 @@ class CrudPurchase:
             schemas.PurchaseUpdatePATCH,
             Dict[str, Any],
         ],
-    ) -> models.Purchase:
+    ) -> Optional[models.Purchase]:
         if isinstance(purchase_in, dict):
             update_data = purchase_in.copy()
         elif isinstance(purchase_in, schemas.PurchaseUpdatePUT):
@@ -117,10 +252,10 @@ class CrudPurchase:
 
         # treats the dictionary to insert the status_id instead of the name.
         if update_data.get("status") and not update_data.get("status_id"):
-            status = await crud.purchase_status.get_by_name(
+            status_id = await crud.purchase_status_registry.resolve_id(
                 db=db, name=update_data.pop("status")
             )
-            update_data["status_id"] = status.id
+            update_data["status_id"] = status_id
 
         # apply cashback business rule because PurchaseUpdate
         # schema don't have this value.
@@ -130,20 +265,144 @@ class CrudPurchase:
             )
             update_data["cashback_value"] = cashback_value
 
+        # the purchase moves from the old (user, status, month) totals to
+        # the new ones. It returns None if the purchase was deleted since
+        # it was loaded.
+        db_purchase = await self._get_for_update(db=db, id=db_purchase.id)
+        if not db_purchase:
+            await db.rollback()
+            return None
+        old_entry = self._entry(db_purchase)
         for field, value in update_data.items():
             if hasattr(db_purchase, field):
                 setattr(db_purchase, field, value)
-        await db.commit()
+        await self._commit_unique(db, db_purchase, old_entry=old_entry)
         await db.refresh(db_purchase)
         return db_purchase
 
+    @staticmethod
+    def _entry(purchase: models.Purchase) -> PurchaseEntry:
+        # what the purchase adds to the codes, balances and rollups
+        return (
+            purchase.id,
+            purchase.code,
+            purchase.user_id,
+            purchase.status_id,
+            purchase.date,
+            Decimal(purchase.value),
+            Decimal(purchase.cashback_value),
+        )
+
+    async def _apply_entries(
+        self,
+        db: AsyncSession,
+        added: Iterable[PurchaseEntry] = (),
+        removed: Iterable[PurchaseEntry] = (),
+    ) -> None:
+        entries = [(entry, 1) for entry in added]
+        entries += [(entry, -1) for entry in removed]
+        await self._apply_codes(db, added=added, removed=removed)
+        await crud.cashback_balance.apply_deltas(
+            db,
+            [
+                (user_id, status_id, sign * cashback)
+                for (_, _, user_id, status_id, _, _, cashback), sign in entries
+            ],
+        )
+        await crud.cashback_rollup.apply_deltas(
+            db,
+            [
+                (user_id, day, status_id, sign, sign * value, sign * cashback)
+                for (
+                    _,
+                    _,
+                    user_id,
+                    status_id,
+                    day,
+                    value,
+                    cashback,
+                ), sign in entries
+            ],
+        )
+
+    async def _apply_codes(
+        self,
+        db: AsyncSession,
+        added: Iterable[PurchaseEntry] = (),
+        removed: Iterable[PurchaseEntry] = (),
+    ) -> None:
+        # the purchase codes are unique through purchase_code, as the
+        # partitions of purchase can't have a global unique index. An
+        # insert of a code that is already used raises the IntegrityError.
+        added_codes = {(code, id, day) for id, code, _, _, day, _, _ in added}
+        removed_codes = {
+            (code, id, day) for id, code, _, _, day, _, _ in removed
+        }
+        stale_codes = removed_codes - added_codes
+        new_codes = added_codes - removed_codes
+        if stale_codes:
+            await db.execute(
+                delete(models.PurchaseCode).where(
+                    models.PurchaseCode.code.in_(
+                        [code for code, _, _ in stale_codes]
+                    )
+                )
+            )
+        if new_codes:
+            await db.execute(
+                insert(models.PurchaseCode),
+                [
+                    {"code": code, "purchase_id": id, "purchase_date": day}
+                    for code, id, day in new_codes
+                ],
+            )
+
+    async def _commit_unique(
+        self,
+        db: AsyncSession,
+        db_purchase: models.Purchase,
+        old_entry: Optional[PurchaseEntry] = None,
+    ) -> None:
+        # the unique index is the check, instead of querying the code
+        # before, which is racy and costs a query. The codes, balances and
+        # rollups are changed in the same transaction, so they are rolled
+        # back with the write.
+        try:
+            await db.flush()
+            await self._apply_entries(
+                db,
+                added=[self._entry(db_purchase)],
+                removed=[old_entry] if old_entry else [],
+            )
+            await db.commit()
+        except IntegrityError as exc:
+            await db.rollback()
+            if is_unique_violation(exc, models.PurchaseCode.__table__.c.code):
+                raise PurchaseCodeAlreadyUsedError(
+                    "The purchase code has already been used."
+                ) from exc
+            raise
+
     async def delete_by_id(
         self, db: AsyncSession, id: Union[int, str]
     ) -> Optional[models.Purchase]:
-        purchase = await self.get_by_id(db=db, id=id)
+        purchase = await self._get_for_update(db=db, id=id)
         if not purchase:
+            await db.rollback()
+            return None
+        entry = self._entry(purchase)
+        # the deltas are applied only by the delete that removed the row
+        # (SQLite, in the tests, ignores the row lock).
+        result = await db.execute(
+            delete(models.Purchase).where(
+                models.Purchase.id == purchase.id,
+                models.Purchase.date == purchase.date,
+            )
+        )
+        if not result.rowcount:
+            await db.rollback()
             return None
-        await db.delete(purchase)
+        await self._apply_entries(db, removed=[entry])
         await db.commit()
         return purchase
 
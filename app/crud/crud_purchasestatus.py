@@ -4,6 +4,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import models
+from app.database.invalidation import invalidation_bus
 
 
 class CrudPurchaseStatus:
@@ -13,8 +14,16 @@ class CrudPurchaseStatus:
         ps_data = purchase_status_in.copy()
         db_purchase_status = models.PurchaseStatus(**ps_data)
         db.add(db_purchase_status)
+        await db.flush()
+        registry_entry = {
+            "id": db_purchase_status.id,
+            "name": db_purchase_status.name,
+        }
+        # the other workers register the new status too
+        await invalidation_bus.publish(db, "purchase_status", registry_entry)
         await db.commit()
         await db.refresh(db_purchase_status)
+        purchase_status_registry.register(**registry_entry)
         return db_purchase_status
 
     async def get_by_id(
@@ -36,4 +45,89 @@ class CrudPurchaseStatus:
         return result.scalar()
 
 
+class PurchaseStatusRegistry:
+    """
+    Process level registry of the purchase statuses (name <-> id).
+
+    The statuses are practically static, so they are loaded once (at the
+    application startup) and then resolved in memory. A name that isn't
+    in the registry triggers a reload, so statuses created by another
+    process are picked up too.
+    """
+
+    def __init__(self) -> None:
+        self._ids_by_name: Dict[str, int] = {}
+        self._names_by_id: Dict[int, str] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._ids_by_name)
+
+    async def load(self, db: AsyncSession) -> None:
+        result = await db.execute(
+            select(models.PurchaseStatus.id, models.PurchaseStatus.name)
+        )
+        rows = result.all()
+        # replaces the dicts at once to never expose a half loaded registry
+        self._ids_by_name = {name: id for id, name in rows}
+        self._names_by_id = {id: name for id, name in rows}
+
+    def register(self, *, id: int, name: str) -> None:
+        self._ids_by_name[name] = id
+        self._names_by_id[id] = name
+
+    def clear(self) -> None:
+        self._ids_by_name = {}
+        self._names_by_id = {}
+
+    def get_id(self, name: str) -> Optional[int]:
+        return self._ids_by_name.get(name)
+
+    def get_name(self, id: int) -> Optional[str]:
+        return self._names_by_id.get(id)
+
+    async def resolve_id(self, db: AsyncSession, name: str) -> int:
+        """
+        Method that get the id of a purchase status by its name, only
+        querying the database when the name is not in the registry yet.
+
+        Args:
+            db (AsyncSession): Database async session.
+            name (str): Name of the purchase status.
+
+        Raises:
+            ValueError: If there is no purchase status with this name.
+
+        Returns:
+            int: id of status.
+        """
+        status_id = self.get_id(name)
+        if status_id is None:
+            await self.load(db)
+            status_id = self.get_id(name)
+        if status_id is None:
+            raise ValueError(f"Purchase status '{name}' does not exist.")
+        return status_id
+
+    async def resolve_name(self, db: AsyncSession, id: int) -> str:
+        """
+        Method that get the name of a purchase status by its id, only
+        querying the database when the id is not in the registry yet.
+
+        Raises:
+            ValueError: If there is no purchase status with this id.
+        """
+        name = self.get_name(id)
+        if name is None:
+            await self.load(db)
+            name = self.get_name(id)
+        if name is None:
+            raise ValueError(f"Purchase status {id} does not exist.")
+        return name
+
+
 purchase_status = CrudPurchaseStatus()
+purchase_status_registry = PurchaseStatusRegistry()
+invalidation_bus.subscribe(
+    "purchase_status", lambda entry: purchase_status_registry.register(**entry)
+)
@@ -0,0 +1,126 @@
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.core.config import settings
+
+
+class InvalidRefreshTokenError(Exception):
+    """
+    Raised when a refresh token is unknown, expired or revoked.
+    """
+
+
+class RefreshTokenReuseError(InvalidRefreshTokenError):
+    """
+    Raised when an already used refresh token is presented again. It means
+    the token was probably stolen, so its whole family is revoked.
+    """
+
+
+class CrudRefreshToken:
+    """
+    Class responsible for the refresh tokens, which renew the access token
+    without the password (and so without a bcrypt verify).
+
+    The tokens are opaque random strings and only their sha256 is stored.
+    A slow hash isn't needed because they have 256 bits of entropy. Each
+    token can be used once: using it issues a new token of the same family
+    (rotation), and using it again revokes the family (reuse detection).
+    """
+
+    @staticmethod
+    def hash_token(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _add(
+        self, db: AsyncSession, user_id: int, family_id: Optional[str]
+    ) -> str:
+        token = secrets.token_urlsafe(32)
+        db.add(
+            models.RefreshToken(
+                token_hash=self.hash_token(token),
+                family_id=family_id or uuid.uuid4().hex,
+                user_id=user_id,
+                expires_at=datetime.utcnow()
+                + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+            )
+        )
+        return token
+
+    async def get_by_token(
+        self, db: AsyncSession, token: str
+    ) -> Optional[models.RefreshToken]:
+        # populate_existing, so a token already in the session is refreshed
+        # with its current used/revoked state.
+        result = await db.execute(
+            select(models.RefreshToken)
+            .where(models.RefreshToken.token_hash == self.hash_token(token))
+            .execution_options(populate_existing=True)
+        )
+        return result.scalar()
+
+    async def issue(self, db: AsyncSession, user_id: int) -> str:
+        """
+        Method that issues the first refresh token of a new family (e.g.
+        at the login) and returns it.
+        """
+        token = self._add(db, user_id, family_id=None)
+        await db.commit()
+        return token
+
+    async def revoke_family(self, db: AsyncSession, family_id: str) -> None:
+        await db.execute(
+            update(models.RefreshToken)
+            .where(
+                models.RefreshToken.family_id == family_id,
+                models.RefreshToken.revoked_at.is_(None),
+            )
+            .values(revoked_at=datetime.utcnow())
+        )
+        await db.commit()
+
+    async def rotate(self, db: AsyncSession, token: str) -> Tuple[str, int]:
+        """
+        Method that uses a refresh token, returning a new refresh token of
+        the same family and the id of its user.
+
+        Raises:
+            InvalidRefreshTokenError: If the token is unknown, expired or
+            revoked.
+            RefreshTokenReuseError: If the token was already used (the
+            family is revoked).
+        """
+        db_token = await self.get_by_token(db, token)
+        now = datetime.utcnow()
+        if (
+            not db_token
+            or db_token.revoked_at is not None
+            or db_token.expires_at <= now
+        ):
+            raise InvalidRefreshTokenError("Invalid refresh token.")
+        # conditional update, so only one of concurrent uses can win
+        result = await db.execute(
+            update(models.RefreshToken)
+            .where(
+                models.RefreshToken.id == db_token.id,
+                models.RefreshToken.used_at.is_(None),
+            )
+            .values(used_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            await self.revoke_family(db, db_token.family_id)
+            raise RefreshTokenReuseError("Refresh token reused.")
+        new_token = self._add(db, db_token.user_id, db_token.family_id)
+        await db.commit()
+        return new_token, db_token.user_id
+
+
+refresh_token = CrudRefreshToken()
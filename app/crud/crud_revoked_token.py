@@ -0,0 +1,230 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.core.bloom import BloomFilter
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.database.invalidation import invalidation_bus
+from app.database.session import async_session
+
+logger = logging.getLogger(__name__)
+
+
+class CrudRevokedToken:
+    async def create(
+        self,
+        db: AsyncSession,
+        *,
+        jti: str,
+        expires_at: datetime,
+        user_id: Optional[int] = None,
+    ) -> None:
+        db.add(
+            models.RevokedToken(
+                jti=jti, expires_at=expires_at, user_id=user_id
+            )
+        )
+        # the other workers add it to their revocation list right away
+        await invalidation_bus.publish(db, "revoked_token", jti)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # already revoked
+            await db.rollback()
+
+    async def exists(self, db: AsyncSession, jti: str) -> bool:
+        result = await db.execute(
+            select(models.RevokedToken.jti).where(
+                models.RevokedToken.jti == jti
+            )
+        )
+        return result.scalar() is not None
+
+    async def get_active_jtis(self, db: AsyncSession) -> List[str]:
+        result = await db.execute(
+            select(models.RevokedToken.jti).where(
+                models.RevokedToken.expires_at > datetime.utcnow()
+            )
+        )
+        return result.scalars().all()
+
+    async def delete_expired(self, db: AsyncSession) -> None:
+        # an expired token is rejected anyway, so it can leave the list
+        await db.execute(
+            delete(models.RevokedToken).where(
+                models.RevokedToken.expires_at <= datetime.utcnow()
+            )
+        )
+        await db.commit()
+
+
+class TokenRevocationList:
+    """
+    Process level list of the revoked tokens (by "jti").
+
+    The revoked jtis are kept in a Bloom filter, so the check of a token
+    that was not revoked (nearly every request) is done in memory. Only a
+    probable hit is confirmed in the database, as the filter has false
+    positives.
+
+    The filter is rebuilt from the database periodically (dropping the
+    expired tokens), and the tokens revoked by any worker are added to it
+    right away through the invalidation bus. The jtis added while a
+    rebuild reads the database are buffered and added to the new filter,
+    and the filter is rebuilt when the bus reconnects, as the revocations
+    published while it was disconnected were lost.
+    """
+
+    def __init__(
+        self,
+        *,
+        capacity: int,
+        error_rate: float,
+        rebuild_interval: float,
+    ) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self._bloom: Optional[BloomFilter] = None
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self._reset_task: Optional[asyncio.Task] = None
+        # one buffer per rebuild in progress
+        self._buffers: List[List[str]] = []
+        self.checks = 0
+        self.probable_hits = 0
+        self.false_positives = 0
+        self.rebuilds = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._bloom is not None
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        # the jtis added while the database is read may not be in the read
+        # rows, so they are buffered to be added to the new filter too.
+        buffer: List[str] = []
+        self._buffers.append(buffer)
+        try:
+            jtis = await revoked_token.get_active_jtis(db)
+            bloom = BloomFilter.from_items(
+                jtis,
+                # room to grow until the next rebuild
+                capacity=max(self.capacity, len(jtis) * 2),
+                error_rate=self.error_rate,
+            )
+            for jti in buffer:
+                bloom.add(jti)
+        finally:
+            self._buffers.remove(buffer)
+        # replaced at once, like the purchase status registry
+        self._bloom = bloom
+        self.rebuilds += 1
+
+    def add(self, jti: str) -> None:
+        for buffer in self._buffers:
+            buffer.append(jti)
+        if self._bloom is not None:
+            self._bloom.add(jti)
+
+    async def _rebuild_now(self) -> None:
+        try:
+            async with async_session() as db:
+                await self.rebuild(db)
+        except Exception:
+            logger.exception("Could not rebuild the revocation list")
+
+    def on_bus_reset(self) -> None:
+        # the bus reconnected: the revocations published meanwhile were
+        # lost, so the filter is rebuilt from the database.
+        if self._bloom is None:
+            return
+        self._reset_task = asyncio.get_running_loop().create_task(
+            self._rebuild_now()
+        )
+
+    async def is_revoked(self, jti: str) -> bool:
+        self.checks += 1
+        if self._bloom is None:
+            async with async_session() as db:
+                await self.rebuild(db)
+        if jti not in self._bloom:
+            return False
+        self.probable_hits += 1
+        async with async_session() as db:
+            revoked = await revoked_token.exists(db, jti)
+        if not revoked:
+            self.false_positives += 1
+        return revoked
+
+    async def revoke(
+        self,
+        db: AsyncSession,
+        *,
+        jti: str,
+        expires_at: datetime,
+        user_id: Optional[int] = None,
+    ) -> None:
+        await revoked_token.create(
+            db, jti=jti, expires_at=expires_at, user_id=user_id
+        )
+        self.add(jti)
+
+    async def _rebuild_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.rebuild_interval)
+            try:
+                async with async_session() as db:
+                    await revoked_token.delete_expired(db)
+            except Exception:
+                logger.exception("Could not delete the expired tokens")
+            await self._rebuild_now()
+
+    async def start(self, db: AsyncSession) -> None:
+        await self.rebuild(db)
+        if self._rebuild_task is None:
+            self._rebuild_task = asyncio.create_task(
+                self._rebuild_periodically()
+            )
+
+    async def stop(self) -> None:
+        for task in (self._rebuild_task, self._reset_task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._rebuild_task = None
+        self._reset_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "bloom": self._bloom.stats() if self._bloom else None,
+            "checks": self.checks,
+            "probable_hits": self.probable_hits,
+            "false_positives": self.false_positives,
+            "rebuilds": self.rebuilds,
+        }
+
+
+revoked_token = CrudRevokedToken()
+token_revocation_list = TokenRevocationList(
+    capacity=settings.TOKEN_REVOCATION_BLOOM_CAPACITY,
+    error_rate=settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE,
+    rebuild_interval=settings.TOKEN_REVOCATION_REBUILD_INTERVAL,
+)
+metrics.register("token_revocation_list", token_revocation_list.stats)
+invalidation_bus.subscribe(
+    "revoked_token",
+    token_revocation_list.add,
+    on_reset=token_revocation_list.on_bus_reset,
+)
@@ -1,18 +1,79 @@
-from typing import Any, Dict, List, Optional, Union
+from collections import OrderedDict
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    NoReturn,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
-from sqlalchemy import select
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import Select
 
 from app import models, schemas
-from app.core.security import get_password_hash, verify_password
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.security import (
+    async_get_password_hash,
+    async_verify_and_update_password,
+)
+from app.database.errors import is_index_violation, is_unique_violation
+from app.database.invalidation import invalidation_bus
+
+
+class UserAlreadyExistsError(Exception):
+    """
+    Raised when the email or the cpf of an user already belongs to another
+    user. The field is "email" or "cpf".
+    """
+
+    def __init__(self, field: str) -> None:
+        super().__init__(f"Already exists an user with this {field}.")
+        self.field = field
 
 
 class CrudUser:
+    def __init__(self, cache: TTLCache) -> None:
+        # snapshots of the users, keyed by ("id", id), ("cpf", cpf) and
+        # ("email", lowercased email). See the get_cached_by_* methods.
+        self.cache = cache
+        # the last invalidation of each key (from a counter, so a fetch
+        # can tell if its key was invalidated while it ran). Bounded like
+        # the cache: the oldest ones are dropped first, and a key without
+        # its own is taken as invalidated by the last one dropped.
+        self._invalidations: "OrderedDict[Tuple[str, Any], int]" = (
+            OrderedDict()
+        )
+        self._invalidation_count = 0
+        self._dropped_invalidation = 0
+
+    # relationships are not loaded by default (see models.User), so the
+    # methods that may need them have to opt in explicitly.
+    def _select_user(self, load_purchases: bool = False) -> Select:
+        query = select(models.User)
+        if load_purchases:
+            query = query.options(selectinload(models.User.purchases_))
+        return query
+
     async def get_by_id(
-        self, db: AsyncSession, id: Union[int, str]
+        self,
+        db: AsyncSession,
+        id: Union[int, str],
+        load_purchases: bool = False,
     ) -> Optional[models.User]:
         result = await db.execute(
-            select(models.User).where(models.User.id == id)
+            self._select_user(load_purchases).where(models.User.id == id)
         )
         return result.scalar()
 
@@ -25,21 +86,108 @@ class CrudUser:
         return result.scalars().unique().all()
 
     async def get_by_email(
-        self, db: AsyncSession, email: str
+        self, db: AsyncSession, email: str, load_purchases: bool = False
     ) -> Optional[models.User]:
+        # case insensitive, as the login (served by ix_user_email_lower)
         result = await db.execute(
-            select(models.User).where(models.User.email == email)
+            self._select_user(load_purchases).where(
+                func.lower(models.User.email) == email.lower()
+            )
         )
         return result.scalar()
 
     async def get_by_cpf(
-        self, db: AsyncSession, cpf: str
+        self, db: AsyncSession, cpf: str, load_purchases: bool = False
     ) -> Optional[models.User]:
         result = await db.execute(
-            select(models.User).where(models.User.cpf == cpf)
+            self._select_user(load_purchases).where(models.User.cpf == cpf)
         )
         return result.scalar()
 
+    def _cache_snapshot(
+        self, user: models.User, fetched_after: int
+    ) -> schemas.UserSnapshot:
+        # a key invalidated after the fetch started (fetched_after is the
+        # invalidation count then) may have been read before the write, so
+        # the snapshot is returned but not cached under it.
+        snapshot = schemas.UserSnapshot.from_orm(user)
+        for key in self._cache_keys(snapshot):
+            invalidation = self._invalidations.get(
+                key, self._dropped_invalidation
+            )
+            if invalidation <= fetched_after:
+                self.cache.set(key, snapshot)
+        return snapshot
+
+    def _cache_keys(self, user: Any) -> List[Tuple[str, Any]]:
+        return [
+            ("id", user.id),
+            ("cpf", user.cpf),
+            ("email", user.email.lower()),
+        ]
+
+    def invalidate_cache(self, keys: List[Tuple[str, Any]]) -> None:
+        # the keys may come from other workers (see invalidation_bus) as
+        # lists, since they are sent as JSON.
+        self._invalidation_count += 1
+        for key in keys:
+            key = tuple(key)
+            self.cache.invalidate(key)
+            self._invalidations[key] = self._invalidation_count
+            self._invalidations.move_to_end(key)
+        while len(self._invalidations) > self.cache.max_entries:
+            _, self._dropped_invalidation = self._invalidations.popitem(
+                last=False
+            )
+
+    def clear_cache(self) -> None:
+        # every key is invalidated, e.g. when invalidations from the other
+        # workers may have been missed (see invalidation_bus)
+        self._invalidation_count += 1
+        self.cache.clear()
+        self._invalidations.clear()
+        self._dropped_invalidation = self._invalidation_count
+
+    async def _get_cached(
+        self,
+        key: Tuple[str, Any],
+        fetch: Callable[[], Awaitable[Optional[models.User]]],
+    ) -> Optional[schemas.UserSnapshot]:
+        snapshot = self.cache.get(key)
+        if snapshot is not None:
+            return snapshot
+        fetched_after = self._invalidation_count
+        user = await fetch()
+        if not user:
+            return None
+        return self._cache_snapshot(user, fetched_after)
+
+    # the get_cached_by_* methods return immutable snapshots (without the
+    # password hash) instead of ORM entities, so nothing bound to a session
+    # is shared between requests. They are kept up to date by update and
+    # delete_by_id.
+    async def get_cached_by_id(
+        self, db: AsyncSession, id: Union[int, str]
+    ) -> Optional[schemas.UserSnapshot]:
+        return await self._get_cached(
+            ("id", int(id)), lambda: self.get_by_id(db=db, id=id)
+        )
+
+    async def get_cached_by_cpf(
+        self, db: AsyncSession, cpf: str
+    ) -> Optional[schemas.UserSnapshot]:
+        return await self._get_cached(
+            ("cpf", cpf), lambda: self.get_by_cpf(db=db, cpf=cpf)
+        )
+
+    async def get_cached_by_email(
+        self, db: AsyncSession, email: str
+    ) -> Optional[schemas.UserSnapshot]:
+        return await self._get_cached(
+            ("email", email.lower()),
+            lambda: self.get_by_email(db=db, email=email),
+        )
+
     async def create(
         self,
         db: AsyncSession,
@@ -50,14 +198,90 @@ class CrudUser:
         else:
             user_data = user_in.dict()
         if user_data.get("password"):
-            hashed_password = get_password_hash(user_data.pop("password"))
+            hashed_password = await async_get_password_hash(
+                user_data.pop("password")
+            )
             user_data["hashed_password"] = hashed_password
         db_user = models.User(**user_data)
         db.add(db_user)
-        await db.commit()
+        await self._commit_unique(db)
         await db.refresh(db_user)
         return db_user
 
+    async def _commit_unique(self, db: AsyncSession) -> None:
+        # the unique indexes are the check, instead of querying the email
+        # and cpf before, which is racy and costs the queries. The emails
+        # are unique case insensitively (as the login), by the lowercased
+        # email index.
+        try:
+            await db.commit()
+        except IntegrityError as exc:
+            await db.rollback()
+            self._raise_already_exists(exc)
+
+    @staticmethod
+    def _raise_already_exists(exc: IntegrityError) -> NoReturn:
+        # the IntegrityError as an UserAlreadyExistsError, when raised by
+        # the email or the cpf unique indexes. Any other one is re-raised.
+        if is_index_violation(exc, "ix_user_email_lower"):
+            raise UserAlreadyExistsError("email") from exc
+        for field in ("email", "cpf"):
+            if is_unique_violation(exc, models.User.__table__.c[field]):
+                raise UserAlreadyExistsError(field) from exc
+        raise exc
+
+    async def get_taken_emails_and_cpfs(
+        self, db: AsyncSession, emails: Sequence[str], cpfs: Sequence[str]
+    ) -> Tuple[Set[str], Set[str]]:
+        """
+        Method that returns which of the emails (lowercased, as the login
+        is case insensitive) and cpfs already belong to an user, with a
+        single query for all of them.
+        """
+        if not emails and not cpfs:
+            return set(), set()
+        lower_emails = {email.lower() for email in emails}
+        result = await db.execute(
+            select(models.User.email, models.User.cpf).where(
+                or_(
+                    func.lower(models.User.email).in_(lower_emails),
+                    models.User.cpf.in_(set(cpfs)),
+                )
+            )
+        )
+        rows = result.all()
+        taken_emails = {row.email.lower() for row in rows} & lower_emails
+        taken_cpfs = {row.cpf for row in rows} & set(cpfs)
+        return taken_emails, taken_cpfs
+
+    async def create_many(
+        self, db: AsyncSession, users_data: List[Dict[str, Any]]
+    ) -> List[int]:
+        """
+        Method that inserts the users (with their hashed_password already
+        computed) with a single multi-row statement and returns their ids,
+        in the same order.
+
+        Raises:
+            UserAlreadyExistsError: If any of the users is not unique.
+            Nothing is inserted (the session is rolled back).
+        """
+        if not users_data:
+            return []
+        try:
+            await db.execute(insert(models.User).values(users_data))
+            await db.commit()
+        except IntegrityError as exc:
+            await db.rollback()
+            self._raise_already_exists(exc)
+        result = await db.execute(
+            select(models.User.id, models.User.email).where(
+                models.User.email.in_([data["email"] for data in users_data])
+            )
+        )
+        ids = {row.email: row.id for row in result}
+        return [ids[data["email"]] for data in users_data]
+
     async def update(
         self,
         db: AsyncSession,
@@ -73,13 +297,20 @@ class CrudUser:
         else:
             update_data = user_in.dict(exclude_unset=True)
         if update_data.get("password"):
-            hashed_password = get_password_hash(update_data.pop("password"))
+            hashed_password = await async_get_password_hash(
+                update_data.pop("password")
+            )
             update_data["hashed_password"] = hashed_password
+        # the old cpf and email keys must not point to the user anymore
+        stale_keys = self._cache_keys(db_user)
         for field, value in update_data.items():
             if hasattr(db_user, field):
                 setattr(db_user, field, value)
-        await db.commit()
+        stale_keys += self._cache_keys(db_user)
+        await invalidation_bus.publish(db, "user", stale_keys)
+        await self._commit_unique(db)
         await db.refresh(db_user)
+        self.invalidate_cache(stale_keys)
         return db_user
 
     async def delete_by_id(
@@ -88,19 +319,79 @@ class CrudUser:
         user = await self.get_by_id(db=db, id=id)
         if not user:
             return None
+        stale_keys = self._cache_keys(user)
         await db.delete(user)
+        await invalidation_bus.publish(db, "user", stale_keys)
         await db.commit()
+        self.invalidate_cache(stale_keys)
         return user
 
+    async def get_credentials_by_email(
+        self, db: AsyncSession, email: str
+    ) -> Optional[Row]:
+        # only the columns needed to authenticate (and to sign the token
+        # claims), without hydrating an ORM entity. The lookup is case
+        # insensitive and is served by the ix_user_email_lower index (see
+        # models.User).
+        result = await db.execute(
+            select(
+                models.User.id, models.User.cpf, models.User.hashed_password
+            ).where(func.lower(models.User.email) == email.lower())
+        )
+        return result.first()
+
     async def get_authenticated_user(
         self, db: AsyncSession, user_email: str, user_password: str
-    ) -> Optional[models.User]:
-        user = await self.get_by_email(db=db, email=user_email)
-        if not user:
+    ) -> Optional[Row]:
+        credentials = await self.get_credentials_by_email(
+            db=db, email=user_email
+        )
+        if not credentials:
             return None
-        if not verify_password(user_password, user.hashed_password):
+        verified, new_hash = await async_verify_and_update_password(
+            user_password, credentials.hashed_password
+        )
+        if not verified:
             return None
-        return user
+        if new_hash:
+            await self.update_password_hash(
+                db=db,
+                id=credentials.id,
+                old_hash=credentials.hashed_password,
+                new_hash=new_hash,
+            )
+        return credentials
+
+    async def update_password_hash(
+        self, db: AsyncSession, id: int, old_hash: str, new_hash: str
+    ) -> None:
+        """
+        Method that replaces an outdated hash (other scheme or cost) with
+        its new hash, so the cost can be re-tuned without a migration.
+
+        The update only applies if the hash wasn't changed meanwhile (e.g.
+        by a password change). The cached snapshots don't have the hash,
+        so they don't need to be invalidated.
+        """
+        await db.execute(
+            update(models.User)
+            .where(
+                models.User.id == id,
+                models.User.hashed_password == old_hash,
+            )
+            .values(hashed_password=new_hash)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
 
 
-user = CrudUser()
+user = CrudUser(
+    cache=TTLCache(
+        ttl=settings.USER_CACHE_TTL,
+        max_entries=settings.USER_CACHE_MAX_ENTRIES,
+    )
+)
+metrics.register("user_cache", user.cache.stats)
+invalidation_bus.subscribe(
+    "user", user.invalidate_cache, on_reset=user.clear_cache
+)
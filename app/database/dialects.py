@@ -0,0 +1,14 @@
+from typing import Any
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def insert_on_conflict(db: AsyncSession, table: Any) -> Any:
+    """
+    Function that returns the INSERT of the session's dialect, which
+    supports on_conflict_do_update (PostgreSQL, and SQLite in the tests).
+    """
+    if db.bind.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
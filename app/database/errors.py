@@ -0,0 +1,35 @@
+from sqlalchemy import Column
+from sqlalchemy.exc import IntegrityError
+
+
+def is_index_violation(exc: IntegrityError, name: str) -> bool:
+    """
+    Function that tells if the error was raised by the unique index with
+    this name, e.g. an expression index, which has no column to check.
+
+    PostgreSQL reports the index name ('... violates unique constraint
+    "ix_user_email_lower"') and SQLite too ("UNIQUE constraint failed:
+    index 'ix_user_email_lower'").
+    """
+    message = str(exc.orig)
+    return f'"{name}"' in message or f"index '{name}'" in message
+
+
+def is_unique_violation(exc: IntegrityError, column: Column) -> bool:
+    """
+    Function that tells if the error was raised by the unique index of the
+    column (created with "index=True, unique=True", so named ix_<table>_<
+    column>) or by the primary key, when the column is the primary key.
+
+    PostgreSQL reports the index name ('... violates unique constraint
+    "ix_user_cpf"') and SQLite the column ("UNIQUE constraint failed:
+    user.cpf"), so both are checked.
+    """
+    message = str(exc.orig)
+    table, name = column.table.name, column.name
+    if f"UNIQUE constraint failed: {table}.{name}" in message:
+        return True
+    if f'"ix_{table}_{name}"' in message:
+        return True
+    primary_key = list(column.table.primary_key.columns)
+    return primary_key == [column] and f'"{table}_pkey"' in message
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Any], None]
+ResetHandler = Callable[[], None]
+
+
+class InvalidationBus:
+    """
+    Class responsible for keeping the per-process caches consistent across
+    the workers (or pods) of the application.
+
+    The CRUD writes publish what they changed with NOTIFY, inside their own
+    transaction, so the message is only delivered if the write commits.
+    Every process listens to the channel on a dedicated asyncpg connection
+    and dispatches the messages to the handlers subscribed to its topic.
+
+    While the listener is disconnected the messages are lost, so the
+    "on_reset" handlers are called every time it (re)connects.
+
+    On any database other than PostgreSQL (e.g. SQLite in the tests) the
+    bus is a no-op, as there is a single process.
+    """
+
+    def __init__(
+        self, *, url: str, channel: str, reconnect_delay: float = 1.0
+    ) -> None:
+        self.url = make_url(url)
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.enabled = self.url.get_backend_name() == "postgresql"
+        # the messages published by this process were already applied
+        self._origin = uuid.uuid4().hex
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._reset_handlers: List[ResetHandler] = []
+        self._listener_task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.received = 0
+        self.connections = 0
+
+    def subscribe(
+        self,
+        topic: str,
+        handler: Handler,
+        on_reset: Optional[ResetHandler] = None,
+    ) -> None:
+        self._handlers.setdefault(topic, []).append(handler)
+        if on_reset is not None:
+            self._reset_handlers.append(on_reset)
+
+    async def publish(
+        self, db: AsyncSession, topic: str, payload: Any
+    ) -> None:
+        """
+        Method that publishes an invalidation in the transaction of the
+        session, so it must be called before the commit.
+        """
+        if not self.enabled:
+            return
+        message = json.dumps(
+            {"origin": self._origin, "topic": topic, "payload": payload},
+            default=str,
+        )
+        await db.execute(select(func.pg_notify(self.channel, message)))
+        self.published += 1
+
+    def dispatch(self, message: str) -> None:
+        data = json.loads(message)
+        if data["origin"] == self._origin:
+            return
+        self.received += 1
+        for handler in self._handlers.get(data["topic"], []):
+            try:
+                handler(data["payload"])
+            except Exception:
+                logger.exception("Invalidation handler failed: %s", message)
+
+    def reset(self) -> None:
+        for on_reset in self._reset_handlers:
+            on_reset()
+
+    def _on_notification(
+        self, connection: Any, pid: int, channel: str, payload: str
+    ) -> None:
+        self.dispatch(payload)
+
+    async def _listen(self) -> None:
+        # asyncpg is only required when the database is PostgreSQL
+        import asyncpg
+
+        dsn = self.url.set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        while True:
+            try:
+                connection = await asyncpg.connect(dsn)
+            except (OSError, asyncpg.PostgresError):
+                logger.exception("Invalidation listener could not connect")
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            closed = asyncio.Event()
+            connection.add_termination_listener(lambda _: closed.set())
+            try:
+                await connection.add_listener(
+                    self.channel, self._on_notification
+                )
+                self.connections += 1
+                # what was published while disconnected was lost
+                self.reset()
+                await closed.wait()
+            finally:
+                if not connection.is_closed():
+                    await connection.close()
+            logger.warning("Invalidation listener disconnected")
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def start(self) -> None:
+        if not self.enabled or self._listener_task is not None:
+            return
+        self._listener_task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener_task is None:
+            return
+        self._listener_task.cancel()
+        try:
+            await self._listener_task
+        except asyncio.CancelledError:
+            pass
+        self._listener_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "listening": self._listener_task is not None
+            and not self._listener_task.done(),
+            "published": self.published,
+            "received": self.received,
+            "connections": self.connections,
+        }
+
+
+invalidation_bus = InvalidationBus(
+    url=settings.SQLALCHEMY_DB_URL,
+    channel=settings.CACHE_INVALIDATION_CHANNEL,
+)
+metrics.register("invalidation_bus", invalidation_bus.stats)
@@ -0,0 +1,38 @@
+from typing import Iterable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# namespaces of the advisory locks (their first key), so the locks of
+# different features never collide.
+CASHBACK_LOCK_NAMESPACE = 1
+PARTITION_LOCK_NAMESPACE = 2
+
+
+async def advisory_xact_lock(
+    db: AsyncSession, namespace: int, key: int
+) -> None:
+    """
+    Function that takes a PostgreSQL advisory lock, released at the end of
+    the transaction of the session. SQLite (in the tests) serializes the
+    write transactions, so there it does nothing.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return
+    await db.execute(
+        text("SELECT pg_advisory_xact_lock(:namespace, :key)"),
+        {"namespace": namespace, "key": key},
+    )
+
+
+async def lock_user_cashback(
+    db: AsyncSession, user_ids: Iterable[int]
+) -> None:
+    """
+    Function that locks the cashback aggregates (balances and rollups) of
+    the users until the end of the transaction, so their deltas and their
+    rebuilds don't interleave. The users are locked in order, so two
+    transactions can't deadlock.
+    """
+    for user_id in sorted(set(user_ids)):
+        await advisory_xact_lock(db, CASHBACK_LOCK_NAMESPACE, user_id)
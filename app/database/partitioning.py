@@ -0,0 +1,188 @@
+import asyncio
+import logging
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.months import add_months, month_start
+from app.database.locks import PARTITION_LOCK_NAMESPACE, advisory_xact_lock
+from app.database.session import async_session
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLE = "purchase"
+DEFAULT_PARTITION = "purchase_default"
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITIONED_TABLE}_p{month:%Y_%m}"
+
+
+def create_default_partition_statement() -> str:
+    """
+    Function that returns the statement that creates the default partition,
+    which takes the rows of the months without a partition yet.
+    """
+    return (
+        f"CREATE TABLE {DEFAULT_PARTITION} "
+        f"PARTITION OF {PARTITIONED_TABLE} DEFAULT"
+    )
+
+
+def create_partition_statements(month: date) -> List[str]:
+    """
+    Function that returns the statements that create the partition of the
+    month. The rows of the month that went to the default partition (as
+    its partition didn't exist yet) are moved to it, as a partition can't
+    be attached while the default one has rows of its range (the default
+    partition is locked, so no row of the month is inserted meanwhile).
+    """
+    name = partition_name(month)
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    return [
+        f"CREATE TABLE {name} (LIKE {PARTITIONED_TABLE} "
+        "INCLUDING DEFAULTS INCLUDING CONSTRAINTS)",
+        f"LOCK TABLE {DEFAULT_PARTITION} IN ACCESS EXCLUSIVE MODE",
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+        f"WHERE date >= '{start}' AND date < '{end}' RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved",
+        f"ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{start}') TO ('{end}')",
+    ]
+
+
+async def is_partitioned(db: AsyncSession) -> bool:
+    result = await db.execute(
+        text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass(:table))"
+        ),
+        {"table": PARTITIONED_TABLE},
+    )
+    return result.scalar()
+
+
+async def get_partition_names(db: AsyncSession) -> List[str]:
+    result = await db.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = CAST(:table AS regclass)"
+        ),
+        {"table": PARTITIONED_TABLE},
+    )
+    return result.scalars().all()
+
+
+async def ensure_purchase_partitions(
+    db: AsyncSession,
+    *,
+    months_ahead: int = settings.PURCHASE_PARTITION_MONTHS_AHEAD,
+    today: Optional[date] = None,
+) -> List[str]:
+    """
+    Function that creates the missing partitions of the purchase table,
+    from the current month to months_ahead months after it, and returns
+    their names. The default partition is created too if it's missing.
+    The purchase table is only partitioned on PostgreSQL, by the migration
+    b8e4d1a6c3f9, so on other databases (e.g. SQLite in the tests) and on
+    a table that isn't partitioned (e.g. built by create_all) it does
+    nothing.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return []
+    # serializes the partition creation of the workers. The lock is
+    # released by the commit.
+    await advisory_xact_lock(db, PARTITION_LOCK_NAMESPACE, 0)
+    if not await is_partitioned(db):
+        await db.commit()
+        logger.warning(
+            f"The {PARTITIONED_TABLE} table isn't partitioned, run the "
+            "migrations to partition it"
+        )
+        return []
+    existing = set(await get_partition_names(db))
+    created = []
+    # the new partitions take the rows of their months from it
+    if DEFAULT_PARTITION not in existing:
+        await db.execute(text(create_default_partition_statement()))
+        created.append(DEFAULT_PARTITION)
+    current = month_start(today or date.today())
+    for months in range(months_ahead + 1):
+        month = add_months(current, months)
+        if partition_name(month) in existing:
+            continue
+        for statement in create_partition_statements(month):
+            await db.execute(text(statement))
+        created.append(partition_name(month))
+    await db.commit()
+    return created
+
+
+class PurchasePartitionMaintainer:
+    """
+    Process level task that creates the future partitions of the purchase
+    table ahead of time, at the startup and then periodically, so the
+    purchases of a new month don't go to the default partition.
+    """
+
+    def __init__(self, *, months_ahead: int, check_interval: float) -> None:
+        self.months_ahead = months_ahead
+        self.check_interval = check_interval
+        self._task: Optional[asyncio.Task] = None
+        self.checks = 0
+        self.created = 0
+
+    async def run(self, db: AsyncSession) -> List[str]:
+        created = await ensure_purchase_partitions(
+            db, months_ahead=self.months_ahead
+        )
+        self.checks += 1
+        self.created += len(created)
+        if created:
+            logger.info(f"Created the purchase partitions {created}")
+        return created
+
+    async def _run_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                async with async_session() as db:
+                    await self.run(db)
+            except Exception:
+                logger.exception("Could not create the purchase partitions")
+
+    async def start(self, db: AsyncSession) -> None:
+        if db.bind.dialect.name != "postgresql":
+            return
+        await self.run(db)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "checks": self.checks,
+            "created": self.created,
+        }
+
+
+purchase_partition_maintainer = PurchasePartitionMaintainer(
+    months_ahead=settings.PURCHASE_PARTITION_MONTHS_AHEAD,
+    check_interval=settings.PURCHASE_PARTITION_CHECK_INTERVAL,
+)
+metrics.register("purchase_partitions", purchase_partition_maintainer.stats)
@@ -50,16 +50,14 @@ class PurchaseDomain:
         Returns:
             int: id of status.
         """
-        user = await crud.user.get_by_id(db=db, id=purchase_user_id)
+        user = await crud.user.get_cached_by_id(db=db, id=purchase_user_id)
         if user.cpf == "15350946056":
-            status = await crud.purchase_status.get_by_name(
-                db=db, name=schemas.statusEnum.APPROVED
-            )
+            status_name = schemas.statusEnum.APPROVED
         else:
-            status = await crud.purchase_status.get_by_name(
-                db=db, name=schemas.statusEnum.IN_VALIDATION
-            )
-        return status.id
+            status_name = schemas.statusEnum.IN_VALIDATION
+        return await crud.purchase_status_registry.resolve_id(
+            db=db, name=status_name
+        )
 
 
 purchase = PurchaseDomain()
@@ -3,8 +3,14 @@ from typing import Any
 from fastapi import FastAPI
 from mangum import Mangum
 
+from app import crud
 from app.api.api_v1.api import api_v1_router
 from app.core.config import settings
+from app.core.http_client import shared_async_client
+from app.core.security import bulk_password_hash_pool, password_hash_pool
+from app.database.invalidation import invalidation_bus
+from app.database.partitioning import purchase_partition_maintainer
+from app.database.session import async_session
 
 app = FastAPI(title="CashbackGB", root_path=settings.STAGE)
 
@@ -16,4 +22,58 @@ def im_alive() -> Any:
     return "Hi, I'm alive!"
 
 
+@app.on_event("startup")
+async def load_purchase_status_registry() -> None:
+    async with async_session() as db:
+        await crud.purchase_status_registry.load(db)
+
+
+@app.on_event("startup")
+async def start_token_revocation_list() -> None:
+    async with async_session() as db:
+        await crud.token_revocation_list.start(db)
+
+
+@app.on_event("startup")
+async def start_purchase_partition_maintainer() -> None:
+    async with async_session() as db:
+        await purchase_partition_maintainer.start(db)
+
+
+@app.on_event("startup")
+def start_shared_async_client() -> None:
+    shared_async_client.start()
+
+
+@app.on_event("startup")
+async def start_invalidation_bus() -> None:
+    await invalidation_bus.start()
+
+
+@app.on_event("shutdown")
+async def stop_invalidation_bus() -> None:
+    await invalidation_bus.stop()
+
+
+@app.on_event("shutdown")
+async def stop_token_revocation_list() -> None:
+    await crud.token_revocation_list.stop()
+
+
+@app.on_event("shutdown")
+async def stop_purchase_partition_maintainer() -> None:
+    await purchase_partition_maintainer.stop()
+
+
+@app.on_event("shutdown")
+def shutdown_password_hash_pool() -> None:
+    password_hash_pool.shutdown()
+    bulk_password_hash_pool.shutdown()
+
+
+@app.on_event("shutdown")
+async def close_shared_async_client() -> None:
+    await shared_async_client.close()
+
+
 handler = Mangum(app)
@@ -1,3 +1,8 @@
 from .purchase import Purchase
+from .purchase_code import PurchaseCode
 from .purchase_status import PurchaseStatus
+from .refresh_token import RefreshToken
+from .revoked_token import RevokedToken
 from .user import User
+from .user_cashback_balance import UserCashbackBalance
+from .user_cashback_monthly import UserCashbackMonthly
@@ -5,6 +5,7 @@ from sqlalchemy import (
     Date,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
@@ -18,13 +19,22 @@ from app.database.base import Base
 # resources) to calculate the cashback value of each purchase.
 # And in the reverse scenario (sum of the percentages) it makes no sense.
 
+# On PostgreSQL the table is partitioned by month of the date by the
+# migration b8e4d1a6c3f9 (see app.database.partitioning), so the date is part
+# of its primary key there and the code is unique through the purchase_code
+# table (a partitioned table can't have a unique index without the date).
+# The model declares the id alone as the primary key of the table, as SQLite
+# (in the tests and the benchmarks) can't autoincrement a composite one, but
+# the mapper identifies a purchase by (id, date): the updates and deletes of
+# the ORM filter on the date too, so they only touch its partition.
+
 
 class Purchase(Base):
 
     __tablename__ = "purchase"
 
     id = Column(Integer, primary_key=True, index=True)
-    code = Column(String, index=True, unique=True, nullable=False)
+    code = Column(String, nullable=False)
     value = Column(Numeric, nullable=False)
     date = Column(Date, nullable=False)
     cashback_value = Column(Numeric, nullable=False)
@@ -43,4 +53,22 @@ class Purchase(Base):
     )
     user_ = relationship("User", back_populates="purchases_", lazy="joined")
 
+    __mapper_args__ = {"primary_key": [id, date]}
     # __mapper_args__ = {"eager_defaults": True}
+
+
+# the listing of the purchases of an user (see get_multi_by_user_id): one
+# index per sort order, so the filters and the keyset pagination seek on
+# them. The id is the tie breaker of the sort orders.
+Index("ix_purchase_user_id_id", Purchase.user_id, Purchase.id)
+Index("ix_purchase_user_id_date", Purchase.user_id, Purchase.date, Purchase.id)
+Index(
+    "ix_purchase_user_id_status_id_date",
+    Purchase.user_id,
+    Purchase.status_id,
+    Purchase.date,
+    Purchase.id,
+)
+Index(
+    "ix_purchase_user_id_value", Purchase.user_id, Purchase.value, Purchase.id
+)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Date, Integer, String
+
+from app.database.base import Base
+
+
+# the codes of the purchases, so they are unique across all the partitions
+# of the purchase table. It is kept up to date by crud.purchase, and the
+# purchase date is kept to find the purchase partition of a code.
+class PurchaseCode(Base):
+
+    __tablename__ = "purchase_code"
+
+    code = Column(String, primary_key=True)
+    purchase_id = Column(Integer, nullable=False)
+    purchase_date = Column(Date, nullable=False)
@@ -21,8 +21,10 @@ class PurchaseStatus(Base):
         onupdate=datetime.utcnow(),
     )
 
+    # "raise" avoids loading the whole purchase history by accident, the
+    # queries that really need it must opt in (e.g. with selectinload).
     purchases_ = relationship(
-        "Purchase", back_populates="status_", lazy="joined"
+        "Purchase", back_populates="status_", lazy="raise"
     )
 
     # __mapper_args__ = {"eager_defaults": True}
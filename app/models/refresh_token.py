@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+
+from app.database.base import Base
+
+
+class RefreshToken(Base):
+
+    __tablename__ = "refresh_token"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # sha256 of the token, the token itself is never stored
+    token_hash = Column(String(64), index=True, unique=True, nullable=False)
+    # every token issued by rotation belongs to the family of the login
+    # that started it, so a reused token revokes the whole family.
+    family_id = Column(String(32), index=True, nullable=False)
+    user_id = Column(
+        Integer,
+        ForeignKey("user.id", ondelete="CASCADE"),
+        index=True,
+        nullable=False,
+    )
+    expires_at = Column(DateTime, nullable=False)
+    used_at = Column(DateTime, nullable=True)
+    revoked_at = Column(DateTime, nullable=True)
+    time_created = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+
+from app.database.base import Base
+
+
+class RevokedToken(Base):
+
+    __tablename__ = "revoked_token"
+
+    # "jti" claim of the revoked access token
+    jti = Column(String(32), primary_key=True)
+    # "exp" claim of the token, after it the row is useless and is purged
+    expires_at = Column(DateTime, index=True, nullable=False)
+    user_id = Column(
+        Integer, ForeignKey("user.id", ondelete="CASCADE"), nullable=True
+    )
+    time_created = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy import Column, DateTime, Index, Integer, String, func
 from sqlalchemy.orm import relationship
 
 from app.database.base import Base
@@ -23,8 +23,19 @@ class User(Base):
         onupdate=datetime.utcnow(),
     )
 
-    purchases_ = relationship(
-        "Purchase", back_populates="user_", lazy="joined"
-    )
+    # "raise" avoids loading the whole purchase history by accident, the
+    # queries that really need it must opt in (e.g. with selectinload).
+    purchases_ = relationship("Purchase", back_populates="user_", lazy="raise")
 
     # __mapper_args__ = {"eager_defaults": True}
+
+
+# case insensitive lookup of the login credentials, and uniqueness of the
+# emails (so two users can't have the same login). On PostgreSQL the
+# credentials columns are included, so the login is an index-only scan.
+Index(
+    "ix_user_email_lower",
+    func.lower(User.email),
+    unique=True,
+    postgresql_include=["id", "cpf", "hashed_password"],
+)
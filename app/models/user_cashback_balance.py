@@ -0,0 +1,23 @@
+from decimal import Decimal
+
+from sqlalchemy import Column, ForeignKey, Integer, Numeric
+
+from app.database.base import Base
+
+
+# running total of the cashback of the purchases of an user, by status. It
+# is kept up to date by crud.purchase (as deltas, in the same transaction
+# as the purchase) and can be rebuilt with crud.cashback_balance.rebuild.
+class UserCashbackBalance(Base):
+
+    __tablename__ = "user_cashback_balance"
+
+    user_id = Column(
+        Integer,
+        ForeignKey("user.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    status_id = Column(
+        Integer, ForeignKey("purchase_status.id"), primary_key=True
+    )
+    cashback_value = Column(Numeric, nullable=False, default=Decimal(0))
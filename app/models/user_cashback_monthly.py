@@ -0,0 +1,26 @@
+from decimal import Decimal
+
+from sqlalchemy import Column, Date, ForeignKey, Integer, Numeric
+
+from app.database.base import Base
+
+
+# monthly rollup of the purchases of an user, by status (month is the first
+# day of the month). Like the balance, it is kept up to date by
+# crud.purchase and can be rebuilt with crud.cashback_rollup.rebuild.
+class UserCashbackMonthly(Base):
+
+    __tablename__ = "user_cashback_monthly"
+
+    user_id = Column(
+        Integer,
+        ForeignKey("user.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    month = Column(Date, primary_key=True)
+    status_id = Column(
+        Integer, ForeignKey("purchase_status.id"), primary_key=True
+    )
+    purchase_count = Column(Integer, nullable=False, default=0)
+    value = Column(Numeric, nullable=False, default=Decimal(0))
+    cashback_value = Column(Numeric, nullable=False, default=Decimal(0))
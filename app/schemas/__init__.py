@@ -1,11 +1,26 @@
-from .cashback import CashBack
+from .cashback import CashBack, CashbackStatement, CashbackStatementEntry
 from .error import HTTPError
 from .purchase import (
     Purchase,
     PurchaseCreate,
+    PurchaseFilter,
+    PurchaseSortEnum,
     PurchaseUpdatePATCH,
     PurchaseUpdatePUT,
     statusEnum,
 )
-from .token import Token, TokenPayload
-from .user import User, UserCreate, UserUpdatePATCH, UserUpdatePUT
+from .token import (
+    RefreshTokenRequest,
+    Token,
+    TokenPayload,
+    TokenPrincipal,
+)
+from .user import (
+    User,
+    UserBulkResult,
+    UserBulkRowResult,
+    UserCreate,
+    UserSnapshot,
+    UserUpdatePATCH,
+    UserUpdatePUT,
+)
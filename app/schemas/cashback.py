@@ -1,6 +1,29 @@
+from decimal import Decimal
+from typing import List
+
 from pydantic import BaseModel
 
 
 # Properties to return to client
 class CashBack(BaseModel):
-    cashback: float
+    cashback: Decimal
+    # True when the external cashback is the last known value because the
+    # external service is unavailable at the moment.
+    degraded: bool = False
+
+
+# totals of the purchases of a month with a status
+class CashbackStatementEntry(BaseModel):
+    month: str  # YYYY-MM
+    status: str
+    purchase_count: int
+    value: Decimal
+    cashback_value: Decimal
+
+
+# Properties to return to client
+class CashbackStatement(BaseModel):
+    month_from: str  # YYYY-MM
+    month_to: str  # YYYY-MM
+    entries: List[CashbackStatementEntry]
+    cashback_value: Decimal
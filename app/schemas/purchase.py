@@ -12,6 +12,25 @@ class statusEnum(str, Enum):
     DISAPPROVED = "Disapproved"
 
 
+# Sort orders of the purchase listing ("-" means descending)
+class PurchaseSortEnum(str, Enum):
+    ID = "id"
+    ID_DESC = "-id"
+    DATE = "date"
+    DATE_DESC = "-date"
+    VALUE = "value"
+    VALUE_DESC = "-value"
+
+
+# Filters of the purchase listing (the ranges are inclusive)
+class PurchaseFilter(BaseModel):
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    status: Optional[statusEnum] = None
+    value_min: Optional[Decimal] = None
+    value_max: Optional[Decimal] = None
+
+
 # Shared properties
 class PurchaseBase(BaseModel):
     code: str
@@ -1,10 +1,23 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenPayload(BaseModel):
     sub: str
+
+
+class TokenPrincipal(BaseModel):
+    # the authenticated user, as known by the token claims
+    id: int
+    cpf: str
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, EmailStr
 
@@ -52,6 +52,26 @@ class User(UserInDBBase):
     pass
 
 
+# Immutable copy of an user, detached from the session (used by caches)
+class UserSnapshot(UserInDBBase):
+    class Config:
+        allow_mutation = False
+
+
 # Properties properties stored in DB
 class UserInDB(UserInDBBase):
     hashed_password: str
+
+
+# Result of each user of a bulk registration (index in the request)
+class UserBulkRowResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+# Properties to return to client on a bulk registration
+class UserBulkResult(BaseModel):
+    created: int
+    failed: int
+    results: List[UserBulkRowResult]
@@ -0,0 +1,3 @@
+from .cashback import cashback
+from .external_cashback import external_cashback
+from .user_bulk import user_bulk
@@ -0,0 +1,62 @@
+import asyncio
+from typing import Awaitable, List, TypeVar
+
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, schemas
+from app.services.external_cashback import (
+    ExternalCashbackClient,
+    external_cashback,
+)
+
+T = TypeVar("T")
+
+
+async def gather_or_cancel(*aws: Awaitable[T]) -> List[T]:
+    """
+    Run the awaitables concurrently and return their results in order.
+    As soon as one of them fails, the others are cancelled and the error
+    is raised. If the caller is cancelled, all of them are cancelled too.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        # wait for the cancellations, so nothing keeps running in background
+        await asyncio.gather(*tasks, return_exceptions=True)
+    for task in tasks:
+        if not task.cancelled() and task.exception() is not None:
+            raise task.exception()
+    return [task.result() for task in tasks]
+
+
+class CashbackService:
+    """
+    Class responsible for computing the accumulated cashback of an user,
+    which is the internal cashback (the balance of the user purchases)
+    plus the cashback of the external service.
+
+    Both are fetched concurrently, so the latency is the slowest of them
+    instead of their sum.
+    """
+
+    def __init__(self, *, external: ExternalCashbackClient) -> None:
+        self.external = external
+
+    async def get_cashback(
+        self, *, db: AsyncSession, client: AsyncClient, user_id: int, cpf: str
+    ) -> schemas.CashBack:
+        internal, external = await gather_or_cancel(
+            crud.cashback_balance.get_by_user_id(db=db, user_id=user_id),
+            self.external.get_cashback(client=client, cpf=cpf),
+        )
+        return schemas.CashBack(
+            cashback=internal + external.cashback, degraded=external.degraded
+        )
+
+
+cashback = CashbackService(external=external_cashback)
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+from decimal import Decimal
+from typing import Any, Dict, NamedTuple, Optional, Set
+
+from httpx import AsyncClient, HTTPError
+
+from app.core.cache import EXPIRED, FRESH, STALE, TTLCache
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.resilience import (
+    Bulkhead,
+    BulkheadFullError,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ExternalCashbackUnavailableError(Exception):
+    """
+    Raised when the external cashback service can't return the cashback.
+    """
+
+
+class ExternalCashback(NamedTuple):
+    cashback: Decimal
+    # True when the cashback is the last known value, served because the
+    # external service is unavailable.
+    degraded: bool = False
+
+
+class ExternalCashbackClient:
+    """
+    Class responsible for getting the accumulated cashback of a CPF from
+    the external cashback service.
+
+    The values are cached per CPF: fresh values are returned right away,
+    stale values are returned while a single background refresh runs and
+    only a cold miss waits for the external service. Concurrent fetches
+    of the same CPF are coalesced into a single outbound request.
+
+    The outbound requests go through a bulkhead (concurrency limit) and a
+    circuit breaker. When they fail, the last known value of the CPF is
+    served (flagged as degraded) if `serve_last_known` is enabled.
+    """
+
+    def __init__(
+        self,
+        *,
+        url: str,
+        cache: TTLCache,
+        breaker: CircuitBreaker,
+        bulkhead: Bulkhead,
+        serve_last_known: bool = True,
+    ) -> None:
+        self.url = url
+        self.cache = cache
+        self.breaker = breaker
+        self.bulkhead = bulkhead
+        self.serve_last_known = serve_last_known
+        self.degraded_responses = 0
+        self.fetches = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._refreshing: Set[str] = set()
+        self._background_tasks: Set[asyncio.Task] = set()
+
+    async def _request(self, client: AsyncClient, cpf: str) -> Decimal:
+        try:
+            resp = await client.get(self.url, params={"cpf": cpf})
+            external_cashback = resp.json().get("cashback")
+        except (HTTPError, ValueError) as exc:
+            raise ExternalCashbackUnavailableError(str(exc)) from exc
+        if resp.status_code != 200 or not external_cashback:
+            raise ExternalCashbackUnavailableError(
+                f"Unexpected response with status {resp.status_code}."
+            )
+        # str() to keep the exact value received instead of the float one
+        return Decimal(str(external_cashback))
+
+    async def _fetch(self, client: AsyncClient, cpf: str) -> Decimal:
+        try:
+            async with self.bulkhead:
+                cashback = await self.breaker.call(self._request, client, cpf)
+        except (CircuitOpenError, BulkheadFullError) as exc:
+            raise ExternalCashbackUnavailableError(str(exc)) from exc
+        self.cache.set(cpf, cashback)
+        return cashback
+
+    def _forget_in_flight(self, cpf: str, future: asyncio.Future) -> None:
+        if self._in_flight.get(cpf) is future:
+            del self._in_flight[cpf]
+        # marks the exception as retrieved, even if every caller was
+        # cancelled, to avoid the "exception was never retrieved" warning.
+        if not future.cancelled():
+            future.exception()
+
+    async def _fetch_once(self, client: AsyncClient, cpf: str) -> Decimal:
+        """
+        Method that fetches the cashback of a CPF, making the concurrent
+        callers of the same CPF await the same request (single flight).
+        All of them get its result or its error.
+        """
+        future = self._in_flight.get(cpf)
+        if future is None:
+            self.fetches += 1
+            future = asyncio.ensure_future(self._fetch(client, cpf))
+            self._in_flight[cpf] = future
+            future.add_done_callback(
+                lambda done: self._forget_in_flight(cpf, done)
+            )
+        else:
+            self.coalesced += 1
+        # shielded, so a cancelled caller doesn't cancel the request that
+        # the other callers are waiting for.
+        return await asyncio.shield(future)
+
+    async def _refresh(self, client: AsyncClient, cpf: str) -> None:
+        try:
+            await self._fetch_once(client, cpf)
+            self.refreshes += 1
+        except ExternalCashbackUnavailableError:
+            # the stale value keeps being served until it expires
+            self.refresh_failures += 1
+            logger.warning("Could not refresh the cashback of a cpf.")
+        finally:
+            self._refreshing.discard(cpf)
+
+    def _schedule_refresh(self, client: AsyncClient, cpf: str) -> None:
+        if cpf in self._refreshing:
+            return
+        self._refreshing.add(cpf)
+        task = asyncio.create_task(self._refresh(client, cpf))
+        # keeps a reference to the task until it is done, otherwise it
+        # could be garbage collected in the middle of the refresh.
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def get_cashback(
+        self, client: AsyncClient, cpf: str
+    ) -> ExternalCashback:
+        cashback, state = self.cache.lookup(cpf)
+        if state == FRESH:
+            return ExternalCashback(cashback)
+        if state == STALE:
+            self._schedule_refresh(client, cpf)
+            return ExternalCashback(cashback)
+        last_known: Optional[Decimal] = cashback if state == EXPIRED else None
+        try:
+            return ExternalCashback(await self._fetch_once(client, cpf))
+        except ExternalCashbackUnavailableError:
+            if not self.serve_last_known or last_known is None:
+                raise
+            self.degraded_responses += 1
+            return ExternalCashback(last_known, degraded=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats() | {
+            "fetches": self.fetches,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "refreshing": len(self._refreshing),
+            "degraded_responses": self.degraded_responses,
+            "circuit_breaker": self.breaker.stats(),
+            "bulkhead": self.bulkhead.stats(),
+        }
+
+
+external_cashback = ExternalCashbackClient(
+    url=settings.EXTERNAL_CASHBACK_API,
+    cache=TTLCache(
+        ttl=settings.EXTERNAL_CASHBACK_CACHE_TTL,
+        stale_ttl=settings.EXTERNAL_CASHBACK_CACHE_STALE_TTL,
+        max_entries=settings.EXTERNAL_CASHBACK_CACHE_MAX_ENTRIES,
+    ),
+    breaker=CircuitBreaker(
+        failure_threshold=settings.EXTERNAL_CASHBACK_BREAKER_FAILURES,
+        slow_call_threshold=(
+            settings.EXTERNAL_CASHBACK_BREAKER_SLOW_CALL_THRESHOLD
+        ),
+        reset_timeout=settings.EXTERNAL_CASHBACK_BREAKER_RESET_TIMEOUT,
+    ),
+    bulkhead=Bulkhead(
+        max_concurrent_calls=settings.EXTERNAL_CASHBACK_MAX_CONCURRENT_CALLS,
+        max_wait=settings.EXTERNAL_CASHBACK_BULKHEAD_MAX_WAIT,
+    ),
+    serve_last_known=settings.EXTERNAL_CASHBACK_SERVE_LAST_KNOWN,
+)
+metrics.register("external_cashback", external_cashback.stats)
@@ -0,0 +1,223 @@
+import asyncio
+import json
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, schemas
+from app.core.config import settings
+from app.core.loop_bound import LoopBound
+from app.core.security import async_get_password_hashes
+from app.crud.crud_user import UserAlreadyExistsError
+
+# a parsed user, or the error of its row
+ParsedUser = Union[schemas.UserCreate, str]
+# the id of an inserted user, or the error of its row
+InsertedUser = Union[int, str]
+
+
+class UserBulkError(Exception):
+    """
+    Raised when the content of a bulk registration can't be parsed.
+    """
+
+
+class UserBulkBusyError(Exception):
+    """
+    Raised when another bulk registration is still running after the
+    queue timeout.
+    """
+
+
+def _validation_error_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+class UserBulkService:
+    """
+    Class responsible for registering many users at once (e.g. the
+    resellers of a partner).
+
+    POST /users does two uniqueness queries, a hash and a commit per user.
+    Here the users are handled in chunks: the uniqueness of a chunk is
+    checked with a single query, its passwords are hashed in parallel in
+    the bulk hash pool and it is inserted with a single statement. A user
+    that can't be registered doesn't stop the others, every user gets its
+    own result.
+
+    The hashes of a registration take every core, so a single one runs at
+    a time and the others wait for it (up to queue_timeout).
+    """
+
+    def __init__(
+        self, *, chunk_size: int, queue_timeout: Optional[float] = None
+    ) -> None:
+        self.chunk_size = chunk_size
+        self.queue_timeout = queue_timeout
+        self._lock = LoopBound(asyncio.Lock)
+
+    def parse(self, content: bytes, *, ndjson: bool) -> List[ParsedUser]:
+        """
+        Method that parses a JSON array of users or, if ndjson, one user
+        per line (blank lines are skipped).
+
+        Raises:
+            UserBulkError: If the JSON array can't be parsed.
+        """
+        if ndjson:
+            items = []
+            for line in content.splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    items.append(json.loads(line))
+                except ValueError:
+                    # the row fails, not the whole content
+                    items.append(UserBulkError("Invalid JSON."))
+        else:
+            try:
+                items = json.loads(content)
+            except ValueError:
+                raise UserBulkError("Invalid JSON.")
+            if not isinstance(items, list):
+                raise UserBulkError("The content must be a JSON array.")
+        users: List[ParsedUser] = []
+        for item in items:
+            if isinstance(item, UserBulkError):
+                users.append(str(item))
+                continue
+            try:
+                users.append(schemas.UserCreate.parse_obj(item))
+            except ValidationError as exc:
+                users.append(_validation_error_message(exc))
+        return users
+
+    async def register(
+        self, *, db: AsyncSession, users: List[ParsedUser]
+    ) -> schemas.UserBulkResult:
+        """
+        Method that registers the users and returns the result of each one.
+
+        Raises:
+            UserBulkBusyError: If another registration is still running
+            after the queue timeout.
+        """
+        lock = self._lock.get()
+        try:
+            await asyncio.wait_for(lock.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise UserBulkBusyError(
+                "Another bulk registration is running, try again later."
+            )
+        try:
+            return await self._register(db, users)
+        finally:
+            lock.release()
+
+    async def _register(
+        self, db: AsyncSession, users: List[ParsedUser]
+    ) -> schemas.UserBulkResult:
+        results: List[schemas.UserBulkRowResult] = []
+        # the users accepted by the previous chunks
+        seen_emails: Set[str] = set()
+        seen_cpfs: Set[str] = set()
+        for start in range(0, len(users), self.chunk_size):
+            chunk = list(
+                enumerate(users[start : start + self.chunk_size], start)
+            )
+            results += await self._register_chunk(
+                db, chunk, seen_emails, seen_cpfs
+            )
+        created = sum(result.id is not None for result in results)
+        return schemas.UserBulkResult(
+            created=created, failed=len(results) - created, results=results
+        )
+
+    async def _register_chunk(
+        self,
+        db: AsyncSession,
+        chunk: List[Tuple[int, ParsedUser]],
+        seen_emails: Set[str],
+        seen_cpfs: Set[str],
+    ) -> List[schemas.UserBulkRowResult]:
+        errors: Dict[int, str] = {
+            index: user for index, user in chunk if isinstance(user, str)
+        }
+        valid = [
+            (index, user)
+            for index, user in chunk
+            if isinstance(user, schemas.UserCreate)
+        ]
+        taken_emails, taken_cpfs = await crud.user.get_taken_emails_and_cpfs(
+            db=db,
+            emails=[user.email for _, user in valid],
+            cpfs=[user.cpf for _, user in valid],
+        )
+        accepted: List[Tuple[int, schemas.UserCreate]] = []
+        for index, user in valid:
+            email = user.email.lower()
+            if email in taken_emails or email in seen_emails:
+                errors[index] = "Already exists an user with this email."
+            elif user.cpf in taken_cpfs or user.cpf in seen_cpfs:
+                errors[index] = "Already exists an user with this cpf."
+            else:
+                seen_emails.add(email)
+                seen_cpfs.add(user.cpf)
+                accepted.append((index, user))
+        # only the users that will be inserted are hashed
+        hashes = await async_get_password_hashes(
+            [user.password for _, user in accepted]
+        )
+        users_data = [
+            {**user.dict(exclude={"password"}), "hashed_password": hash_}
+            for (_, user), hash_ in zip(accepted, hashes)
+        ]
+        inserted = dict(
+            zip(
+                (index for index, _ in accepted),
+                await self._insert(db, users_data),
+            )
+        )
+        results = []
+        for index, _ in chunk:
+            user_id = inserted.get(index)
+            if isinstance(user_id, str):
+                errors[index] = user_id
+                user_id = None
+            results.append(
+                schemas.UserBulkRowResult(
+                    index=index, id=user_id, error=errors.get(index)
+                )
+            )
+        return results
+
+    async def _insert(
+        self, db: AsyncSession, users_data: List[Dict[str, str]]
+    ) -> List[InsertedUser]:
+        try:
+            return await crud.user.create_many(db=db, users_data=users_data)
+        except UserAlreadyExistsError:
+            pass
+        # an user was registered meanwhile (e.g. by POST /users), so the
+        # chunk is inserted one by one to find it.
+        inserted: List[InsertedUser] = []
+        for user_data in users_data:
+            try:
+                [user_id] = await crud.user.create_many(
+                    db=db, users_data=[user_data]
+                )
+            except UserAlreadyExistsError as exc:
+                inserted.append(str(exc))
+            else:
+                inserted.append(user_id)
+        return inserted
+
+
+user_bulk = UserBulkService(
+    chunk_size=settings.USER_BULK_CHUNK_SIZE,
+    queue_timeout=settings.USER_BULK_QUEUE_TIMEOUT,
+)
@@ -1,3 +1,5 @@
+from unittest import mock
+
 import pytest
 from fastapi import status
 from httpx import AsyncClient
@@ -5,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud
 from app.core.config import settings
+from app.core.security import decode_jwt_token
 from app.tests.utils.user import random_user_dict
 
 # region create jwt token - POST /auth/login
@@ -50,6 +53,23 @@ async def test_login_when_credentials_are_valid_must_return_jwt_token(
     assert response.json().get("access_token")
 
 
+@pytest.mark.asyncio
+async def test_login_when_credentials_are_valid_the_token_must_carry_the_cpf(
+    async_client: AsyncClient, db: AsyncSession
+) -> None:
+    user_dict = random_user_dict()
+    await crud.user.create(db=db, user_in=user_dict)
+    payload = {
+        "username": user_dict.get("email"),
+        "password": user_dict.get("password"),
+    }
+    response = await async_client.post(
+        f"{settings.API_V1_STR}/auth/login", data=payload
+    )
+    token = response.json().get("access_token")
+    assert decode_jwt_token(token)["cpf"] == user_dict["cpf"]
+
+
 @pytest.mark.asyncio
 async def test_login_when_credentials_are_invalid_must_return_status_401(
     async_client: AsyncClient, db: AsyncSession
@@ -82,3 +102,131 @@ async def test_login_when_invalid_payload_are_passed_must_return_status_422(
 
 
 # endregion
+
+# region refresh token - POST /auth/refresh
+
+
+async def login(async_client: AsyncClient, db: AsyncSession) -> dict:
+    user_dict = random_user_dict()
+    await crud.user.create(db=db, user_in=user_dict)
+    payload = {
+        "username": user_dict.get("email"),
+        "password": user_dict.get("password"),
+    }
+    response = await async_client.post(
+        f"{settings.API_V1_STR}/auth/login", data=payload
+    )
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_login_when_credentials_are_valid_must_return_refresh_token(
+    async_client: AsyncClient, db: AsyncSession
+) -> None:
+    tokens = await login(async_client, db)
+    assert tokens.get("refresh_token")
+
+
+@pytest.mark.asyncio
+async def test_refresh_when_refresh_token_is_valid_must_return_new_tokens(
+    async_client: AsyncClient, db: AsyncSession
+) -> None:
+    tokens = await login(async_client, db)
+    response = await async_client.post(
+        f"{settings.API_V1_STR}/auth/refresh",
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["access_token"]
+    assert response.json()["refresh_token"] != tokens["refresh_token"]
+
+
+@pytest.mark.asyncio
+async def test_refresh_must_not_verify_the_password(
+    async_client: AsyncClient, db: AsyncSession
+) -> None:
+    tokens = await login(async_client, db)
+    with mock.patch(
+        "app.crud.crud_user.async_verify_and_update_password"
+    ) as mocked_verify_password:
+        await async_client.post(
+            f"{settings.API_V1_STR}/auth/refresh",
+            json={"refresh_token": tokens["refresh_token"]},
+        )
+    mocked_verify_password.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_refresh_when_refresh_token_is_invalid_must_return_status_401(
+    async_client: AsyncClient,
+) -> None:
+    response = await async_client.post(
+        f"{settings.API_V1_STR}/auth/refresh",
+        json={"refresh_token": "invalid"},
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_refresh_when_refresh_token_is_reused_must_return_status_401(
+    async_client: AsyncClient, db: AsyncSession
+) -> None:
+    tokens = await login(async_client, db)
+    for _ in range(2):
+        response = await async_client.post(
+            f"{settings.API_V1_STR}/auth/refresh",
+            json={"refresh_token": tokens["refresh_token"]},
+        )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+# endregion
+
+# region revoke token - POST /auth/logout
+
+
+@pytest.mark.asyncio
+async def test_logout_must_return_status_204(
+    async_client: AsyncClient, db: AsyncSession
+) -> None:
+    tokens = await login(async_client, db)
+    response = await async_client.post(
+        f"{settings.API_V1_STR}/auth/logout",
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.asyncio
+async def test_logout_the_access_token_must_be_revoked(
+    async_client: AsyncClient, db: AsyncSession
+) -> None:
+    tokens = await login(async_client, db)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    await async_client.post(
+        f"{settings.API_V1_STR}/auth/logout", headers=headers
+    )
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/purchases/", headers=headers
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.asyncio
+async def test_logout_with_refresh_token_it_must_be_revoked(
+    async_client: AsyncClient, db: AsyncSession
+) -> None:
+    tokens = await login(async_client, db)
+    await async_client.post(
+        f"{settings.API_V1_STR}/auth/logout",
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+    response = await async_client.post(
+        f"{settings.API_V1_STR}/auth/refresh",
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+# endregion
@@ -1,4 +1,6 @@
 import random
+from datetime import date
+from decimal import Decimal
 from typing import Any, Dict
 from unittest import mock
 
@@ -7,7 +9,7 @@ from fastapi import status
 from httpx import AsyncClient, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app import models
+from app import crud, models, schemas
 from app.api.deps import get_async_client
 from app.core.config import settings
 from app.main import app
@@ -16,7 +18,10 @@ from app.tests.utils.auth import (
     get_not_active_user_token_headers,
     get_user_token_headers,
 )
-from app.tests.utils.purchase import create_random_purchase_in_db
+from app.tests.utils.purchase import (
+    create_random_purchase_in_db,
+    random_purchase_dict_for_crud,
+)
 
 
 @pytest.fixture()
@@ -77,17 +82,18 @@ async def test_when_successfully_get_cashback_must_be_the_sum_of_internal_and_ex
     )
     dependency_overrides[get_async_client] = lambda: mock_test
     # generating internal cashback value
-    internal_cashback_value = 0
+    internal_cashback_value = Decimal(0)
     for _ in range(5):
         purchase = await create_random_purchase_in_db(db=db, user=random_user)
-        internal_cashback_value += float(purchase.cashback_value)
+        internal_cashback_value += purchase.cashback_value
     # validating
     headers = get_user_token_headers(random_user)
     response = await async_client.get(
         f"{settings.API_V1_STR}/cashback/", headers=headers
     )
-    expected = internal_cashback_value + external_cashback_value
-    assert response.json().get("cashback") == expected
+    expected = internal_cashback_value + Decimal(str(external_cashback_value))
+    # the response is a json number, so it is compared as float
+    assert response.json().get("cashback") == pytest.approx(float(expected))
 
 
 @pytest.mark.asyncio
@@ -142,3 +148,136 @@ async def test_when_getting_cashback_if_token_is_not_active_yet_must_return_403(
 
 
 # endregions
+
+# region get cashback statement - GET /cashback/statement
+
+
+async def create_purchase_on(
+    db: AsyncSession, user: models.User, day: date
+) -> models.Purchase:
+    purchase_dict = random_purchase_dict_for_crud(user)
+    purchase_dict["date"] = day
+    return await crud.purchase.create(db=db, purchase_in=purchase_dict)
+
+
+@pytest.mark.asyncio
+async def test_when_getting_statement_it_must_return_the_months_of_the_period(
+    db: AsyncSession, random_user: models.User, async_client: AsyncClient
+) -> None:
+    purchases = [
+        await create_purchase_on(db, random_user, date(2026, month, 10))
+        for month in (1, 2, 2, 5)
+    ]
+    headers = get_user_token_headers(random_user)
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/cashback/statement",
+        params={"from": "2026-02", "to": "2026-04"},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    statement = response.json()
+    assert statement["month_from"] == "2026-02"
+    assert statement["month_to"] == "2026-04"
+    assert [entry["month"] for entry in statement["entries"]] == ["2026-02"]
+    entry = statement["entries"][0]
+    assert entry["status"] == schemas.statusEnum.IN_VALIDATION
+    assert entry["purchase_count"] == 2
+    cashback = sum(purchase.cashback_value for purchase in purchases[1:3])
+    assert round(Decimal(entry["cashback_value"]), 2) == round(cashback, 2)
+    assert round(Decimal(statement["cashback_value"]), 2) == round(cashback, 2)
+
+
+@pytest.mark.asyncio
+async def test_when_getting_statement_without_period_it_must_be_the_last_12_months(
+    random_user: models.User, async_client: AsyncClient
+) -> None:
+    headers = get_user_token_headers(random_user)
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/cashback/statement",
+        params={"to": "2026-03"},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["month_from"] == "2025-04"
+
+
+@pytest.mark.asyncio
+async def test_when_getting_statement_if_from_is_after_to_must_return_400(
+    random_user: models.User, async_client: AsyncClient
+) -> None:
+    headers = get_user_token_headers(random_user)
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/cashback/statement",
+        params={"from": "2026-05", "to": "2026-04"},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_when_getting_statement_if_month_is_not_valid_must_return_422(
+    random_user: models.User, async_client: AsyncClient
+) -> None:
+    headers = get_user_token_headers(random_user)
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/cashback/statement",
+        params={"from": "2026-13"},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_when_getting_statement_if_year_is_0_must_return_422(
+    random_user: models.User, async_client: AsyncClient
+) -> None:
+    headers = get_user_token_headers(random_user)
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/cashback/statement",
+        params={"from": "0000-01", "to": "0000-02"},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_when_getting_statement_without_from_near_year_1_it_must_start_at_0001_01(
+    random_user: models.User, async_client: AsyncClient
+) -> None:
+    headers = get_user_token_headers(random_user)
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/cashback/statement",
+        params={"to": "0001-03"},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["month_from"] == "0001-01"
+    assert response.json()["month_to"] == "0001-03"
+
+
+@pytest.mark.asyncio
+async def test_when_getting_statement_the_years_must_have_4_digits(
+    random_user: models.User, async_client: AsyncClient
+) -> None:
+    headers = get_user_token_headers(random_user)
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/cashback/statement",
+        params={"from": "0001-01", "to": "0999-12"},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["month_from"] == "0001-01"
+    assert response.json()["month_to"] == "0999-12"
+
+
+@pytest.mark.asyncio
+async def test_when_getting_statement_if_token_user_is_not_authenticated_must_return_401(
+    async_client: AsyncClient,
+) -> None:
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/cashback/statement"
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+# endregion
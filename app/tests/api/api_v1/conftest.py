@@ -1,7 +1,12 @@
+from typing import AsyncGenerator
+from unittest import mock
+
 import pytest_asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, models
+from app.core.config import settings
+from app.tests.utils.auth import get_user_token_headers
 from app.tests.utils.purchase import create_random_purchase_in_db
 from app.tests.utils.user import random_user_dict
 
@@ -18,3 +23,10 @@ async def random_purchase(
 ) -> models.Purchase:
     purchase = await create_random_purchase_in_db(db=db, user=random_user)
     return purchase
+
+
+@pytest_asyncio.fixture()
+async def admin_headers(db: AsyncSession) -> AsyncGenerator[dict, None]:
+    admin = await crud.user.create(db=db, user_in=random_user_dict())
+    with mock.patch.object(settings, "ADMIN_USER_IDS", [admin.id]):
+        yield get_user_token_headers(admin)
@@ -0,0 +1,51 @@
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+
+from app import models
+from app.core.config import settings
+from app.tests.utils.auth import get_user_token_headers
+
+# region get metrics - GET /metrics/
+
+
+@pytest.mark.asyncio
+async def test_when_successfully_get_metrics_must_return_200(
+    async_client: AsyncClient, admin_headers: dict
+) -> None:
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/metrics/", headers=admin_headers
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.asyncio
+async def test_when_successfully_get_metrics_must_return_external_cashback_metrics(
+    async_client: AsyncClient, admin_headers: dict
+) -> None:
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/metrics/", headers=admin_headers
+    )
+    assert "external_cashback" in response.json()
+
+
+@pytest.mark.asyncio
+async def test_when_getting_metrics_if_user_is_not_admin_must_return_403(
+    async_client: AsyncClient, random_user: models.User
+) -> None:
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/metrics/",
+        headers=get_user_token_headers(random_user),
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.asyncio
+async def test_when_getting_metrics_if_not_authenticated_must_return_401(
+    async_client: AsyncClient,
+) -> None:
+    response = await async_client.get(f"{settings.API_V1_STR}/metrics/")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+# endregion
@@ -1,9 +1,12 @@
+import base64
+import json
+
 import pytest
 from fastapi import status
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app import models
+from app import crud, models, schemas
 from app.core.config import settings
 from app.tests.utils.auth import (
     get_expired_user_token_headers,
@@ -11,6 +14,7 @@ from app.tests.utils.auth import (
     get_user_token_headers,
 )
 from app.tests.utils.purchase import create_random_purchase_in_db
+from app.tests.utils.user import random_user_dict
 
 # region get purchases - GET /purchases/
 
@@ -118,4 +122,149 @@ async def test_when_getting_purchases_if_token_is_not_active_yet_must_return_403
     assert response.status_code == status.HTTP_403_FORBIDDEN
 
 
+@pytest.mark.asyncio
+async def test_when_getting_purchases_if_there_are_more_must_return_the_next_cursor(
+    async_client: AsyncClient, db: AsyncSession
+) -> None:
+    user = await crud.user.create(db=db, user_in=random_user_dict())
+    purchases = [
+        await create_random_purchase_in_db(db=db, user=user) for _ in range(3)
+    ]
+    headers = get_user_token_headers(user)
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/purchases/?limit=2", headers=headers
+    )
+    assert [p["id"] for p in response.json()] == [p.id for p in purchases[:2]]
+    assert response.headers["X-Next-Cursor"] in response.headers["Link"]
+    assert 'rel="next"' in response.headers["Link"]
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/purchases/",
+        params={"limit": 2, "cursor": response.headers["X-Next-Cursor"]},
+        headers=headers,
+    )
+    assert [p["id"] for p in response.json()] == [purchases[2].id]
+    assert "X-Next-Cursor" not in response.headers
+    assert "Link" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_when_getting_purchases_if_cursor_is_invalid_must_return_400(
+    async_client: AsyncClient, random_user: models.User
+) -> None:
+    headers = get_user_token_headers(random_user)
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/purchases/?cursor=invalid", headers=headers
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.parametrize(
+    "position",
+    [
+        '{"sort":"id","id":1e400}',
+        '{"sort":"id","id":1000000000000000000000000000000}',
+        '{"sort":"value","key":"Infinity","id":1}',
+    ],
+)
+@pytest.mark.asyncio
+async def test_when_getting_purchases_if_cursor_is_out_of_range_must_return_400(
+    async_client: AsyncClient, random_user: models.User, position: str
+) -> None:
+    headers = get_user_token_headers(random_user)
+    cursor = base64.urlsafe_b64encode(position.encode()).decode()
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/purchases/",
+        headers=headers,
+        params={"sort": json.loads(position)["sort"], "cursor": cursor},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_when_getting_purchases_if_limit_is_over_the_max_must_return_422(
+    async_client: AsyncClient, random_user: models.User
+) -> None:
+    headers = get_user_token_headers(random_user)
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/purchases/",
+        params={"limit": settings.PAGE_SIZE_MAX + 1},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_when_getting_purchases_with_filters_must_return_only_the_matching_purchases(
+    async_client: AsyncClient, db: AsyncSession
+) -> None:
+    user = await crud.user.create(db=db, user_in=random_user_dict())
+    purchases = [
+        await create_random_purchase_in_db(db=db, user=user) for _ in range(3)
+    ]
+    purchases.sort(key=lambda purchase: purchase.value)
+    headers = get_user_token_headers(user)
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/purchases/",
+        params={
+            "value_min": str(purchases[1].value),
+            "status": schemas.statusEnum.IN_VALIDATION.value,
+            "sort": "value",
+        },
+        headers=headers,
+    )
+    assert [purchase["id"] for purchase in response.json()] == [
+        purchase.id for purchase in purchases[1:]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_when_getting_purchases_sorted_the_cursor_must_continue_the_sort_order(
+    async_client: AsyncClient, db: AsyncSession
+) -> None:
+    user = await crud.user.create(db=db, user_in=random_user_dict())
+    purchases = [
+        await create_random_purchase_in_db(db=db, user=user) for _ in range(3)
+    ]
+    headers = get_user_token_headers(user)
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/purchases/",
+        params={"sort": "-date", "limit": 2},
+        headers=headers,
+    )
+    ids = [purchase["id"] for purchase in response.json()]
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/purchases/",
+        params={
+            "sort": "-date",
+            "limit": 2,
+            "cursor": response.headers["X-Next-Cursor"],
+        },
+        headers=headers,
+    )
+    ids += [purchase["id"] for purchase in response.json()]
+    expected = sorted(
+        purchases, key=lambda purchase: (purchase.date, purchase.id)
+    )
+    assert ids == [purchase.id for purchase in reversed(expected)]
+
+
+@pytest.mark.asyncio
+async def test_when_getting_purchases_if_cursor_is_of_another_sort_must_return_400(
+    async_client: AsyncClient, db: AsyncSession
+) -> None:
+    user = await crud.user.create(db=db, user_in=random_user_dict())
+    for _ in range(2):
+        await create_random_purchase_in_db(db=db, user=user)
+    headers = get_user_token_headers(user)
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/purchases/?limit=1", headers=headers
+    )
+    response = await async_client.get(
+        f"{settings.API_V1_STR}/purchases/",
+        params={"sort": "value", "cursor": response.headers["X-Next-Cursor"]},
+        headers=headers,
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
 # endregions
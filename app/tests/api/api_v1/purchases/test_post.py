@@ -1,3 +1,5 @@
+from unittest import mock
+
 import pytest
 from fastapi import status
 from httpx import AsyncClient
@@ -5,6 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, models, schemas
 from app.core.config import settings
+from app.core.security import create_jwt_token
 from app.tests.utils.auth import (
     get_expired_user_token_headers,
     get_not_active_user_token_headers,
@@ -163,6 +166,37 @@ async def test_when_creating_purchase_if_code_has_already_been_must_return_403(
     assert response.status_code == status.HTTP_403_FORBIDDEN
 
 
+@pytest.mark.asyncio
+async def test_when_creating_purchase_the_code_must_not_be_queried_before(
+    random_user: models.User, async_client: AsyncClient
+) -> None:
+    payload = random_purchase_dict_for_json(random_user)
+    headers = get_user_token_headers(random_user)
+    with mock.patch.object(crud.purchase, "get_by_code") as mocked_get_by_code:
+        await async_client.post(
+            f"{settings.API_V1_STR}/purchases/", headers=headers, json=payload
+        )
+    mocked_get_by_code.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_when_creating_purchase_if_token_user_was_deleted_must_return_404(
+    async_client: AsyncClient, db: AsyncSession
+) -> None:
+    user = await crud.user.create(db=db, user_in=random_user_dict())
+    payload = random_purchase_dict_for_json(user)
+    # the principal is read from the claims, so the user isn't fetched
+    token = create_jwt_token(subject=user.id, claims={"cpf": user.cpf})
+    await crud.user.delete_by_id(db=db, id=user.id)
+    response = await async_client.post(
+        f"{settings.API_V1_STR}/purchases/",
+        headers={"Authorization": f"Bearer {token}"},
+        json=payload,
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json() == {"detail": "User not found"}
+
+
 @pytest.mark.asyncio
 async def test_when_creating_purchase_if_body_is_not_valid_must_return_422(
     random_user: models.User,
@@ -71,10 +71,11 @@ async def test_when_successfully_update_purchase_by_id_it_must_be_persisted(
         headers=headers,
         json=payload,
     )
-    # It refresh the purchase in the session because the update was done in
-    # another session, so the object in memory of that session is out of date.
-    await db.refresh(random_purchase)
-    assert random_purchase.code == payload.get("code")
+    # It reads the purchase again because the update was done in another
+    # session, so the object in memory of that session is out of date (and
+    # the new date changed its identity, see models.Purchase).
+    purchase = await crud.purchase.get_by_id(db=db, id=random_purchase.id)
+    assert purchase.code == payload.get("code")
 
 
 @pytest.mark.asyncio
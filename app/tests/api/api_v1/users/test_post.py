@@ -1,10 +1,15 @@
+import json
+from unittest import mock
+
 import pytest
 from fastapi import status
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app import crud
+from app import crud, services
 from app.core.config import settings
+from app.services.user_bulk import UserBulkBusyError
+from app.tests.utils.auth import get_user_token_headers
 from app.tests.utils.user import random_user_dict
 
 # region create user - POST /users/
@@ -62,6 +67,19 @@ async def test_when_creating_user_if_a_user_with_this_email_already_exist_return
     assert response.status_code == status.HTTP_400_BAD_REQUEST
 
 
+@pytest.mark.asyncio
+async def test_when_creating_user_if_a_user_with_this_email_in_another_case_already_exist_returns_status_400(
+    async_client: AsyncClient, db: AsyncSession
+) -> None:
+    user_dict = random_user_dict()
+    await crud.user.create(db=db, user_in=user_dict)
+    new_user_dict = {**random_user_dict(), "email": user_dict["email"].upper()}
+    response = await async_client.post(
+        f"{settings.API_V1_STR}/users/", json=new_user_dict
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
 @pytest.mark.asyncio
 async def test_when_creating_user_if_a_user_with_this_cpf_already_exist_returns_status_400(
     async_client: AsyncClient, db: AsyncSession
@@ -76,6 +94,22 @@ async def test_when_creating_user_if_a_user_with_this_cpf_already_exist_returns_
     assert response.status_code == status.HTTP_400_BAD_REQUEST
 
 
+@pytest.mark.asyncio
+async def test_when_creating_user_the_email_and_cpf_must_not_be_queried_before(
+    async_client: AsyncClient,
+) -> None:
+    with mock.patch.object(
+        crud.user, "get_by_email"
+    ) as mocked_get_by_email, mock.patch.object(
+        crud.user, "get_by_cpf"
+    ) as mocked_get_by_cpf:
+        await async_client.post(
+            f"{settings.API_V1_STR}/users/", json=random_user_dict()
+        )
+    mocked_get_by_email.assert_not_called()
+    mocked_get_by_cpf.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_when_creating_user_if_body_is_not_valid_must_return_status_422(
     async_client: AsyncClient,
@@ -87,3 +121,138 @@ async def test_when_creating_user_if_body_is_not_valid_must_return_status_422(
 
 
 # endregion
+
+# region bulk create users - POST /users/bulk
+
+
+@pytest.mark.asyncio
+async def test_when_users_are_created_in_bulk_they_must_be_persisted(
+    async_client: AsyncClient, db: AsyncSession, admin_headers: dict
+) -> None:
+    users = [random_user_dict() for _ in range(3)]
+    response = await async_client.post(
+        f"{settings.API_V1_STR}/users/bulk",
+        json=users,
+        headers=admin_headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["created"] == 3
+    for user_dict, result in zip(users, response.json()["results"]):
+        db_user = await crud.user.get_by_email(db=db, email=user_dict["email"])
+        assert db_user.id == result["id"]
+
+
+@pytest.mark.asyncio
+async def test_when_users_are_created_in_bulk_from_ndjson_they_must_be_persisted(
+    async_client: AsyncClient, db: AsyncSession, admin_headers: dict
+) -> None:
+    users = [random_user_dict() for _ in range(2)]
+    response = await async_client.post(
+        f"{settings.API_V1_STR}/users/bulk",
+        content="\n".join(json.dumps(user) for user in users),
+        headers={**admin_headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert response.json()["created"] == 2
+
+
+@pytest.mark.asyncio
+async def test_when_creating_users_in_bulk_each_invalid_user_must_have_its_error(
+    async_client: AsyncClient, db: AsyncSession, admin_headers: dict
+) -> None:
+    existing = random_user_dict()
+    await crud.user.create(db=db, user_in=existing)
+    valid = random_user_dict()
+    same_cpf = {**random_user_dict(), "cpf": valid["cpf"]}
+    response = await async_client.post(
+        f"{settings.API_V1_STR}/users/bulk",
+        json=[existing, valid, {"invalid": "user"}, same_cpf],
+        headers=admin_headers,
+    )
+    results = response.json()["results"]
+    assert response.json()["created"] == 1
+    assert response.json()["failed"] == 3
+    assert "email" in results[0]["error"]
+    assert results[1]["id"] and results[1]["error"] is None
+    assert results[2]["error"]
+    assert "cpf" in results[3]["error"]
+
+
+@pytest.mark.asyncio
+async def test_when_creating_users_in_bulk_if_body_is_not_a_json_array_must_return_status_400(
+    async_client: AsyncClient, admin_headers: dict
+) -> None:
+    response = await async_client.post(
+        f"{settings.API_V1_STR}/users/bulk",
+        json={"invalid": "body"},
+        headers=admin_headers,
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_when_creating_users_in_bulk_if_there_are_too_many_users_must_return_status_413(
+    async_client: AsyncClient, admin_headers: dict
+) -> None:
+    with mock.patch.object(settings, "USER_BULK_MAX_ROWS", 1):
+        response = await async_client.post(
+            f"{settings.API_V1_STR}/users/bulk",
+            json=[random_user_dict(), random_user_dict()],
+            headers=admin_headers,
+        )
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
+@pytest.mark.asyncio
+async def test_when_creating_users_in_bulk_if_body_is_too_large_must_return_status_413(
+    async_client: AsyncClient, admin_headers: dict
+) -> None:
+    with mock.patch.object(settings, "USER_BULK_MAX_BODY_BYTES", 10):
+        response = await async_client.post(
+            f"{settings.API_V1_STR}/users/bulk",
+            json=[random_user_dict()],
+            headers=admin_headers,
+        )
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+
+@pytest.mark.asyncio
+async def test_when_creating_users_in_bulk_if_user_is_not_admin_must_return_status_403(
+    async_client: AsyncClient, db: AsyncSession
+) -> None:
+    user = await crud.user.create(db=db, user_in=random_user_dict())
+    response = await async_client.post(
+        f"{settings.API_V1_STR}/users/bulk",
+        json=[random_user_dict()],
+        headers=get_user_token_headers(user),
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.asyncio
+async def test_when_creating_users_in_bulk_if_not_authenticated_must_return_status_401(
+    async_client: AsyncClient,
+) -> None:
+    response = await async_client.post(
+        f"{settings.API_V1_STR}/users/bulk", json=[random_user_dict()]
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_when_creating_users_in_bulk_if_another_bulk_is_running_must_return_status_503(
+    async_client: AsyncClient, admin_headers: dict
+) -> None:
+    with mock.patch.object(
+        services.user_bulk,
+        "register",
+        side_effect=UserBulkBusyError("busy"),
+    ):
+        response = await async_client.post(
+            f"{settings.API_V1_STR}/users/bulk",
+            json=[random_user_dict()],
+            headers=admin_headers,
+        )
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+# endregion
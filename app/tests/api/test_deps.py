@@ -1,3 +1,5 @@
+import asyncio
+from datetime import datetime, timedelta
 from typing import AsyncGenerator
 from unittest import mock
 
@@ -7,8 +9,9 @@ from fastapi import HTTPException, status
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app import crud, schemas
 from app.api import deps
-from app.core.security import create_jwt_token
+from app.core.security import create_jwt_token, decode_jwt_token
 
 
 # region test get_db function
@@ -34,6 +37,7 @@ async def test_get_db_after_be_async_iterated_must_return_asyncsession():
 
 # endregion
 
+
 # region test get_async_client function
 @pytest.mark.asyncio
 async def test_get_async_client_must_return_asyncgenerator():
@@ -60,60 +64,113 @@ async def test_get_async_after_be_async_iterated_must_return_asyncclient():
 # region test get_token_payload function
 
 
-def test_get_token_payload_if_token_is_valid_must_return_the_payload():
+@pytest.mark.asyncio
+async def test_get_token_payload_if_token_is_valid_must_return_the_payload():
     subject = "testing"
     token = create_jwt_token(subject=subject)
-    payload = deps.get_token_payload(token=token)
+    payload = await deps.get_token_payload(token=token)
     assert subject in payload.values()
 
 
+@pytest.mark.asyncio
 @mock.patch("app.api.deps.decode_jwt_token")
-def test_get_token_payload_if_token_is_expired_must_return_403_httpexception(
+async def test_get_token_payload_if_token_is_expired_must_return_403_httpexception(
     mocked_decode_jwt_token,
 ):
     # forcing rise ExpiredSignatureError when decode_jwt_token_is_called
     mocked_decode_jwt_token.side_effect = jwt.ExpiredSignatureError()
 
     with pytest.raises(HTTPException) as exc_info:
-        deps.get_token_payload()
+        await deps.get_token_payload(token="token")
     assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
 
 
+@pytest.mark.asyncio
 @mock.patch("app.api.deps.decode_jwt_token")
-def test_get_token_payload_if_token_is_not_valid_yet_must_return_403_httpexception(
+async def test_get_token_payload_if_token_is_not_valid_yet_must_return_403_httpexception(
     mocked_decode_jwt_token,
 ):
     # forcing rise ImmatureSignatureError when decode_jwt_token_is_called
     mocked_decode_jwt_token.side_effect = jwt.ImmatureSignatureError()
 
     with pytest.raises(HTTPException) as exc_info:
-        deps.get_token_payload()
+        await deps.get_token_payload(token="token")
     assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
 
 
+@pytest.mark.asyncio
 @mock.patch("app.api.deps.decode_jwt_token")
-def test_get_token_payload_if_token_is_not_valid_must_return_403_httpexception(
+async def test_get_token_payload_if_token_is_not_valid_must_return_403_httpexception(
     mocked_decode_jwt_token,
 ):
     # forcing rise InvalidTokenError when decode_jwt_token_is_called
     mocked_decode_jwt_token.side_effect = jwt.InvalidTokenError()
 
     with pytest.raises(HTTPException) as exc_info:
-        deps.get_token_payload()
+        await deps.get_token_payload(token="token")
     assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
 
 
+@pytest.mark.asyncio
+@mock.patch("app.api.deps.decode_jwt_token", wraps=decode_jwt_token)
+async def test_get_token_payload_if_token_is_reused_must_verify_it_only_once(
+    mocked_decode_jwt_token,
+):
+    token = create_jwt_token(subject="reused")
+    first = await deps.get_token_payload(token=token)
+    second = await deps.get_token_payload(token=token)
+    assert first == second
+    assert mocked_decode_jwt_token.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_token_payload_if_cached_token_expires_must_return_403_httpexception():
+    token = create_jwt_token(
+        subject="expiring", expires_delta=timedelta(seconds=1)
+    )
+    await deps.get_token_payload(token=token)
+    await asyncio.sleep(1.1)
+    with pytest.raises(HTTPException) as exc_info:
+        await deps.get_token_payload(token=token)
+    assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.asyncio
+async def test_get_token_payload_if_token_is_revoked_must_return_403_httpexception(
+    db: AsyncSession,
+):
+    token = create_jwt_token(subject=1)
+    payload = await deps.get_token_payload(token=token)
+    await crud.token_revocation_list.revoke(
+        db=db,
+        jti=payload["jti"],
+        expires_at=datetime.utcfromtimestamp(payload["exp"]),
+    )
+    with pytest.raises(HTTPException) as exc_info:
+        await deps.get_token_payload(token=token)
+    assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.asyncio
+async def test_get_token_payload_if_token_is_not_revoked_must_not_query_the_db():
+    await deps.get_token_payload(token=create_jwt_token(subject=1))
+    with mock.patch.object(crud.revoked_token, "exists") as mocked_exists:
+        await deps.get_token_payload(token=create_jwt_token(subject=1))
+    mocked_exists.assert_not_called()
+
+
 # endregion
 
+
 # region test get_token_user function
 @pytest.mark.asyncio
-@mock.patch("app.api.deps.crud.user.get_by_id")
+@mock.patch("app.api.deps.crud.user.get_cached_by_id")
 async def test_get_token_user_if_payload_is_valid_must_return_the_token_user(
-    mocked_crud_user_get_by_id,
+    mocked_crud_user_get_cached_by_id,
 ):
     expected = mock.Mock()
-    # forcing crud.user.get_by_id return a Mock object
-    mocked_crud_user_get_by_id.return_value = expected
+    # forcing crud.user.get_cached_by_id return a Mock object
+    mocked_crud_user_get_cached_by_id.return_value = expected
     valid_payload = {"exp": 1642985912, "nbf": 1642975112, "sub": "1"}
     result = await deps.get_token_user(payload=valid_payload)
     assert result == expected
@@ -131,12 +188,12 @@ async def test_get_token_user_if_payload_is_not_valid_must_return_403_httpexcept
 
 
 @pytest.mark.asyncio
-@mock.patch("app.api.deps.crud.user.get_by_id")
+@mock.patch("app.api.deps.crud.user.get_cached_by_id")
 async def test_get_token_user_if_payload_user_if_not_found_must_return_404_httpexception(
-    mocked_crud_user_get_by_id,
+    mocked_crud_user_get_cached_by_id,
 ):
-    # forcing crud.user.get_by_id return None
-    mocked_crud_user_get_by_id.return_value = None
+    # forcing crud.user.get_cached_by_id return None
+    mocked_crud_user_get_cached_by_id.return_value = None
     valid_payload = {"exp": 1642985912, "nbf": 1642975112, "sub": "1"}
     with pytest.raises(HTTPException) as exc_info:
         await deps.get_token_user(payload=valid_payload)
@@ -144,3 +201,59 @@ async def test_get_token_user_if_payload_user_if_not_found_must_return_404_httpe
 
 
 # endregion
+
+
+# region test get_token_principal function
+@pytest.mark.asyncio
+@mock.patch("app.api.deps.crud.user.get_cached_by_id")
+async def test_get_token_principal_if_payload_has_cpf_must_not_fetch_the_user(
+    mocked_crud_user_get_cached_by_id,
+):
+    payload = {"exp": 1642985912, "sub": "1", "cpf": "12345678901"}
+    result = await deps.get_token_principal(payload=payload)
+    assert result == schemas.TokenPrincipal(id=1, cpf="12345678901")
+    mocked_crud_user_get_cached_by_id.assert_not_called()
+
+
+@pytest.mark.asyncio
+@mock.patch("app.api.deps.crud.user.get_cached_by_id")
+async def test_get_token_principal_if_payload_has_not_cpf_must_fetch_the_user(
+    mocked_crud_user_get_cached_by_id,
+):
+    mocked_crud_user_get_cached_by_id.return_value = mock.Mock(
+        id=1, cpf="12345678901"
+    )
+    payload = {"exp": 1642985912, "sub": "1"}
+    result = await deps.get_token_principal(payload=payload)
+    assert result == schemas.TokenPrincipal(id=1, cpf="12345678901")
+
+
+@pytest.mark.asyncio
+@mock.patch("app.api.deps.crud.user.get_cached_by_id")
+async def test_get_token_principal_if_claims_are_disabled_must_fetch_the_user(
+    mocked_crud_user_get_cached_by_id,
+):
+    mocked_crud_user_get_cached_by_id.return_value = mock.Mock(
+        id=1, cpf="10987654321"
+    )
+    payload = {"exp": 1642985912, "sub": "1", "cpf": "12345678901"}
+    with mock.patch.object(
+        deps.settings, "ACCESS_TOKEN_PRINCIPAL_CLAIMS", False
+    ):
+        result = await deps.get_token_principal(payload=payload)
+    assert result.cpf == "10987654321"
+
+
+@pytest.mark.asyncio
+@mock.patch("app.api.deps.crud.user.get_cached_by_id")
+async def test_get_token_principal_if_user_is_not_found_must_return_404_httpexception(
+    mocked_crud_user_get_cached_by_id,
+):
+    mocked_crud_user_get_cached_by_id.return_value = None
+    payload = {"exp": 1642985912, "sub": "1"}
+    with pytest.raises(HTTPException) as exc_info:
+        await deps.get_token_principal(payload=payload)
+    assert exc_info.value.status_code == status.HTTP_404_NOT_FOUND
+
+
+# endregion
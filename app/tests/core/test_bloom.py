@@ -0,0 +1,26 @@
+from app.core.bloom import BloomFilter
+
+
+def test_when_item_was_added_bloom_filter_must_contain_it():
+    bloom = BloomFilter(capacity=100, error_rate=0.01)
+    bloom.add("item")
+    assert "item" in bloom
+
+
+def test_when_bloom_filter_is_empty_it_must_not_contain_any_item():
+    bloom = BloomFilter(capacity=100, error_rate=0.01)
+    assert "item" not in bloom
+
+
+def test_when_bloom_filter_is_built_from_items_it_must_contain_all_of_them():
+    items = [f"item-{i}" for i in range(1000)]
+    bloom = BloomFilter.from_items(items, capacity=1000, error_rate=0.01)
+    assert all(item in bloom for item in items)
+
+
+def test_bloom_filter_false_positive_rate_must_be_close_to_error_rate():
+    bloom = BloomFilter.from_items(
+        (f"item-{i}" for i in range(1000)), capacity=1000, error_rate=0.01
+    )
+    false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+    assert false_positives / 10000 < 0.02
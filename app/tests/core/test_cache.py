@@ -0,0 +1,81 @@
+from app.core.cache import EXPIRED, FRESH, MISSING, STALE, TTLCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_when_lookup_a_missing_key_the_state_must_be_missing():
+    cache = TTLCache(ttl=10, max_entries=10)
+    assert cache.lookup("key") == (None, MISSING)
+
+
+def test_when_lookup_a_key_before_ttl_the_state_must_be_fresh():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, max_entries=10, clock=clock)
+    cache.set("key", "value")
+    clock.now = 9
+    assert cache.lookup("key") == ("value", FRESH)
+
+
+def test_when_lookup_a_key_inside_stale_window_the_state_must_be_stale():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, stale_ttl=5, max_entries=10, clock=clock)
+    cache.set("key", "value")
+    clock.now = 12
+    assert cache.lookup("key") == ("value", STALE)
+
+
+def test_when_lookup_a_key_after_stale_window_the_state_must_be_expired():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, stale_ttl=5, max_entries=10, clock=clock)
+    cache.set("key", "value")
+    clock.now = 15
+    assert cache.lookup("key") == ("value", EXPIRED)
+
+
+def test_when_get_a_not_fresh_key_must_return_the_default():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, stale_ttl=5, max_entries=10, clock=clock)
+    cache.set("key", "value")
+    clock.now = 12
+    assert cache.get("key", "default") == "default"
+
+
+def test_when_set_with_ttl_it_must_not_exceed_the_cache_ttl():
+    clock = FakeClock()
+    cache = TTLCache(ttl=10, max_entries=10, clock=clock)
+    cache.set("key", "value", ttl=60)
+    clock.now = 11
+    assert cache.get("key") is None
+
+
+def test_when_max_entries_is_exceeded_the_least_recently_used_must_be_evicted():
+    cache = TTLCache(ttl=10, max_entries=2)
+    cache.set("first", 1)
+    cache.set("second", 2)
+    cache.get("first")
+    cache.set("third", 3)
+    assert cache.get("second") is None
+    assert cache.get("first") == 1
+
+
+def test_when_invalidate_a_key_it_must_be_removed():
+    cache = TTLCache(ttl=10, max_entries=10)
+    cache.set("key", "value")
+    cache.invalidate("key")
+    assert cache.lookup("key") == (None, MISSING)
+
+
+def test_cache_stats_must_count_hits_misses_and_evictions():
+    cache = TTLCache(ttl=10, max_entries=1)
+    cache.set("first", 1)
+    cache.get("first")
+    cache.get("missing")
+    cache.set("second", 2)
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 1, 1)
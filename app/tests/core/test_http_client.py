@@ -0,0 +1,38 @@
+import pytest
+from httpx import AsyncClient
+
+from app.core.config import settings
+from app.core.http_client import SharedAsyncClient
+
+
+@pytest.mark.asyncio
+async def test_shared_async_client_get_must_return_an_asyncclient():
+    shared_client = SharedAsyncClient()
+    assert isinstance(shared_client.get(), AsyncClient)
+    await shared_client.close()
+
+
+@pytest.mark.asyncio
+async def test_shared_async_client_get_must_always_return_the_same_client():
+    shared_client = SharedAsyncClient()
+    assert shared_client.get() is shared_client.get()
+    await shared_client.close()
+
+
+@pytest.mark.asyncio
+async def test_shared_async_client_must_use_the_configured_timeouts():
+    shared_client = SharedAsyncClient()
+    client = shared_client.get()
+    assert client.timeout.connect == settings.HTTP_CLIENT_CONNECT_TIMEOUT
+    assert client.timeout.read == settings.HTTP_CLIENT_READ_TIMEOUT
+    await shared_client.close()
+
+
+@pytest.mark.asyncio
+async def test_when_shared_async_client_is_closed_a_new_client_must_be_created():
+    shared_client = SharedAsyncClient()
+    client = shared_client.get()
+    await shared_client.close()
+    assert client.is_closed
+    assert shared_client.get() is not client
+    await shared_client.close()
@@ -0,0 +1,189 @@
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from app.core.keyring import JWTKey, KeyRing, KeyRingError
+
+
+def private_pem(private_key) -> str:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+def public_pem(private_key) -> str:
+    return (
+        private_key.public_key()
+        .public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        .decode()
+    )
+
+
+def sign_and_verify(keyring: KeyRing) -> dict:
+    key = keyring.active
+    token = jwt.encode(
+        {"sub": "1"},
+        key.signing_key,
+        algorithm=key.algorithm,
+        headers={"kid": key.kid},
+    )
+    verifying = keyring.get(jwt.get_unverified_header(token)["kid"])
+    return jwt.decode(
+        token, verifying.verifying_key, algorithms=[verifying.algorithm]
+    )
+
+
+# region JWTKey
+
+
+@pytest.mark.parametrize(
+    "algorithm, private_key",
+    [
+        ("RS256", rsa.generate_private_key(65537, 2048)),
+        ("ES256", ec.generate_private_key(ec.SECP256R1())),
+        ("EdDSA", ed25519.Ed25519PrivateKey.generate()),
+    ],
+)
+def test_when_key_is_asymmetric_it_must_sign_and_verify(
+    algorithm, private_key
+):
+    key = JWTKey.from_config(
+        {"kid": "k1", "alg": algorithm, "key": private_pem(private_key)}
+    )
+    keyring = KeyRing([key], active_kid="k1")
+    assert sign_and_verify(keyring) == {"sub": "1"}
+
+
+def test_when_key_is_hmac_it_must_sign_and_verify():
+    key = JWTKey.from_config({"kid": "k1", "alg": "HS256", "key": "secret"})
+    assert sign_and_verify(KeyRing([key], active_kid="k1")) == {"sub": "1"}
+
+
+def test_when_key_is_loaded_from_file_it_must_be_parsed(tmp_path):
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    key_file = tmp_path / "k1.pem"
+    key_file.write_text(private_pem(private_key))
+    key = JWTKey.from_config(
+        {"kid": "k1", "alg": "ES256", "key_file": str(key_file)}
+    )
+    assert isinstance(key.signing_key, ec.EllipticCurvePrivateKey)
+    assert isinstance(key.verifying_key, ec.EllipticCurvePublicKey)
+
+
+def test_when_key_has_only_public_key_it_must_not_sign():
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    key = JWTKey.from_config(
+        {"kid": "k1", "alg": "ES256", "public_key": public_pem(private_key)}
+    )
+    assert not key.can_sign
+
+
+def test_when_key_does_not_match_the_algorithm_it_must_raise_error():
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    with pytest.raises(KeyRingError):
+        JWTKey.from_config(
+            {"kid": "k1", "alg": "RS256", "key": private_pem(private_key)}
+        )
+
+
+def test_when_key_algorithm_is_not_supported_it_must_raise_error():
+    with pytest.raises(KeyRingError):
+        JWTKey.from_config({"kid": "k1", "alg": "none", "key": "secret"})
+
+
+# endregion
+
+# region KeyRing
+
+
+def test_when_keyring_has_no_keys_it_must_use_the_default_secret():
+    keyring = KeyRing.from_config(
+        None, None, default_secret="secret", default_algorithm="HS256"
+    )
+    assert keyring.active.algorithm == "HS256"
+    assert keyring.active.signing_key == b"secret"
+
+
+def test_when_keyring_has_no_active_kid_the_first_key_must_be_active():
+    keyring = KeyRing.from_config(
+        [
+            {"kid": "new", "alg": "HS256", "key": "new"},
+            {"kid": "old", "alg": "HS256", "key": "old"},
+        ],
+        None,
+        default_secret="secret",
+        default_algorithm="HS256",
+    )
+    assert keyring.active.kid == "new"
+
+
+def test_when_key_is_rotated_the_old_tokens_must_still_be_verified():
+    old_private_key = ec.generate_private_key(ec.SECP256R1())
+    old_keyring = KeyRing(
+        [
+            JWTKey.from_config(
+                {
+                    "kid": "old",
+                    "alg": "ES256",
+                    "key": private_pem(old_private_key),
+                }
+            )
+        ],
+        active_kid="old",
+    )
+    token = jwt.encode(
+        {"sub": "1"},
+        old_keyring.active.signing_key,
+        algorithm="ES256",
+        headers={"kid": "old"},
+    )
+    new_private_key = ed25519.Ed25519PrivateKey.generate()
+    keyring = KeyRing.from_config(
+        [
+            {
+                "kid": "new",
+                "alg": "EdDSA",
+                "key": private_pem(new_private_key),
+            },
+            {
+                "kid": "old",
+                "alg": "ES256",
+                "public_key": public_pem(old_private_key),
+            },
+        ],
+        "new",
+        default_secret="secret",
+        default_algorithm="HS256",
+    )
+    key = keyring.get(jwt.get_unverified_header(token)["kid"])
+    payload = jwt.decode(token, key.verifying_key, algorithms=[key.algorithm])
+    assert payload == {"sub": "1"}
+
+
+def test_when_active_key_can_not_sign_keyring_must_raise_error():
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    key = JWTKey.from_config(
+        {"kid": "k1", "alg": "ES256", "public_key": public_pem(private_key)}
+    )
+    with pytest.raises(KeyRingError):
+        KeyRing([key], active_kid="k1")
+
+
+def test_when_kid_is_unknown_keyring_must_raise_invalid_token_error():
+    key = JWTKey.from_config({"kid": "k1", "alg": "HS256", "key": "secret"})
+    with pytest.raises(jwt.InvalidTokenError):
+        KeyRing([key], active_kid="k1").get("unknown")
+
+
+def test_when_token_has_no_kid_keyring_must_return_the_active_key():
+    key = JWTKey.from_config({"kid": "k1", "alg": "HS256", "key": "secret"})
+    assert KeyRing([key], active_kid="k1").get(None) is key
+
+
+# endregion
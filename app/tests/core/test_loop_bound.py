@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+
+from app.core.loop_bound import LoopBound
+
+
+@pytest.mark.asyncio
+async def test_when_getting_in_the_same_loop_it_must_return_the_same_value():
+    holder = LoopBound(asyncio.Lock)
+    assert holder.get() is holder.get()
+
+
+def test_when_getting_from_another_loop_it_must_create_a_new_value():
+    holder = LoopBound(asyncio.Lock)
+
+    async def get():
+        return holder.get()
+
+    first_loop, second_loop = (
+        asyncio.new_event_loop(),
+        asyncio.new_event_loop(),
+    )
+    try:
+        first = first_loop.run_until_complete(get())
+        second = second_loop.run_until_complete(get())
+    finally:
+        first_loop.close()
+        second_loop.close()
+    assert first is not second
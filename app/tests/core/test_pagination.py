@@ -0,0 +1,40 @@
+import pytest
+
+from app.core.pagination import (
+    INT64_MAX,
+    InvalidCursorError,
+    cursor_int,
+    decode_cursor,
+    encode_cursor,
+)
+
+
+def test_when_cursor_is_decoded_it_must_return_the_encoded_position():
+    position = {"id": 42, "date": "2022-01-31"}
+    assert decode_cursor(encode_cursor(position)) == position
+
+
+def test_when_cursor_is_encoded_it_must_be_url_safe():
+    cursor = encode_cursor({"id": 42, "value": "?&/+="})
+    assert cursor.replace("-", "").replace("_", "").isalnum()
+
+
+@pytest.mark.parametrize("cursor", ["invalid", "WzFd", "!!!"])
+def test_when_cursor_is_not_valid_it_must_raise_invalid_cursor_error(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("value", [42, "42", INT64_MAX])
+def test_when_cursor_int_is_in_the_64_bit_range_it_must_be_returned(value):
+    assert cursor_int(value) == int(value)
+
+
+@pytest.mark.parametrize(
+    "value", [float("inf"), INT64_MAX + 1, -(10**30), "1.5", None]
+)
+def test_when_cursor_int_is_not_valid_it_must_raise_invalid_cursor_error(
+    value,
+):
+    with pytest.raises(InvalidCursorError):
+        cursor_int(value)
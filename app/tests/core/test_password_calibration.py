@@ -0,0 +1,53 @@
+from itertools import count
+from unittest import mock
+
+from passlib.hash import argon2
+
+from app.core.password_calibration import (
+    calibrate_argon2,
+    calibrate_bcrypt,
+    measure_hash_time,
+)
+from app.core.security import build_pwd_context
+
+
+def test_measure_hash_time_must_return_the_median_duration():
+    ticks = count()
+    # each hash takes 1 tick of the fake timer
+    duration = measure_hash_time(
+        build_pwd_context(bcrypt_rounds=4),
+        samples=3,
+        timer=lambda: next(ticks),
+    )
+    assert duration == 1
+
+
+def test_when_calibrate_bcrypt_must_return_the_highest_rounds_under_target():
+    with mock.patch(
+        "app.core.password_calibration.measure_hash_time",
+        side_effect=[0.025, 0.05, 0.1, 0.2],
+    ):
+        assert calibrate_bcrypt(0.1) == {"PASSWORD_BCRYPT_ROUNDS": 7}
+
+
+def test_when_calibrate_bcrypt_if_no_rounds_meet_the_target_must_return_min():
+    with mock.patch(
+        "app.core.password_calibration.measure_hash_time",
+        return_value=1.0,
+    ):
+        assert calibrate_bcrypt(0.1) == {"PASSWORD_BCRYPT_ROUNDS": 4}
+
+
+def test_when_calibrate_argon2_if_memory_is_too_slow_it_must_be_halved():
+    # memory 65536 is too slow, 32768 fits with 2 passes. The hashes are
+    # not computed, so the argon2 backend isn't needed.
+    with mock.patch(
+        "app.core.password_calibration.measure_hash_time",
+        side_effect=[0.5, 0.08, 0.12],
+    ), mock.patch.object(argon2, "has_backend", return_value=True):
+        calibrated = calibrate_argon2(0.1, memory_cost=65536)
+    assert calibrated == {
+        "PASSWORD_ARGON2_TIME_COST": 2,
+        "PASSWORD_ARGON2_MEMORY_COST": 32768,
+        "PASSWORD_ARGON2_PARALLELISM": 4,
+    }
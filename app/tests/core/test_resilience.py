@@ -0,0 +1,188 @@
+import asyncio
+
+import pytest
+
+from app.core.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    Bulkhead,
+    BulkheadFullError,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def succeed() -> str:
+    return "ok"
+
+
+async def fail() -> None:
+    raise ValueError("fail")
+
+
+# region circuit breaker
+
+
+@pytest.mark.asyncio
+async def test_when_failures_reach_the_threshold_the_circuit_must_open():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            await breaker.call(fail)
+    assert breaker.state == OPEN
+
+
+@pytest.mark.asyncio
+async def test_when_circuit_is_open_calls_must_be_rejected():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    with pytest.raises(ValueError):
+        await breaker.call(fail)
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(succeed)
+    assert breaker.stats()["rejected_calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_when_a_call_succeeds_the_failures_must_be_reset():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    with pytest.raises(ValueError):
+        await breaker.call(fail)
+    await breaker.call(succeed)
+    with pytest.raises(ValueError):
+        await breaker.call(fail)
+    assert breaker.state == CLOSED
+
+
+@pytest.mark.asyncio
+async def test_when_reset_timeout_elapses_the_circuit_must_be_half_open():
+    clock = FakeClock()
+    breaker = CircuitBreaker(
+        failure_threshold=1, reset_timeout=10, clock=clock
+    )
+    with pytest.raises(ValueError):
+        await breaker.call(fail)
+    clock.now = 10
+    assert breaker.state == HALF_OPEN
+
+
+@pytest.mark.asyncio
+async def test_when_half_open_probe_succeeds_the_circuit_must_close():
+    clock = FakeClock()
+    breaker = CircuitBreaker(
+        failure_threshold=1, reset_timeout=10, clock=clock
+    )
+    with pytest.raises(ValueError):
+        await breaker.call(fail)
+    clock.now = 10
+    assert await breaker.call(succeed) == "ok"
+    assert breaker.state == CLOSED
+
+
+@pytest.mark.asyncio
+async def test_when_half_open_probe_fails_the_circuit_must_open_again():
+    clock = FakeClock()
+    breaker = CircuitBreaker(
+        failure_threshold=3, reset_timeout=10, clock=clock
+    )
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            await breaker.call(fail)
+    clock.now = 10
+    with pytest.raises(ValueError):
+        await breaker.call(fail)
+    assert breaker.state == OPEN
+
+
+@pytest.mark.asyncio
+async def test_when_half_open_only_one_probe_must_be_allowed():
+    clock = FakeClock()
+    breaker = CircuitBreaker(
+        failure_threshold=1, reset_timeout=10, clock=clock
+    )
+    with pytest.raises(ValueError):
+        await breaker.call(fail)
+    clock.now = 10
+    release = asyncio.Event()
+
+    async def probe() -> str:
+        await release.wait()
+        return "ok"
+
+    probing = asyncio.create_task(breaker.call(probe))
+    await asyncio.sleep(0)
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(succeed)
+    release.set()
+    assert await probing == "ok"
+
+
+@pytest.mark.asyncio
+async def test_when_a_call_is_slower_than_threshold_it_must_count_as_failure():
+    clock = FakeClock()
+    breaker = CircuitBreaker(
+        failure_threshold=1,
+        reset_timeout=10,
+        slow_call_threshold=2,
+        clock=clock,
+    )
+
+    async def slow() -> str:
+        clock.now += 3
+        return "ok"
+
+    assert await breaker.call(slow) == "ok"
+    assert breaker.state == OPEN
+    assert breaker.stats()["slow_calls"] == 1
+
+
+# endregion
+
+# region bulkhead
+
+
+@pytest.mark.asyncio
+async def test_when_bulkhead_is_full_it_must_reject_the_call():
+    bulkhead = Bulkhead(max_concurrent_calls=1)
+    async with bulkhead:
+        with pytest.raises(BulkheadFullError):
+            async with bulkhead:
+                pass
+    assert bulkhead.stats()["rejected_calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_when_bulkhead_slot_is_released_it_must_accept_a_new_call():
+    bulkhead = Bulkhead(max_concurrent_calls=1)
+    async with bulkhead:
+        assert bulkhead.in_use == 1
+    async with bulkhead:
+        assert bulkhead.in_use == 1
+    assert bulkhead.in_use == 0
+
+
+@pytest.mark.asyncio
+async def test_when_bulkhead_has_max_wait_it_must_wait_for_a_free_slot():
+    bulkhead = Bulkhead(max_concurrent_calls=1, max_wait=1)
+
+    async def hold() -> None:
+        async with bulkhead:
+            await asyncio.sleep(0.01)
+
+    holding = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    async with bulkhead:
+        pass
+    await holding
+    assert bulkhead.stats()["rejected_calls"] == 0
+
+
+# endregion
@@ -1,14 +1,24 @@
+import asyncio
+import time
 from datetime import datetime, timedelta
 from unittest import mock
 
 import jwt
 import pytest
+from passlib.hash import argon2
 
 from app.core.config import settings
 from app.core.security import (
+    PasswordHashPool,
+    PasswordHashPoolBusyError,
+    VerifiedTokenCache,
+    async_get_password_hash,
+    async_verify_password,
+    build_pwd_context,
     create_jwt_token,
     decode_jwt_token,
     get_password_hash,
+    keyring,
     verify_password,
 )
 
@@ -64,6 +74,66 @@ def test_when_verify_password_if_password_and_hash_are_incorrect_must_return_fal
     assert result is False
 
 
+# endregion
+
+# region async password hashing
+
+
+@pytest.mark.asyncio
+async def test_when_async_get_password_hash_must_return_a_valid_hash():
+    password = "testing_password"
+    hash_ = await async_get_password_hash(password)
+    assert verify_password(password, hash_)
+
+
+@pytest.mark.asyncio
+async def test_when_async_verify_password_if_password_and_hash_are_correct_must_return_true():
+    password = "testing_verify_password"
+    hash_ = get_password_hash(password)
+    result = await async_verify_password(password, hash_)
+    assert result is True
+
+
+@pytest.mark.asyncio
+async def test_when_async_verify_password_if_password_and_hash_are_incorrect_must_return_false():
+    hash_ = get_password_hash("testing_verify_password")
+    result = await async_verify_password("incorrect_password", hash_)
+    assert result is False
+
+
+@pytest.mark.asyncio
+async def test_password_hash_pool_must_not_block_the_event_loop():
+    pool = PasswordHashPool(max_workers=1, max_concurrency=1)
+    hash_task = asyncio.create_task(pool.run(time.sleep, 0.2))
+    started = time.perf_counter()
+    await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    await hash_task
+    pool.shutdown()
+    assert elapsed < 0.1
+
+
+@pytest.mark.asyncio
+async def test_password_hash_pool_if_queue_timeout_is_exceeded_must_raise_busy_error():
+    pool = PasswordHashPool(
+        max_workers=1, max_concurrency=1, queue_timeout=0.01
+    )
+    hash_task = asyncio.create_task(pool.run(time.sleep, 0.2))
+    await asyncio.sleep(0)
+    with pytest.raises(PasswordHashPoolBusyError):
+        await pool.run(time.sleep, 0)
+    await hash_task
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_password_hash_pool_map_must_return_the_results_in_order():
+    pool = PasswordHashPool(max_workers=2, max_concurrency=2)
+    result = await pool.map(str.upper, ["a", "b", "c", "d", "e"], chunk_size=2)
+    pool.shutdown()
+    assert result == ["A", "B", "C", "D", "E"]
+
+
 # endregion
 
 # region function decode_jwt_token
@@ -214,3 +284,134 @@ def test_when_create_jwt_token_if_expires_delta_was_not_passed_the_exp_must_be_u
 
 
 # endregion
+
+# region create_jwt_token claims
+
+
+def test_when_create_jwt_token_with_claims_they_must_be_in_the_payload():
+    token = create_jwt_token(subject=1, claims={"cpf": "12345678901"})
+    assert decode_jwt_token(token)["cpf"] == "12345678901"
+
+
+def test_when_create_jwt_token_with_claims_they_must_not_override_sub():
+    token = create_jwt_token(subject=1, claims={"sub": 2})
+    assert decode_jwt_token(token)["sub"] == 1
+
+
+def test_when_create_jwt_token_each_token_must_have_an_unique_jti():
+    first = decode_jwt_token(create_jwt_token(subject=1))
+    second = decode_jwt_token(create_jwt_token(subject=1))
+    assert first["jti"] != second["jti"]
+
+
+def test_when_create_jwt_token_the_header_must_have_the_active_kid():
+    token = create_jwt_token(subject=1)
+    assert jwt.get_unverified_header(token)["kid"] == keyring.active.kid
+
+
+def test_when_decode_jwt_token_if_kid_is_unknown_it_must_raise_invalid_token_error():
+    token = jwt.encode(
+        {"sub": 1}, "secret", algorithm="HS256", headers={"kid": "unknown"}
+    )
+    with pytest.raises(jwt.InvalidTokenError):
+        decode_jwt_token(token)
+
+
+# endregion
+
+# region VerifiedTokenCache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_when_verified_token_cache_has_the_token_must_return_its_payload():
+    cache = VerifiedTokenCache(ttl=60, max_entries=10, clock=FakeClock())
+    cache.set("token", {"sub": "1", "exp": 2000})
+    assert cache.get("token") == {"sub": "1", "exp": 2000}
+
+
+def test_when_verified_token_cache_has_not_the_token_must_return_none():
+    cache = VerifiedTokenCache(ttl=60, max_entries=10, clock=FakeClock())
+    assert cache.get("token") is None
+
+
+def test_when_verified_token_cache_entry_must_not_live_beyond_token_exp():
+    clock = FakeClock()
+    cache = VerifiedTokenCache(ttl=60, max_entries=10, clock=clock)
+    cache.set("token", {"sub": "1", "exp": 1010})
+    clock.now = 1010
+    assert cache.get("token") is None
+
+
+def test_when_verified_token_cache_ttl_elapses_the_entry_must_expire():
+    clock = FakeClock()
+    cache = VerifiedTokenCache(ttl=60, max_entries=10, clock=clock)
+    cache.set("token", {"sub": "1", "exp": 5000})
+    clock.now = 1060
+    assert cache.get("token") is None
+
+
+def test_when_verified_token_cache_payload_is_changed_the_cache_must_not():
+    cache = VerifiedTokenCache(ttl=60, max_entries=10, clock=FakeClock())
+    cache.set("token", {"sub": "1", "exp": 2000})
+    cache.get("token")["sub"] = "2"
+    assert cache.get("token")["sub"] == "1"
+
+
+def test_when_verified_token_cache_stats_must_expose_the_hit_rate():
+    cache = VerifiedTokenCache(ttl=60, max_entries=10, clock=FakeClock())
+    cache.set("token", {"sub": "1", "exp": 2000})
+    cache.get("token")
+    cache.get("other")
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+# endregion
+
+
+# region function build_pwd_context
+
+
+def test_when_hash_has_an_outdated_cost_verify_and_update_must_return_new_hash():
+    outdated_hash = build_pwd_context(bcrypt_rounds=4).hash("password")
+    context = build_pwd_context(bcrypt_rounds=5)
+    verified, new_hash = context.verify_and_update("password", outdated_hash)
+    assert verified
+    assert context.identify(new_hash) == "bcrypt"
+    assert not context.needs_update(new_hash)
+
+
+def test_when_hash_has_a_higher_cost_it_must_need_update():
+    hash_ = build_pwd_context(bcrypt_rounds=6).hash("password")
+    assert build_pwd_context(bcrypt_rounds=5).needs_update(hash_)
+
+
+@pytest.mark.skipif(
+    not argon2.has_backend(), reason="argon2-cffi is not installed"
+)
+def test_when_scheme_is_argon2_bcrypt_hashes_must_need_update():
+    hash_ = build_pwd_context(bcrypt_rounds=4).hash("password")
+    context = build_pwd_context("argon2")
+    assert context.verify("password", hash_)
+    assert context.needs_update(hash_)
+
+
+def test_when_scheme_is_argon2_without_its_backend_it_must_raise_error():
+    with mock.patch.object(argon2, "has_backend", return_value=False):
+        with pytest.raises(ValueError):
+            build_pwd_context("argon2")
+
+
+def test_when_argon2_backend_is_missing_bcrypt_context_must_not_register_it():
+    with mock.patch.object(argon2, "has_backend", return_value=False):
+        context = build_pwd_context("bcrypt", bcrypt_rounds=4)
+    assert context.schemes() == ("bcrypt",)
+
+
+# endregion
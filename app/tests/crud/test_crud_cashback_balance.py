@@ -0,0 +1,167 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, schemas
+from app.crud.crud_purchase import PurchaseCodeAlreadyUsedError
+from app.database.session import async_session
+from app.tests.utils.purchase import (
+    create_random_purchase_in_db,
+    random_purchase_dict_for_crud,
+)
+from app.tests.utils.user import create_random_user_in_db
+
+
+async def assert_balance_matches_purchases(
+    db: AsyncSession, user_id: int
+) -> None:
+    for status in schemas.statusEnum:
+        balance = await crud.cashback_balance.get_by_user_id(
+            db=db, user_id=user_id, status=status
+        )
+        purchases_sum = await crud.purchase.get_cashback_sum_by_user_id(
+            db=db, user_id=user_id, status=status
+        )
+        assert round(balance, 2) == round(purchases_sum, 2)
+
+
+@pytest.mark.asyncio
+async def test_when_purchases_are_created_the_balance_must_be_their_cashback_sum(
+    db: AsyncSession,
+) -> None:
+    user = await create_random_user_in_db(db)
+    for _ in range(3):
+        await create_random_purchase_in_db(db=db, user=user)
+    await assert_balance_matches_purchases(db, user.id)
+
+
+@pytest.mark.asyncio
+async def test_when_purchase_status_is_updated_its_cashback_must_move_to_the_new_status(
+    db: AsyncSession,
+) -> None:
+    user = await create_random_user_in_db(db)
+    purchase = await create_random_purchase_in_db(db=db, user=user)
+    await crud.purchase.update(
+        db=db,
+        db_purchase=purchase,
+        purchase_in={"status": schemas.statusEnum.APPROVED},
+    )
+    approved = await crud.cashback_balance.get_by_user_id(
+        db=db, user_id=user.id, status=schemas.statusEnum.APPROVED
+    )
+    in_validation = await crud.cashback_balance.get_by_user_id(
+        db=db, user_id=user.id, status=schemas.statusEnum.IN_VALIDATION
+    )
+    assert round(approved, 2) == round(purchase.cashback_value, 2)
+    assert in_validation == 0
+
+
+@pytest.mark.asyncio
+async def test_when_purchase_value_is_updated_the_balance_must_follow(
+    db: AsyncSession,
+) -> None:
+    user = await create_random_user_in_db(db)
+    purchase = await create_random_purchase_in_db(db=db, user=user)
+    await crud.purchase.update(
+        db=db, db_purchase=purchase, purchase_in={"value": Decimal("3000")}
+    )
+    await assert_balance_matches_purchases(db, user.id)
+
+
+@pytest.mark.asyncio
+async def test_when_purchase_is_deleted_its_cashback_must_leave_the_balance(
+    db: AsyncSession,
+) -> None:
+    user = await create_random_user_in_db(db)
+    purchase = await create_random_purchase_in_db(db=db, user=user)
+    await crud.purchase.delete_by_id(db=db, id=purchase.id)
+    balance = await crud.cashback_balance.get_by_user_id(
+        db=db, user_id=user.id
+    )
+    assert balance == 0
+
+
+@pytest.mark.asyncio
+async def test_when_purchase_create_fails_the_balance_must_not_change() -> (
+    None
+):
+    # own session, as the error rolls it back
+    async with async_session() as db:
+        user = await create_random_user_in_db(db)
+        purchase = await create_random_purchase_in_db(db=db, user=user)
+        user_id = user.id
+        purchase_dict = random_purchase_dict_for_crud(user)
+        purchase_dict["code"] = purchase.code
+        with pytest.raises(PurchaseCodeAlreadyUsedError):
+            await crud.purchase.create(db=db, purchase_in=purchase_dict)
+        await assert_balance_matches_purchases(db, user_id)
+
+
+@pytest.mark.asyncio
+async def test_when_balance_is_rebuilt_it_must_match_the_purchases_again(
+    db: AsyncSession,
+) -> None:
+    user = await create_random_user_in_db(db)
+    purchase = await create_random_purchase_in_db(db=db, user=user)
+    # a drift
+    await crud.cashback_balance.apply_deltas(
+        db, [(user.id, purchase.status_id, Decimal("10"))]
+    )
+    await db.commit()
+    await crud.cashback_balance.rebuild(db=db, user_id=user.id)
+    await assert_balance_matches_purchases(db, user.id)
+
+
+@pytest.mark.asyncio
+async def test_when_purchase_is_deleted_by_two_sessions_its_cashback_must_leave_the_balance_once() -> (
+    None
+):
+    async with async_session() as db, async_session() as other_db:
+        user = await create_random_user_in_db(db)
+        purchase = await create_random_purchase_in_db(db=db, user=user)
+        results = await asyncio.gather(
+            crud.purchase.delete_by_id(db=db, id=purchase.id),
+            crud.purchase.delete_by_id(db=other_db, id=purchase.id),
+        )
+        assert len([result for result in results if result]) == 1
+        balance = await crud.cashback_balance.get_by_user_id(
+            db=db, user_id=user.id
+        )
+        assert balance == 0
+        assert not await crud.cashback_rollup.get_by_user_id(
+            db=db, user_id=user.id
+        )
+
+
+@pytest.mark.asyncio
+async def test_when_purchase_is_updated_by_two_sessions_the_balance_must_follow_the_last_update() -> (
+    None
+):
+    async with async_session() as db, async_session() as other_db:
+        user = await create_random_user_in_db(db)
+        purchase = await create_random_purchase_in_db(db=db, user=user)
+        # both sessions read the purchase before any of them changes it
+        other_purchase = await crud.purchase.get_by_id(
+            db=other_db, id=purchase.id
+        )
+        await crud.purchase.update(
+            db=db, db_purchase=purchase, purchase_in={"value": Decimal("200")}
+        )
+        await crud.purchase.update(
+            db=other_db,
+            db_purchase=other_purchase,
+            purchase_in={"value": Decimal("300")},
+        )
+        await assert_balance_matches_purchases(db, user.id)
+        rollups = await crud.cashback_rollup.get_by_user_id(
+            db=db, user_id=user.id
+        )
+        assert [
+            (rollup.purchase_count, round(rollup.value, 2))
+            for rollup in rollups
+        ] == [(1, Decimal("300.00"))]
+        assert round(rollups[0].cashback_value, 2) == round(
+            other_purchase.cashback_value, 2
+        )
@@ -0,0 +1,209 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, models, schemas
+from app.crud.cashback_rebuild import rebuild_by_user
+from app.crud.crud_purchase import PurchaseCodeAlreadyUsedError
+from app.database.session import async_session
+from app.tests.utils.purchase import (
+    create_random_purchase_in_db,
+    random_purchase_dict_for_crud,
+)
+from app.tests.utils.user import create_random_user_in_db
+
+
+async def create_purchase(
+    db: AsyncSession, user: models.User, day: date
+) -> models.Purchase:
+    purchase_dict = random_purchase_dict_for_crud(user)
+    purchase_dict["date"] = day
+    return await crud.purchase.create(db=db, purchase_in=purchase_dict)
+
+
+async def rollup_totals(db: AsyncSession, user_id: int) -> dict:
+    rollups = await crud.cashback_rollup.get_by_user_id(db=db, user_id=user_id)
+    return {
+        (rollup.month, rollup.status_id): (
+            rollup.purchase_count,
+            round(rollup.value, 2),
+            round(rollup.cashback_value, 2),
+        )
+        for rollup in rollups
+    }
+
+
+async def purchase_totals(db: AsyncSession, user_id: int) -> dict:
+    purchases = await crud.purchase.get_multi_by_user_id(
+        db=db, user_id=user_id, limit=1000
+    )
+    totals = {}
+    for purchase in purchases:
+        key = (purchase.date.replace(day=1), purchase.status_id)
+        count, value, cashback = totals.get(key, (0, 0, 0))
+        totals[key] = (
+            count + 1,
+            value + purchase.value,
+            cashback + purchase.cashback_value,
+        )
+    return {
+        key: (count, round(value, 2), round(cashback, 2))
+        for key, (count, value, cashback) in totals.items()
+    }
+
+
+async def assert_rollups_match_purchases(
+    db: AsyncSession, user_id: int
+) -> None:
+    assert await rollup_totals(db, user_id) == await purchase_totals(
+        db, user_id
+    )
+
+
+@pytest.mark.asyncio
+async def test_when_purchases_are_created_the_rollups_must_be_their_monthly_totals(
+    db: AsyncSession,
+) -> None:
+    user = await create_random_user_in_db(db)
+    await create_purchase(db, user, date(2026, 1, 5))
+    await create_purchase(db, user, date(2026, 1, 28))
+    await create_purchase(db, user, date(2026, 3, 1))
+    totals = await rollup_totals(db, user.id)
+    assert sorted(month for month, _ in totals) == [
+        date(2026, 1, 1),
+        date(2026, 3, 1),
+    ]
+    await assert_rollups_match_purchases(db, user.id)
+
+
+@pytest.mark.asyncio
+async def test_when_purchase_date_is_updated_it_must_move_to_the_new_month(
+    db: AsyncSession,
+) -> None:
+    user = await create_random_user_in_db(db)
+    purchase = await create_purchase(db, user, date(2026, 1, 5))
+    await crud.purchase.update(
+        db=db, db_purchase=purchase, purchase_in={"date": date(2026, 2, 5)}
+    )
+    totals = await rollup_totals(db, user.id)
+    assert [month for month, _ in totals] == [date(2026, 2, 1)]
+    await assert_rollups_match_purchases(db, user.id)
+
+
+@pytest.mark.asyncio
+async def test_when_purchase_status_is_updated_it_must_move_to_the_new_status(
+    db: AsyncSession,
+) -> None:
+    user = await create_random_user_in_db(db)
+    purchase = await create_random_purchase_in_db(db=db, user=user)
+    await crud.purchase.update(
+        db=db,
+        db_purchase=purchase,
+        purchase_in={"status": schemas.statusEnum.APPROVED},
+    )
+    approved_id = await crud.purchase_status_registry.resolve_id(
+        db=db, name=schemas.statusEnum.APPROVED
+    )
+    totals = await rollup_totals(db, user.id)
+    assert [status_id for _, status_id in totals] == [approved_id]
+    await assert_rollups_match_purchases(db, user.id)
+
+
+@pytest.mark.asyncio
+async def test_when_purchase_is_deleted_it_must_leave_the_rollups(
+    db: AsyncSession,
+) -> None:
+    user = await create_random_user_in_db(db)
+    purchase = await create_random_purchase_in_db(db=db, user=user)
+    await crud.purchase.delete_by_id(db=db, id=purchase.id)
+    assert await rollup_totals(db, user.id) == {}
+
+
+@pytest.mark.asyncio
+async def test_when_purchase_create_fails_the_rollups_must_not_change() -> (
+    None
+):
+    # own session, as the error rolls it back
+    async with async_session() as db:
+        user = await create_random_user_in_db(db)
+        purchase = await create_random_purchase_in_db(db=db, user=user)
+        user_id = user.id
+        purchase_dict = random_purchase_dict_for_crud(user)
+        purchase_dict["code"] = purchase.code
+        with pytest.raises(PurchaseCodeAlreadyUsedError):
+            await crud.purchase.create(db=db, purchase_in=purchase_dict)
+        await assert_rollups_match_purchases(db, user_id)
+
+
+@pytest.mark.asyncio
+async def test_when_getting_rollups_by_month_range_only_its_months_must_be_returned(
+    db: AsyncSession,
+) -> None:
+    user = await create_random_user_in_db(db)
+    for month in (1, 2, 3, 4):
+        await create_purchase(db, user, date(2026, month, 10))
+    rollups = await crud.cashback_rollup.get_by_user_id(
+        db=db,
+        user_id=user.id,
+        month_from=date(2026, 2, 1),
+        month_to=date(2026, 3, 1),
+    )
+    assert [rollup.month for rollup in rollups] == [
+        date(2026, 2, 1),
+        date(2026, 3, 1),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_when_rollups_are_rebuilt_they_must_match_the_purchases_again(
+    db: AsyncSession,
+) -> None:
+    user = await create_random_user_in_db(db)
+    purchase = await create_purchase(db, user, date(2026, 5, 17))
+    # a drift
+    await crud.cashback_rollup.apply_deltas(
+        db,
+        [
+            (
+                user.id,
+                purchase.date,
+                purchase.status_id,
+                1,
+                Decimal("10"),
+                Decimal("1"),
+            )
+        ],
+    )
+    await db.commit()
+    await crud.cashback_rollup.rebuild(db=db, user_id=user.id)
+    await assert_rollups_match_purchases(db, user.id)
+
+
+@pytest.mark.asyncio
+async def test_when_rebuilding_by_user_each_rebuild_must_run_for_the_user(
+    db: AsyncSession,
+) -> None:
+    user = await create_random_user_in_db(db)
+    purchase = await create_purchase(db, user, date(2022, 3, 10))
+    # a drift of both aggregates
+    await crud.cashback_balance.apply_deltas(
+        db, [(user.id, purchase.status_id, Decimal("10"))]
+    )
+    await crud.cashback_rollup.apply_deltas(
+        db,
+        [(user.id, purchase.date, purchase.status_id, 1, Decimal("10"), 0)],
+    )
+    await db.commit()
+    await rebuild_by_user(
+        db,
+        crud.cashback_balance.rebuild_user,
+        crud.cashback_rollup.rebuild_user,
+        user_id=user.id,
+    )
+    await assert_rollups_match_purchases(db, user.id)
+    balance = await crud.cashback_balance.get_by_user_id(
+        db=db, user_id=user.id
+    )
+    assert round(balance, 2) == round(purchase.cashback_value, 2)
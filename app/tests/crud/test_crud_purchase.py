@@ -1,10 +1,17 @@
+from datetime import date
 from decimal import Decimal
+from typing import List
 
 import pytest
 import pytest_asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, models, schemas
+from app.crud.crud_purchase import (
+    PurchaseCodeAlreadyUsedError,
+    PurchaseUserNotFoundError,
+)
+from app.database.session import async_session
 from app.tests.utils.purchase import (
     create_random_purchase_in_db,
     fake,
@@ -214,3 +221,224 @@ async def test_if_get_multi_by_user_id_skip_the_correct_quantity_of_purchases(
         db=db, user_id=random_user.id, skip=2, limit=1
     )
     assert purchase[0].id == db_purchases[2].id
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_sum_by_user_id_must_return_the_sum_of_user_cashback(
+    db: AsyncSession,
+) -> None:
+    user = await crud.user.create(db=db, user_in=random_user_dict())
+    expected = Decimal(0)
+    for _ in range(3):
+        purchase = await create_random_purchase_in_db(db=db, user=user)
+        expected += purchase.cashback_value
+    result = await crud.purchase.get_cashback_sum_by_user_id(
+        db=db, user_id=user.id
+    )
+    assert result == pytest.approx(expected)
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_sum_by_user_id_must_return_a_decimal(
+    db: AsyncSession, random_purchase: models.Purchase
+) -> None:
+    result = await crud.purchase.get_cashback_sum_by_user_id(
+        db=db, user_id=random_purchase.user_id
+    )
+    assert isinstance(result, Decimal)
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_sum_by_user_id_if_user_has_no_purchases_must_return_zero(
+    db: AsyncSession,
+) -> None:
+    user = await crud.user.create(db=db, user_in=random_user_dict())
+    result = await crud.purchase.get_cashback_sum_by_user_id(
+        db=db, user_id=user.id
+    )
+    assert result == Decimal(0)
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_sum_by_user_id_if_status_is_passed_must_sum_only_purchases_with_this_status(
+    db: AsyncSession,
+) -> None:
+    user = await crud.user.create(db=db, user_in=random_user_dict())
+    approved_purchase = await create_random_purchase_in_db(db=db, user=user)
+    await crud.purchase.update(
+        db=db,
+        db_purchase=approved_purchase,
+        purchase_in={"status": schemas.statusEnum.APPROVED},
+    )
+    await create_random_purchase_in_db(db=db, user=user)
+    result = await crud.purchase.get_cashback_sum_by_user_id(
+        db=db, user_id=user.id, status=schemas.statusEnum.APPROVED
+    )
+    assert result == pytest.approx(approved_purchase.cashback_value)
+
+
+@pytest.mark.asyncio
+async def test_when_create_purchase_if_code_already_exists_must_raise_code_already_used_error() -> (
+    None
+):
+    # own session, as the error rolls it back
+    async with async_session() as db:
+        user = await crud.user.create(db=db, user_in=random_user_dict())
+        purchase = await create_random_purchase_in_db(db=db, user=user)
+        purchase_dict = random_purchase_dict_for_crud(user)
+        purchase_dict["code"] = purchase.code
+        with pytest.raises(PurchaseCodeAlreadyUsedError):
+            await crud.purchase.create(db=db, purchase_in=purchase_dict)
+
+
+@pytest.mark.asyncio
+async def test_when_create_purchase_if_no_user_has_the_cpf_must_raise_user_not_found_error(
+    db: AsyncSession,
+) -> None:
+    user = await crud.user.create(db=db, user_in=random_user_dict())
+    purchase_dict = random_purchase_dict_for_crud(user)
+    await crud.user.delete_by_id(db=db, id=user.id)
+    with pytest.raises(PurchaseUserNotFoundError):
+        await crud.purchase.create(db=db, purchase_in=purchase_dict)
+
+
+@pytest.mark.asyncio
+async def test_when_update_purchase_code_to_a_used_one_must_raise_code_already_used_error() -> (
+    None
+):
+    # own session, as the error rolls it back
+    async with async_session() as db:
+        user = await crud.user.create(db=db, user_in=random_user_dict())
+        purchase = await create_random_purchase_in_db(db=db, user=user)
+        other_purchase = await create_random_purchase_in_db(db=db, user=user)
+        with pytest.raises(PurchaseCodeAlreadyUsedError):
+            await crud.purchase.update(
+                db=db,
+                db_purchase=other_purchase,
+                purchase_in={"code": purchase.code},
+            )
+
+
+@pytest.mark.asyncio
+async def test_when_purchase_code_is_updated_the_old_code_must_be_free_again(
+    db: AsyncSession, random_user: models.User
+) -> None:
+    purchase = await create_random_purchase_in_db(db=db, user=random_user)
+    old_code = purchase.code
+    await crud.purchase.update(
+        db=db, db_purchase=purchase, purchase_in={"code": fake.uuid4()}
+    )
+    purchase_dict = random_purchase_dict_for_crud(random_user)
+    purchase_dict["code"] = old_code
+    new_purchase = await crud.purchase.create(db=db, purchase_in=purchase_dict)
+    returned_purchase = await crud.purchase.get_by_code(db=db, code=old_code)
+    assert returned_purchase.id == new_purchase.id
+
+
+@pytest.mark.asyncio
+async def test_when_purchase_is_deleted_its_code_must_be_free_again(
+    db: AsyncSession, random_user: models.User
+) -> None:
+    purchase = await create_random_purchase_in_db(db=db, user=random_user)
+    await crud.purchase.delete_by_id(db=db, id=purchase.id)
+    purchase_dict = random_purchase_dict_for_crud(random_user)
+    purchase_dict["code"] = purchase.code
+    new_purchase = await crud.purchase.create(db=db, purchase_in=purchase_dict)
+    assert new_purchase.code == purchase.code
+
+
+@pytest.mark.asyncio
+async def test_when_purchase_date_is_updated_it_must_still_be_found_by_code(
+    db: AsyncSession, random_purchase: models.Purchase
+) -> None:
+    await crud.purchase.update(
+        db=db,
+        db_purchase=random_purchase,
+        purchase_in={"date": date(2026, 7, 14)},
+    )
+    returned_purchase = await crud.purchase.get_by_code(
+        db=db, code=random_purchase.code
+    )
+    assert returned_purchase.id == random_purchase.id
+    assert returned_purchase.date == date(2026, 7, 14)
+
+
+async def create_purchases_of_new_user(
+    db: AsyncSession, *purchases_data: dict
+) -> List[models.Purchase]:
+    user = await crud.user.create(db=db, user_in=random_user_dict())
+    purchases = []
+    for purchase_data in purchases_data:
+        purchase_dict = random_purchase_dict_for_crud(user) | purchase_data
+        purchases.append(
+            await crud.purchase.create(db=db, purchase_in=purchase_dict)
+        )
+    return purchases
+
+
+@pytest.mark.asyncio
+async def test_when_get_multi_by_user_id_with_filters_must_return_only_the_matching_purchases(
+    db: AsyncSession,
+) -> None:
+    purchases = await create_purchases_of_new_user(
+        db,
+        {"date": date(2022, 1, 10), "value": Decimal("100")},
+        {"date": date(2022, 1, 20), "value": Decimal("2000")},
+        {"date": date(2022, 2, 10), "value": Decimal("2000")},
+    )
+    result = await crud.purchase.get_multi_by_user_id(
+        db=db,
+        user_id=purchases[0].user_id,
+        filters=schemas.PurchaseFilter(
+            date_from=date(2022, 1, 1),
+            date_to=date(2022, 1, 31),
+            value_min=Decimal("1500"),
+        ),
+    )
+    assert [purchase.id for purchase in result] == [purchases[1].id]
+
+
+@pytest.mark.asyncio
+async def test_when_get_multi_by_user_id_with_status_filter_must_return_only_the_purchases_with_the_status(
+    db: AsyncSession,
+) -> None:
+    purchases = await create_purchases_of_new_user(
+        db, {"status": schemas.statusEnum.APPROVED}, {}
+    )
+    result = await crud.purchase.get_multi_by_user_id(
+        db=db,
+        user_id=purchases[0].user_id,
+        filters=schemas.PurchaseFilter(status=schemas.statusEnum.APPROVED),
+    )
+    assert [purchase.id for purchase in result] == [purchases[0].id]
+
+
+@pytest.mark.asyncio
+async def test_when_get_multi_by_user_id_sorted_by_value_desc_must_page_with_ties_ordered_by_id(
+    db: AsyncSession,
+) -> None:
+    purchases = await create_purchases_of_new_user(
+        db,
+        {"value": Decimal("10")},
+        {"value": Decimal("30")},
+        {"value": Decimal("20")},
+        {"value": Decimal("30")},
+    )
+    sort = schemas.PurchaseSortEnum.VALUE_DESC
+    user_id = purchases[0].user_id
+    first_page = await crud.purchase.get_multi_by_user_id(
+        db=db, user_id=user_id, limit=2, sort=sort
+    )
+    second_page = await crud.purchase.get_multi_by_user_id(
+        db=db,
+        user_id=user_id,
+        limit=2,
+        sort=sort,
+        after=crud.purchase.sort_position(first_page[-1], sort),
+    )
+    assert [purchase.id for purchase in first_page + second_page] == [
+        purchases[3].id,
+        purchases[1].id,
+        purchases[2].id,
+        purchases[0].id,
+    ]
@@ -1,7 +1,10 @@
+from unittest import mock
+
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud
+from app.crud.crud_purchasestatus import PurchaseStatusRegistry
 from app.tests.utils.purchase_status import random_purchase_status_dict
 
 
@@ -39,3 +42,64 @@ async def test_if_get_by_name_return_correct_purchase_status(
         db=db, name=created_purchase_status.name
     )
     assert returned_purchase_status.id == created_purchase_status.id
+
+
+@pytest.mark.asyncio
+async def test_when_purchase_status_is_created_it_must_be_in_the_registry(
+    db: AsyncSession,
+) -> None:
+    created_purchase_status = await crud.purchase_status.create(
+        db=db, purchase_status_in=random_purchase_status_dict()
+    )
+    status_id = crud.purchase_status_registry.get_id(
+        created_purchase_status.name
+    )
+    assert status_id == created_purchase_status.id
+
+
+@pytest.mark.asyncio
+async def test_when_registry_is_loaded_it_must_map_names_and_ids(
+    db: AsyncSession,
+) -> None:
+    created_purchase_status = await crud.purchase_status.create(
+        db=db, purchase_status_in=random_purchase_status_dict()
+    )
+    registry = PurchaseStatusRegistry()
+    await registry.load(db)
+    assert (
+        registry.get_name(created_purchase_status.id)
+        == created_purchase_status.name
+    )
+
+
+@pytest.mark.asyncio
+async def test_when_resolve_id_if_name_is_in_registry_it_must_not_query_the_database():
+    registry = PurchaseStatusRegistry()
+    registry.register(id=1, name="Approved")
+    db = mock.AsyncMock()
+    status_id = await registry.resolve_id(db=db, name="Approved")
+    assert status_id == 1
+    db.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_when_resolve_id_if_name_is_not_in_registry_it_must_reload_it(
+    db: AsyncSession,
+) -> None:
+    created_purchase_status = await crud.purchase_status.create(
+        db=db, purchase_status_in=random_purchase_status_dict()
+    )
+    registry = PurchaseStatusRegistry()
+    status_id = await registry.resolve_id(
+        db=db, name=created_purchase_status.name
+    )
+    assert status_id == created_purchase_status.id
+
+
+@pytest.mark.asyncio
+async def test_when_resolve_id_if_status_does_not_exist_must_raise_value_error(
+    db: AsyncSession,
+) -> None:
+    registry = PurchaseStatusRegistry()
+    with pytest.raises(ValueError):
+        await registry.resolve_id(db=db, name="non existent status")
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.crud.crud_refresh_token import (
+    InvalidRefreshTokenError,
+    RefreshTokenReuseError,
+)
+from app.tests.utils.user import random_user_dict
+
+
+async def create_user_id(db: AsyncSession) -> int:
+    user = await crud.user.create(db=db, user_in=random_user_dict())
+    return user.id
+
+
+@pytest.mark.asyncio
+async def test_when_issue_refresh_token_only_its_hash_must_be_stored(
+    db: AsyncSession,
+) -> None:
+    user_id = await create_user_id(db)
+    token = await crud.refresh_token.issue(db=db, user_id=user_id)
+    db_token = await crud.refresh_token.get_by_token(db=db, token=token)
+    assert db_token.token_hash == crud.refresh_token.hash_token(token)
+    assert db_token.token_hash != token
+
+
+@pytest.mark.asyncio
+async def test_when_rotate_refresh_token_must_return_a_new_token_of_the_same_family(
+    db: AsyncSession,
+) -> None:
+    user_id = await create_user_id(db)
+    token = await crud.refresh_token.issue(db=db, user_id=user_id)
+    new_token, token_user_id = await crud.refresh_token.rotate(
+        db=db, token=token
+    )
+    old = await crud.refresh_token.get_by_token(db=db, token=token)
+    new = await crud.refresh_token.get_by_token(db=db, token=new_token)
+    assert token_user_id == user_id
+    assert old.used_at is not None
+    assert new.family_id == old.family_id
+
+
+@pytest.mark.asyncio
+async def test_when_rotate_unknown_refresh_token_must_raise_invalid_error(
+    db: AsyncSession,
+) -> None:
+    with pytest.raises(InvalidRefreshTokenError):
+        await crud.refresh_token.rotate(db=db, token="unknown")
+
+
+@pytest.mark.asyncio
+async def test_when_rotate_expired_refresh_token_must_raise_invalid_error(
+    db: AsyncSession,
+) -> None:
+    user_id = await create_user_id(db)
+    token = await crud.refresh_token.issue(db=db, user_id=user_id)
+    db_token = await crud.refresh_token.get_by_token(db=db, token=token)
+    db_token.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    await db.commit()
+    with pytest.raises(InvalidRefreshTokenError):
+        await crud.refresh_token.rotate(db=db, token=token)
+
+
+@pytest.mark.asyncio
+async def test_when_refresh_token_is_reused_the_whole_family_must_be_revoked(
+    db: AsyncSession,
+) -> None:
+    user_id = await create_user_id(db)
+    token = await crud.refresh_token.issue(db=db, user_id=user_id)
+    new_token, _ = await crud.refresh_token.rotate(db=db, token=token)
+    with pytest.raises(RefreshTokenReuseError):
+        await crud.refresh_token.rotate(db=db, token=token)
+    # the token issued by the rotation is revoked too
+    with pytest.raises(InvalidRefreshTokenError):
+        await crud.refresh_token.rotate(db=db, token=new_token)
@@ -0,0 +1,116 @@
+import uuid
+from datetime import datetime, timedelta
+from unittest import mock
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.crud.crud_revoked_token import TokenRevocationList
+
+
+def new_revocation_list() -> TokenRevocationList:
+    return TokenRevocationList(
+        capacity=100, error_rate=0.01, rebuild_interval=60
+    )
+
+
+@pytest.mark.asyncio
+async def test_when_token_is_revoked_it_must_be_in_the_revocation_list(
+    db: AsyncSession,
+) -> None:
+    revocation_list = new_revocation_list()
+    await revocation_list.rebuild(db)
+    jti = uuid.uuid4().hex
+    await revocation_list.revoke(
+        db, jti=jti, expires_at=datetime.utcnow() + timedelta(minutes=5)
+    )
+    assert await revocation_list.is_revoked(jti)
+
+
+@pytest.mark.asyncio
+async def test_when_token_is_not_revoked_it_must_not_be_in_the_revocation_list(
+    db: AsyncSession,
+) -> None:
+    revocation_list = new_revocation_list()
+    await revocation_list.rebuild(db)
+    assert not await revocation_list.is_revoked(uuid.uuid4().hex)
+
+
+@pytest.mark.asyncio
+async def test_when_revocation_list_is_rebuilt_it_must_load_the_revoked_tokens(
+    db: AsyncSession,
+) -> None:
+    jti = uuid.uuid4().hex
+    await crud.revoked_token.create(
+        db, jti=jti, expires_at=datetime.utcnow() + timedelta(minutes=5)
+    )
+    revocation_list = new_revocation_list()
+    await revocation_list.rebuild(db)
+    assert await revocation_list.is_revoked(jti)
+
+
+@pytest.mark.asyncio
+async def test_when_bloom_filter_has_a_false_positive_it_must_be_counted(
+    db: AsyncSession,
+) -> None:
+    revocation_list = new_revocation_list()
+    await revocation_list.rebuild(db)
+    jti = uuid.uuid4().hex
+    # only in the filter, like a false positive
+    revocation_list.add(jti)
+    assert not await revocation_list.is_revoked(jti)
+    assert revocation_list.stats()["false_positives"] == 1
+
+
+@pytest.mark.asyncio
+async def test_when_delete_expired_the_expired_tokens_must_be_deleted(
+    db: AsyncSession,
+) -> None:
+    jti = uuid.uuid4().hex
+    await crud.revoked_token.create(
+        db, jti=jti, expires_at=datetime.utcnow() - timedelta(minutes=5)
+    )
+    await crud.revoked_token.delete_expired(db)
+    assert not await crud.revoked_token.exists(db, jti)
+
+
+@pytest.mark.asyncio
+async def test_when_token_is_revoked_during_a_rebuild_it_must_be_in_the_new_filter(
+    db: AsyncSession,
+) -> None:
+    revocation_list = new_revocation_list()
+    jti = uuid.uuid4().hex
+    await crud.revoked_token.create(
+        db, jti=jti, expires_at=datetime.utcnow() + timedelta(minutes=5)
+    )
+
+    async def get_active_jtis_before_the_revocation(db):
+        # the revocation arrives while the (older) rows are read
+        revocation_list.add(jti)
+        return []
+
+    with mock.patch.object(
+        crud.revoked_token,
+        "get_active_jtis",
+        get_active_jtis_before_the_revocation,
+    ):
+        await revocation_list.rebuild(db)
+    assert await revocation_list.is_revoked(jti)
+
+
+@pytest.mark.asyncio
+async def test_when_invalidation_bus_reconnects_the_filter_must_be_rebuilt(
+    db: AsyncSession,
+) -> None:
+    revocation_list = new_revocation_list()
+    await revocation_list.rebuild(db)
+    # revoked by another worker while the bus was disconnected
+    jti = uuid.uuid4().hex
+    await crud.revoked_token.create(
+        db, jti=jti, expires_at=datetime.utcnow() + timedelta(minutes=5)
+    )
+    assert not await revocation_list.is_revoked(jti)
+    revocation_list.on_bus_reset()
+    await revocation_list._reset_task
+    assert await revocation_list.is_revoked(jti)
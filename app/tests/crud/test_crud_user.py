@@ -1,8 +1,17 @@
+from unittest import mock
+
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app import crud, models, schemas
-from app.core.security import verify_password
+from app import crud, schemas
+from app.core.security import (
+    build_pwd_context,
+    pwd_context,
+    verify_password,
+)
+from app.crud.crud_user import UserAlreadyExistsError
+from app.database.session import async_session
+from app.tests.utils.purchase import create_random_purchase_in_db
 from app.tests.utils.user import fake, random_user_dict
 
 
@@ -141,13 +150,13 @@ async def test_when_successfully_get_authenticated_user_must_return_user(
     db: AsyncSession,
 ) -> None:
     user_dict = random_user_dict()
-    await crud.user.create(db=db, user_in=user_dict)
+    new_user = await crud.user.create(db=db, user_in=user_dict)
     result = await crud.user.get_authenticated_user(
         db=db,
         user_email=user_dict["email"],
         user_password=user_dict["password"],
     )
-    assert isinstance(result, models.User)
+    assert result.id == new_user.id
 
 
 @pytest.mark.asyncio
@@ -176,3 +185,344 @@ async def test_when_getting_authenticated_user_if_invalid_password_must_return_n
         user_password="invalid_password_test",
     )
     assert result is None
+
+
+@pytest.mark.asyncio
+async def test_when_get_by_id_without_load_purchases_the_purchases_must_not_be_loaded(
+    db: AsyncSession,
+) -> None:
+    new_user = await crud.user.create(db=db, user_in=random_user_dict())
+    returned_user = await crud.user.get_by_id(db=db, id=new_user.id)
+    assert "purchases_" not in returned_user.__dict__
+
+
+@pytest.mark.asyncio
+async def test_when_get_by_id_with_load_purchases_the_purchases_must_be_loaded(
+    db: AsyncSession,
+) -> None:
+    new_user = await crud.user.create(db=db, user_in=random_user_dict())
+    await create_random_purchase_in_db(db=db, user=new_user)
+    returned_user = await crud.user.get_by_id(
+        db=db, id=new_user.id, load_purchases=True
+    )
+    assert len(returned_user.purchases_) == 1
+
+
+@pytest.mark.asyncio
+async def test_when_getting_authenticated_user_the_email_must_be_case_insensitive(
+    db: AsyncSession,
+) -> None:
+    user_dict = random_user_dict()
+    new_user = await crud.user.create(db=db, user_in=user_dict)
+    result = await crud.user.get_authenticated_user(
+        db=db,
+        user_email=user_dict["email"].upper(),
+        user_password=user_dict["password"],
+    )
+    assert result.id == new_user.id
+
+
+@pytest.mark.asyncio
+async def test_when_get_credentials_by_email_must_return_only_id_cpf_and_hash(
+    db: AsyncSession,
+) -> None:
+    user_dict = random_user_dict()
+    new_user = await crud.user.create(db=db, user_in=user_dict)
+    result = await crud.user.get_credentials_by_email(
+        db=db, email=user_dict["email"]
+    )
+    assert result._fields == ("id", "cpf", "hashed_password")
+    assert result.hashed_password == new_user.hashed_password
+
+
+# region user cache
+
+
+@pytest.mark.asyncio
+async def test_when_get_cached_by_id_must_return_an_user_snapshot(
+    db: AsyncSession,
+) -> None:
+    new_user = await crud.user.create(db=db, user_in=random_user_dict())
+    result = await crud.user.get_cached_by_id(db=db, id=new_user.id)
+    assert isinstance(result, schemas.UserSnapshot)
+    assert result.cpf == new_user.cpf
+    assert not hasattr(result, "hashed_password")
+
+
+@pytest.mark.asyncio
+async def test_when_get_cached_by_id_the_snapshot_must_be_immutable(
+    db: AsyncSession,
+) -> None:
+    new_user = await crud.user.create(db=db, user_in=random_user_dict())
+    result = await crud.user.get_cached_by_id(db=db, id=new_user.id)
+    with pytest.raises(TypeError):
+        result.full_name = "changed"
+
+
+@pytest.mark.asyncio
+async def test_when_get_cached_by_id_twice_must_fetch_the_user_once(
+    db: AsyncSession,
+) -> None:
+    new_user = await crud.user.create(db=db, user_in=random_user_dict())
+    with mock.patch.object(
+        crud.user, "get_by_id", wraps=crud.user.get_by_id
+    ) as mocked_get_by_id:
+        await crud.user.get_cached_by_id(db=db, id=new_user.id)
+        await crud.user.get_cached_by_id(db=db, id=new_user.id)
+    assert mocked_get_by_id.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_when_user_is_cached_by_id_it_must_be_cached_by_cpf_and_email(
+    db: AsyncSession,
+) -> None:
+    new_user = await crud.user.create(db=db, user_in=random_user_dict())
+    await crud.user.get_cached_by_id(db=db, id=new_user.id)
+    with mock.patch.object(crud.user, "get_by_cpf") as mocked_get_by_cpf:
+        by_cpf = await crud.user.get_cached_by_cpf(db=db, cpf=new_user.cpf)
+    with mock.patch.object(crud.user, "get_by_email") as mocked_get_by_email:
+        by_email = await crud.user.get_cached_by_email(
+            db=db, email=new_user.email
+        )
+    mocked_get_by_cpf.assert_not_called()
+    mocked_get_by_email.assert_not_called()
+    assert by_cpf.id == by_email.id == new_user.id
+
+
+@pytest.mark.asyncio
+async def test_when_user_is_updated_the_cache_must_be_invalidated(
+    db: AsyncSession,
+) -> None:
+    new_user = await crud.user.create(db=db, user_in=random_user_dict())
+    old_cpf = new_user.cpf
+    await crud.user.get_cached_by_id(db=db, id=new_user.id)
+    new_cpf = random_user_dict()["cpf"]
+    await crud.user.update(db=db, db_user=new_user, user_in={"cpf": new_cpf})
+    result = await crud.user.get_cached_by_id(db=db, id=new_user.id)
+    assert result.cpf == new_cpf
+    assert await crud.user.get_cached_by_cpf(db=db, cpf=old_cpf) is None
+
+
+@pytest.mark.asyncio
+async def test_when_user_is_deleted_the_cache_must_be_invalidated(
+    db: AsyncSession,
+) -> None:
+    new_user = await crud.user.create(db=db, user_in=random_user_dict())
+    await crud.user.get_cached_by_id(db=db, id=new_user.id)
+    await crud.user.delete_by_id(db=db, id=new_user.id)
+    assert await crud.user.get_cached_by_id(db=db, id=new_user.id) is None
+
+
+@pytest.mark.asyncio
+async def test_when_user_is_invalidated_by_other_worker_it_must_leave_the_cache(
+    db: AsyncSession,
+) -> None:
+    new_user = await crud.user.create(db=db, user_in=random_user_dict())
+    await crud.user.get_cached_by_id(db=db, id=new_user.id)
+    # the keys arrive as JSON lists from the invalidation bus
+    crud.user.invalidate_cache([["id", new_user.id]])
+    assert crud.user.cache.get(("id", new_user.id)) is None
+
+
+@pytest.mark.asyncio
+async def test_when_user_is_invalidated_during_its_fetch_it_must_not_be_cached(
+    db: AsyncSession,
+) -> None:
+    new_user = await crud.user.create(db=db, user_in=random_user_dict())
+    get_by_id = crud.user.get_by_id
+
+    async def get_by_id_then_delete(db, id):
+        user = await get_by_id(db=db, id=id)
+        # a delete commits and invalidates the user before the fetch ends
+        crud.user.invalidate_cache(crud.user._cache_keys(user))
+        return user
+
+    with mock.patch.object(
+        crud.user, "get_by_id", side_effect=get_by_id_then_delete
+    ):
+        await crud.user.get_cached_by_id(db=db, id=new_user.id)
+    assert crud.user.cache.get(("id", new_user.id)) is None
+    assert crud.user.cache.get(("cpf", new_user.cpf)) is None
+
+
+@pytest.mark.asyncio
+async def test_when_user_cache_is_cleared_during_a_fetch_it_must_not_be_cached(
+    db: AsyncSession,
+) -> None:
+    new_user = await crud.user.create(db=db, user_in=random_user_dict())
+    get_by_id = crud.user.get_by_id
+
+    async def get_by_id_then_clear(db, id):
+        user = await get_by_id(db=db, id=id)
+        crud.user.clear_cache()
+        return user
+
+    with mock.patch.object(
+        crud.user, "get_by_id", side_effect=get_by_id_then_clear
+    ):
+        await crud.user.get_cached_by_id(db=db, id=new_user.id)
+    assert crud.user.cache.get(("id", new_user.id)) is None
+
+
+@pytest.mark.asyncio
+async def test_when_get_cached_by_email_in_another_case_must_return_the_cached_user(
+    db: AsyncSession,
+) -> None:
+    new_user = await crud.user.create(db=db, user_in=random_user_dict())
+    await crud.user.get_cached_by_id(db=db, id=new_user.id)
+    with mock.patch.object(crud.user, "get_by_email") as mocked_get_by_email:
+        result = await crud.user.get_cached_by_email(
+            db=db, email=new_user.email.upper()
+        )
+    mocked_get_by_email.assert_not_called()
+    assert result.id == new_user.id
+
+
+@pytest.mark.asyncio
+async def test_when_get_by_email_in_another_case_must_return_the_user(
+    db: AsyncSession,
+) -> None:
+    new_user = await crud.user.create(db=db, user_in=random_user_dict())
+    result = await crud.user.get_by_email(db=db, email=new_user.email.upper())
+    assert result.id == new_user.id
+
+
+# endregion
+
+
+@pytest.mark.asyncio
+async def test_when_getting_authenticated_user_an_outdated_hash_must_be_rehashed(
+    db: AsyncSession,
+) -> None:
+    user_dict = random_user_dict()
+    new_user = await crud.user.create(db=db, user_in=user_dict)
+    outdated_hash = build_pwd_context(bcrypt_rounds=4).hash(
+        user_dict["password"]
+    )
+    await crud.user.update_password_hash(
+        db=db,
+        id=new_user.id,
+        old_hash=new_user.hashed_password,
+        new_hash=outdated_hash,
+    )
+    await crud.user.get_authenticated_user(
+        db=db,
+        user_email=user_dict["email"],
+        user_password=user_dict["password"],
+    )
+    credentials = await crud.user.get_credentials_by_email(
+        db=db, email=user_dict["email"]
+    )
+    assert credentials.hashed_password != outdated_hash
+    assert not pwd_context.needs_update(credentials.hashed_password)
+    assert verify_password(user_dict["password"], credentials.hashed_password)
+
+
+@pytest.mark.asyncio
+async def test_when_getting_authenticated_user_an_up_to_date_hash_must_not_be_rehashed(
+    db: AsyncSession,
+) -> None:
+    user_dict = random_user_dict()
+    await crud.user.create(db=db, user_in=user_dict)
+    with mock.patch.object(
+        crud.user, "update_password_hash"
+    ) as mocked_update_password_hash:
+        await crud.user.get_authenticated_user(
+            db=db,
+            user_email=user_dict["email"],
+            user_password=user_dict["password"],
+        )
+    mocked_update_password_hash.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_when_update_password_hash_if_the_hash_changed_it_must_not_be_updated(
+    db: AsyncSession,
+) -> None:
+    user_dict = random_user_dict()
+    new_user = await crud.user.create(db=db, user_in=user_dict)
+    await crud.user.update_password_hash(
+        db=db, id=new_user.id, old_hash="changed", new_hash="new_hash"
+    )
+    credentials = await crud.user.get_credentials_by_email(
+        db=db, email=user_dict["email"]
+    )
+    assert credentials.hashed_password == new_user.hashed_password
+
+
+@pytest.mark.asyncio
+async def test_when_get_taken_emails_and_cpfs_must_return_only_the_taken_ones(
+    db: AsyncSession,
+) -> None:
+    user_dict = random_user_dict()
+    await crud.user.create(db=db, user_in=user_dict)
+    new_user_dict = random_user_dict()
+    emails, cpfs = await crud.user.get_taken_emails_and_cpfs(
+        db=db,
+        emails=[user_dict["email"].upper(), new_user_dict["email"]],
+        cpfs=[user_dict["cpf"], new_user_dict["cpf"]],
+    )
+    assert emails == {user_dict["email"].lower()}
+    assert cpfs == {user_dict["cpf"]}
+
+
+@pytest.mark.asyncio
+async def test_when_create_many_must_return_the_ids_in_order(
+    db: AsyncSession,
+) -> None:
+    users_data = []
+    for _ in range(3):
+        user_dict = random_user_dict()
+        user_dict["hashed_password"] = user_dict.pop("password")
+        users_data.append(user_dict)
+    ids = await crud.user.create_many(db=db, users_data=users_data)
+    for user_data, id in zip(users_data, ids):
+        db_user = await crud.user.get_by_id(db=db, id=id)
+        assert db_user.email == user_data["email"]
+
+
+@pytest.mark.asyncio
+async def test_when_create_many_if_an_user_already_exists_must_raise_already_exists_error() -> (
+    None
+):
+    # own session, as the error rolls it back
+    async with async_session() as db:
+        user_dict = random_user_dict()
+        await crud.user.create(db=db, user_in=user_dict)
+        new_user_dict = {**random_user_dict(), "cpf": user_dict["cpf"]}
+        new_user_dict["hashed_password"] = new_user_dict.pop("password")
+        with pytest.raises(UserAlreadyExistsError) as exc_info:
+            await crud.user.create_many(db=db, users_data=[new_user_dict])
+    assert exc_info.value.field == "cpf"
+
+
+@pytest.mark.parametrize("field", ["email", "cpf"])
+@pytest.mark.asyncio
+async def test_when_create_user_if_field_already_exists_must_raise_already_exists_error(
+    field: str,
+) -> None:
+    # own session, as the error rolls it back
+    async with async_session() as db:
+        user_dict = random_user_dict()
+        await crud.user.create(db=db, user_in=user_dict)
+        new_user_dict = {**random_user_dict(), field: user_dict[field]}
+        with pytest.raises(UserAlreadyExistsError) as exc_info:
+            await crud.user.create(db=db, user_in=new_user_dict)
+    assert exc_info.value.field == field
+
+
+@pytest.mark.asyncio
+async def test_when_create_user_if_email_exists_in_another_case_must_raise_already_exists_error() -> (
+    None
+):
+    # own session, as the error rolls it back
+    async with async_session() as db:
+        user_dict = random_user_dict()
+        await crud.user.create(db=db, user_in=user_dict)
+        new_user_dict = {
+            **random_user_dict(),
+            "email": user_dict["email"].upper(),
+        }
+        with pytest.raises(UserAlreadyExistsError) as exc_info:
+            await crud.user.create(db=db, user_in=new_user_dict)
+    assert exc_info.value.field == "email"
@@ -0,0 +1,57 @@
+from sqlalchemy.exc import IntegrityError
+
+from app import models
+from app.database.errors import is_index_violation, is_unique_violation
+
+
+def integrity_error(message: str) -> IntegrityError:
+    return IntegrityError("INSERT ...", {}, Exception(message))
+
+
+def test_when_postgresql_reports_the_index_it_must_be_an_unique_violation():
+    exc = integrity_error(
+        'duplicate key value violates unique constraint "ix_purchase_code"'
+    )
+    assert is_unique_violation(exc, models.Purchase.__table__.c.code)
+
+
+def test_when_sqlite_reports_the_column_it_must_be_an_unique_violation():
+    exc = integrity_error("UNIQUE constraint failed: purchase.code")
+    assert is_unique_violation(exc, models.Purchase.__table__.c.code)
+
+
+def test_when_another_index_is_violated_it_must_not_be_an_unique_violation():
+    exc = integrity_error(
+        'duplicate key value violates unique constraint "ix_user_email"'
+    )
+    assert not is_unique_violation(exc, models.User.__table__.c.cpf)
+
+
+def test_when_postgresql_reports_the_primary_key_of_the_column_it_must_be_an_unique_violation():
+    exc = integrity_error(
+        'duplicate key value violates unique constraint "purchase_code_pkey"'
+    )
+    assert is_unique_violation(exc, models.PurchaseCode.__table__.c.code)
+
+
+def test_when_the_column_is_not_the_whole_primary_key_it_must_not_be_an_unique_violation():
+    exc = integrity_error(
+        'duplicate key value violates unique constraint '
+        '"user_cashback_balance_pkey"'
+    )
+    column = models.UserCashbackBalance.__table__.c.user_id
+    assert not is_unique_violation(exc, column)
+
+
+def test_when_postgresql_reports_the_index_name_it_must_be_an_index_violation():
+    exc = integrity_error(
+        'duplicate key value violates unique constraint "ix_user_email_lower"'
+    )
+    assert is_index_violation(exc, "ix_user_email_lower")
+
+
+def test_when_sqlite_reports_the_index_name_it_must_be_an_index_violation():
+    exc = integrity_error(
+        "UNIQUE constraint failed: index 'ix_user_email_lower'"
+    )
+    assert is_index_violation(exc, "ix_user_email_lower")
@@ -0,0 +1,54 @@
+from datetime import date
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.partitioning import (
+    PurchasePartitionMaintainer,
+    create_default_partition_statement,
+    create_partition_statements,
+    ensure_purchase_partitions,
+    partition_name,
+)
+
+
+def test_partition_name_must_be_the_table_and_the_month():
+    assert partition_name(date(2026, 3, 1)) == "purchase_p2026_03"
+
+
+def test_when_creating_the_partition_of_a_month_it_must_range_over_the_month():
+    statements = create_partition_statements(date(2026, 12, 1))
+    assert statements[-1] == (
+        "ALTER TABLE purchase ATTACH PARTITION purchase_p2026_12 "
+        "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+    )
+
+
+def test_when_creating_a_partition_the_rows_of_the_default_partition_must_be_moved():
+    statements = create_partition_statements(date(2026, 3, 1))
+    moves = [s for s in statements if "DELETE FROM purchase_default" in s]
+    assert len(moves) == 1
+    assert "date >= '2026-03-01' AND date < '2026-04-01'" in moves[0]
+    assert "INSERT INTO purchase_p2026_03" in moves[0]
+
+
+def test_when_creating_the_default_partition_it_must_be_the_default_of_purchase():
+    assert create_default_partition_statement() == (
+        "CREATE TABLE purchase_default PARTITION OF purchase DEFAULT"
+    )
+
+
+@pytest.mark.asyncio
+async def test_when_database_is_not_postgresql_ensure_partitions_must_do_nothing(
+    db: AsyncSession,
+) -> None:
+    assert await ensure_purchase_partitions(db, months_ahead=3) == []
+
+
+@pytest.mark.asyncio
+async def test_when_database_is_not_postgresql_maintainer_must_not_start(
+    db: AsyncSession,
+) -> None:
+    maintainer = PurchasePartitionMaintainer(months_ahead=3, check_interval=60)
+    await maintainer.start(db)
+    assert maintainer.stats() == {"running": False, "checks": 0, "created": 0}
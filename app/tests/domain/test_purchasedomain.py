@@ -35,36 +35,36 @@ def test_calculate_cashback_with_value_upper_then_15000_must_return_15_percent()
 
 
 @pytest.mark.asyncio
-@mock.patch.object(crud.user, "get_by_id")
-@mock.patch.object(crud.purchase_status, "get_by_name")
+@mock.patch.object(crud.user, "get_cached_by_id")
+@mock.patch.object(crud.purchase_status_registry, "resolve_id")
 async def test_get_default_purchase_status_id_when_cpf_is_15350946056_must_return_the_id_of_approved_purchase_status(
-    mocked_purchase_status_get_by_name, mocked_user_get_by_id
+    mocked_purchase_status_resolve_id, mocked_user_get_cached_by_id
 ):
-    # Mocking the cpf returned by crud.user.get_by_id
-    mocked_user_get_by_id.return_value.cpf = "15350946056"
+    # Mocking the cpf returned by crud.user.get_cached_by_id
+    mocked_user_get_cached_by_id.return_value.cpf = "15350946056"
     arg_mock = mock.Mock()
     await domain.purchase.get_default_purchase_status_id(
         db=arg_mock, purchase_user_id=arg_mock
     )
     # asserting if the method was called with "Approved"
-    mocked_purchase_status_get_by_name.assert_awaited_with(
+    mocked_purchase_status_resolve_id.assert_awaited_with(
         db=arg_mock, name=schemas.statusEnum.APPROVED
     )
 
 
 @pytest.mark.asyncio
-@mock.patch.object(crud.user, "get_by_id")
-@mock.patch.object(crud.purchase_status, "get_by_name")
+@mock.patch.object(crud.user, "get_cached_by_id")
+@mock.patch.object(crud.purchase_status_registry, "resolve_id")
 async def test_get_default_purchase_status_id_when_cpf_is_not_15350946056_must_return_the_id_of_in_validation_purchase_status(
-    mocked_purchase_status_get_by_name, mocked_user_get_by_id
+    mocked_purchase_status_resolve_id, mocked_user_get_cached_by_id
 ):
-    # Mocking the cpf returned by crud.user.get_by_id
-    mocked_user_get_by_id.return_value.cpf = "99999999999"
+    # Mocking the cpf returned by crud.user.get_cached_by_id
+    mocked_user_get_cached_by_id.return_value.cpf = "99999999999"
     arg_mock = mock.Mock()
     await domain.purchase.get_default_purchase_status_id(
         db=arg_mock, purchase_user_id=arg_mock
     )
     # asserting if the method was called with "In validation"
-    mocked_purchase_status_get_by_name.assert_awaited_with(
+    mocked_purchase_status_resolve_id.assert_awaited_with(
         db=arg_mock, name=schemas.statusEnum.IN_VALIDATION
     )
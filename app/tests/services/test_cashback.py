@@ -0,0 +1,130 @@
+import asyncio
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+
+from app.services.cashback import CashbackService, gather_or_cancel
+from app.services.external_cashback import (
+    ExternalCashback,
+    ExternalCashbackUnavailableError,
+)
+
+# region gather_or_cancel
+
+
+@pytest.mark.asyncio
+async def test_gather_or_cancel_must_return_the_results_in_order():
+    async def value(result: int, delay: float) -> int:
+        await asyncio.sleep(delay)
+        return result
+
+    results = await gather_or_cancel(value(1, 0.02), value(2, 0))
+    assert results == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_gather_or_cancel_must_run_the_awaitables_concurrently():
+    started = []
+    release = asyncio.Event()
+
+    async def wait(name: str) -> str:
+        started.append(name)
+        await release.wait()
+        return name
+
+    gathering = asyncio.create_task(gather_or_cancel(wait("a"), wait("b")))
+    await asyncio.sleep(0.01)
+    assert started == ["a", "b"]
+    release.set()
+    assert await gathering == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_gather_or_cancel_if_one_fail_the_others_must_be_cancelled():
+    never = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def hang() -> None:
+        try:
+            await never.wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def fail() -> None:
+        raise ValueError("fail")
+
+    with pytest.raises(ValueError):
+        await gather_or_cancel(hang(), fail())
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_gather_or_cancel_if_caller_is_cancelled_all_must_be_cancelled():
+    never = asyncio.Event()
+    cancelled = []
+
+    async def hang(name: str) -> None:
+        try:
+            await never.wait()
+        except asyncio.CancelledError:
+            cancelled.append(name)
+            raise
+
+    gathering = asyncio.create_task(gather_or_cancel(hang("a"), hang("b")))
+    await asyncio.sleep(0.01)
+    gathering.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await gathering
+    assert sorted(cancelled) == ["a", "b"]
+
+
+# endregion
+
+# region CashbackService
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_must_be_the_sum_of_internal_and_external_cashback():
+    external = mock.Mock()
+    external.get_cashback = mock.AsyncMock(
+        return_value=ExternalCashback(Decimal("2.5"), degraded=True)
+    )
+    service = CashbackService(external=external)
+    with mock.patch(
+        "app.crud.cashback_balance.get_by_user_id",
+        mock.AsyncMock(return_value=Decimal("1.5")),
+    ):
+        result = await service.get_cashback(
+            db=mock.Mock(), client=mock.Mock(), user_id=1, cpf="1"
+        )
+    assert result.cashback == Decimal(4)
+    assert result.degraded
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_if_external_fail_the_db_aggregate_must_be_cancelled():
+    cancelled = asyncio.Event()
+
+    async def slow_sum(*args, **kwargs) -> Decimal:
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    external = mock.Mock()
+    external.get_cashback = mock.AsyncMock(
+        side_effect=ExternalCashbackUnavailableError()
+    )
+    service = CashbackService(external=external)
+    with mock.patch("app.crud.cashback_balance.get_by_user_id", slow_sum):
+        with pytest.raises(ExternalCashbackUnavailableError):
+            await service.get_cashback(
+                db=mock.Mock(), client=mock.Mock(), user_id=1, cpf="1"
+            )
+    assert cancelled.is_set()
+
+
+# endregion
@@ -0,0 +1,277 @@
+import asyncio
+from decimal import Decimal
+from unittest import mock
+
+import pytest
+from httpx import ConnectError, Response
+
+from app.core.cache import TTLCache
+from app.core.resilience import OPEN, Bulkhead, CircuitBreaker
+from app.services.external_cashback import (
+    ExternalCashbackClient,
+    ExternalCashbackUnavailableError,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def external_cashback(clock: FakeClock) -> ExternalCashbackClient:
+    cache = TTLCache(ttl=10, stale_ttl=10, max_entries=10, clock=clock)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    bulkhead = Bulkhead(max_concurrent_calls=2)
+    return ExternalCashbackClient(
+        url="http://test", cache=cache, breaker=breaker, bulkhead=bulkhead
+    )
+
+
+def mocked_client(cashback: float = 10.5, status_code: int = 200):
+    client = mock.AsyncMock()
+    client.get.return_value = Response(
+        status_code=status_code, json={"cashback": cashback}
+    )
+    return client
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_must_return_the_external_cashback_as_decimal(
+    external_cashback: ExternalCashbackClient,
+):
+    client = mocked_client(cashback=10.5)
+    result = await external_cashback.get_cashback(client=client, cpf="1")
+    assert result.cashback == Decimal("10.5")
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_if_value_is_fresh_must_not_call_the_external_service(
+    external_cashback: ExternalCashbackClient,
+):
+    client = mocked_client()
+    await external_cashback.get_cashback(client=client, cpf="1")
+    await external_cashback.get_cashback(client=client, cpf="1")
+    assert client.get.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_if_value_is_stale_must_return_it_and_refresh_in_background(
+    external_cashback: ExternalCashbackClient, clock: FakeClock
+):
+    await external_cashback.get_cashback(
+        client=mocked_client(cashback=1), cpf="1"
+    )
+    clock.now = 15
+    client = mocked_client(cashback=2)
+    result = await external_cashback.get_cashback(client=client, cpf="1")
+    await asyncio.gather(*external_cashback._background_tasks)
+    assert result.cashback == Decimal(1)
+    assert external_cashback.cache.get("1") == Decimal(2)
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_if_value_is_stale_only_one_refresh_must_run(
+    external_cashback: ExternalCashbackClient, clock: FakeClock
+):
+    await external_cashback.get_cashback(client=mocked_client(), cpf="1")
+    clock.now = 15
+    client = mocked_client()
+    await asyncio.gather(
+        *(
+            external_cashback.get_cashback(client=client, cpf="1")
+            for _ in range(5)
+        )
+    )
+    await asyncio.gather(*external_cashback._background_tasks)
+    assert client.get.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_if_value_is_expired_must_wait_for_the_external_service(
+    external_cashback: ExternalCashbackClient, clock: FakeClock
+):
+    await external_cashback.get_cashback(
+        client=mocked_client(cashback=1), cpf="1"
+    )
+    clock.now = 25
+    result = await external_cashback.get_cashback(
+        client=mocked_client(cashback=2), cpf="1"
+    )
+    assert result.cashback == Decimal(2)
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_if_external_service_fail_must_raise_unavailable_error(
+    external_cashback: ExternalCashbackClient,
+):
+    client = mocked_client(status_code=500)
+    with pytest.raises(ExternalCashbackUnavailableError):
+        await external_cashback.get_cashback(client=client, cpf="1")
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_if_external_service_is_unreachable_must_raise_unavailable_error(
+    external_cashback: ExternalCashbackClient,
+):
+    client = mock.AsyncMock()
+    client.get.side_effect = ConnectError("unreachable")
+    with pytest.raises(ExternalCashbackUnavailableError):
+        await external_cashback.get_cashback(client=client, cpf="1")
+
+
+def test_external_cashback_stats_must_expose_cache_and_refresh_counters(
+    external_cashback: ExternalCashbackClient,
+):
+    stats = external_cashback.stats()
+    assert {"hits", "misses", "refreshes"} <= stats.keys()
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_if_called_concurrently_for_the_same_cpf_must_do_one_request(
+    external_cashback: ExternalCashbackClient,
+):
+    client = mocked_client(cashback=3)
+    results = await asyncio.gather(
+        *(
+            external_cashback.get_cashback(client=client, cpf="1")
+            for _ in range(5)
+        )
+    )
+    assert client.get.await_count == 1
+    assert [result.cashback for result in results] == [Decimal(3)] * 5
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_if_called_concurrently_for_different_cpfs_must_do_one_request_per_cpf(
+    external_cashback: ExternalCashbackClient,
+):
+    client = mocked_client()
+    await asyncio.gather(
+        external_cashback.get_cashback(client=client, cpf="1"),
+        external_cashback.get_cashback(client=client, cpf="2"),
+    )
+    assert client.get.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_if_the_shared_request_fail_all_callers_must_get_the_error(
+    external_cashback: ExternalCashbackClient,
+):
+    client = mocked_client(status_code=500)
+    results = await asyncio.gather(
+        *(
+            external_cashback.get_cashback(client=client, cpf="1")
+            for _ in range(3)
+        ),
+        return_exceptions=True,
+    )
+    assert client.get.await_count == 1
+    assert all(
+        isinstance(result, ExternalCashbackUnavailableError)
+        for result in results
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_if_a_caller_is_cancelled_the_others_must_get_the_result(
+    external_cashback: ExternalCashbackClient,
+):
+    release = asyncio.Event()
+
+    async def slow_get(*args, **kwargs):
+        await release.wait()
+        return Response(status_code=200, json={"cashback": 7})
+
+    client = mock.AsyncMock()
+    client.get.side_effect = slow_get
+    cancelled = asyncio.create_task(
+        external_cashback.get_cashback(client=client, cpf="1")
+    )
+    waiting = asyncio.create_task(
+        external_cashback.get_cashback(client=client, cpf="1")
+    )
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    release.set()
+    assert (await waiting).cashback == Decimal(7)
+
+
+# region circuit breaker, bulkhead and last known value
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_if_external_service_keeps_failing_must_open_the_circuit(
+    external_cashback: ExternalCashbackClient,
+):
+    client = mocked_client(status_code=500)
+    for cpf in ("1", "2", "3"):
+        with pytest.raises(ExternalCashbackUnavailableError):
+            await external_cashback.get_cashback(client=client, cpf=cpf)
+    assert external_cashback.breaker.state == OPEN
+    assert client.get.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_if_bulkhead_is_full_must_raise_unavailable_error(
+    external_cashback: ExternalCashbackClient,
+):
+    release = asyncio.Event()
+
+    async def slow_get(*args, **kwargs):
+        await release.wait()
+        return Response(status_code=200, json={"cashback": 1})
+
+    client = mock.AsyncMock()
+    client.get.side_effect = slow_get
+    busy = [
+        asyncio.create_task(
+            external_cashback.get_cashback(client=client, cpf=cpf)
+        )
+        for cpf in ("1", "2")
+    ]
+    await asyncio.sleep(0)
+    with pytest.raises(ExternalCashbackUnavailableError):
+        await external_cashback.get_cashback(client=client, cpf="3")
+    release.set()
+    await asyncio.gather(*busy)
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_if_value_is_expired_and_service_fail_must_return_last_known_as_degraded(
+    external_cashback: ExternalCashbackClient, clock: FakeClock
+):
+    await external_cashback.get_cashback(
+        client=mocked_client(cashback=1), cpf="1"
+    )
+    clock.now = 25
+    result = await external_cashback.get_cashback(
+        client=mocked_client(status_code=500), cpf="1"
+    )
+    assert result.cashback == Decimal(1)
+    assert result.degraded
+    assert external_cashback.stats()["degraded_responses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_cashback_if_serve_last_known_is_disabled_must_raise_unavailable_error(
+    external_cashback: ExternalCashbackClient, clock: FakeClock
+):
+    external_cashback.serve_last_known = False
+    await external_cashback.get_cashback(client=mocked_client(), cpf="1")
+    clock.now = 25
+    with pytest.raises(ExternalCashbackUnavailableError):
+        await external_cashback.get_cashback(
+            client=mocked_client(status_code=500), cpf="1"
+        )
+
+
+# endregion
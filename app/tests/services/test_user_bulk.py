@@ -0,0 +1,74 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app import crud
+from app.crud.crud_user import UserAlreadyExistsError
+from app.services.user_bulk import UserBulkBusyError, UserBulkService
+
+
+@pytest.mark.asyncio
+async def test_when_a_bulk_registration_is_running_another_one_must_wait_for_it():
+    service = UserBulkService(chunk_size=10, queue_timeout=1)
+    order = []
+
+    async def register(db, users):
+        order.append(("start", users))
+        await asyncio.sleep(0.01)
+        order.append(("end", users))
+
+    with mock.patch.object(service, "_register", side_effect=register):
+        await asyncio.gather(
+            service.register(db=None, users=["a"]),
+            service.register(db=None, users=["b"]),
+        )
+    assert order == [
+        ("start", ["a"]),
+        ("end", ["a"]),
+        ("start", ["b"]),
+        ("end", ["b"]),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_when_a_bulk_registration_is_running_after_the_timeout_must_raise_busy_error():
+    service = UserBulkService(chunk_size=10, queue_timeout=0.01)
+    release = asyncio.Event()
+
+    async def register(db, users):
+        await release.wait()
+
+    with mock.patch.object(service, "_register", side_effect=register):
+        running = asyncio.create_task(service.register(db=None, users=[]))
+        await asyncio.sleep(0)
+        with pytest.raises(UserBulkBusyError):
+            await service.register(db=None, users=[])
+        release.set()
+        await running
+
+
+@pytest.mark.asyncio
+async def test_when_a_bulk_chunk_has_an_user_registered_meanwhile_it_must_have_its_field_error():
+    service = UserBulkService(chunk_size=10)
+
+    async def create_many(db, users_data):
+        if len(users_data) > 1 or users_data[0]["cpf"] == "taken":
+            raise UserAlreadyExistsError("cpf")
+        return [1]
+
+    with mock.patch.object(crud.user, "create_many", side_effect=create_many):
+        inserted = await service._insert(
+            None, [{"cpf": "free"}, {"cpf": "taken"}]
+        )
+    assert inserted == [1, "Already exists an user with this cpf."]
+
+
+@pytest.mark.asyncio
+async def test_when_a_bulk_chunk_fails_for_another_reason_the_error_must_be_raised():
+    service = UserBulkService(chunk_size=10)
+    error = IntegrityError("INSERT ...", {}, Exception("NOT NULL failed"))
+    with mock.patch.object(crud.user, "create_many", side_effect=error):
+        with pytest.raises(IntegrityError):
+            await service._insert(None, [{"cpf": "free"}])
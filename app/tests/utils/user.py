@@ -1,6 +1,9 @@
 from typing import Dict
 
 from faker import Faker
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, models
 
 fake = Faker("pt_BR")
 
@@ -13,3 +16,8 @@ def random_user_dict() -> Dict[str, str]:
         "password": fake.password(length=12),
     }
     return user_dict
+
+
+async def create_random_user_in_db(db: AsyncSession) -> models.User:
+    new_user = await crud.user.create(db=db, user_in=random_user_dict())
+    return new_user
@@ -0,0 +1,105 @@
+"""
+Benchmark of the cost to sign and verify an access token with each JWT
+algorithm supported by the key ring.
+
+It also measures RS256 passing the PEM on every call (what a per call
+key parsing costs) against the key objects the key ring caches.
+
+Usage:
+    python -m benchmarks.bench_jwt_algorithms [--calls 2000]
+"""
+
+import argparse
+import time
+from typing import Any, Callable
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from app.core.keyring import JWTKey
+
+PAYLOAD = {"sub": "1", "cpf": "12345678901", "exp": 4102444800}
+
+
+def private_pem(private_key: Any) -> str:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+def measure(call: Callable[[], Any], calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        call()
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+
+def main(calls: int) -> None:
+    keys = {
+        "HS256": JWTKey.from_config(
+            {"kid": "hs", "alg": "HS256", "key": "x" * 32}
+        ),
+        "RS256": JWTKey.from_config(
+            {
+                "kid": "rs",
+                "alg": "RS256",
+                "key": private_pem(rsa.generate_private_key(65537, 2048)),
+            }
+        ),
+        "ES256": JWTKey.from_config(
+            {
+                "kid": "es",
+                "alg": "ES256",
+                "key": private_pem(ec.generate_private_key(ec.SECP256R1())),
+            }
+        ),
+        "EdDSA": JWTKey.from_config(
+            {
+                "kid": "ed",
+                "alg": "EdDSA",
+                "key": private_pem(ed25519.Ed25519PrivateKey.generate()),
+            }
+        ),
+    }
+
+    print(f"{calls} calls each")
+    print(f"{'algorithm':<24}{'sign (us)':>12}{'verify (us)':>14}")
+    for algorithm, key in keys.items():
+        token = jwt.encode(PAYLOAD, key.signing_key, algorithm=algorithm)
+        sign_us = measure(
+            lambda: jwt.encode(PAYLOAD, key.signing_key, algorithm=algorithm),
+            calls,
+        )
+        verify_us = measure(
+            lambda: jwt.decode(
+                token, key.verifying_key, algorithms=[algorithm]
+            ),
+            calls,
+        )
+        print(f"{algorithm:<24}{sign_us:>12.1f}{verify_us:>14.1f}")
+
+    # what it would cost without the parsed key objects
+    rs_key = keys["RS256"]
+    pem = private_pem(rs_key.signing_key)
+    public = rs_key.verifying_key.public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).decode()
+    token = jwt.encode(PAYLOAD, pem, algorithm="RS256")
+    sign_us = measure(
+        lambda: jwt.encode(PAYLOAD, pem, algorithm="RS256"), calls
+    )
+    verify_us = measure(
+        lambda: jwt.decode(token, public, algorithms=["RS256"]), calls
+    )
+    print(f"{'RS256 (PEM per call)':<24}{sign_us:>12.1f}{verify_us:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.calls)
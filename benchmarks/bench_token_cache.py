@@ -0,0 +1,65 @@
+"""
+Benchmark of the auth overhead of an authenticated request with and
+without the verified token cache.
+
+It does the token part of deps.get_token_payload with a reused bearer
+token, the way a client does across its requests: deps.decode_token and
+the verified_token_cache lookup, and compares the mean time per call when
+the token is verified every time and when its payload is cached.
+
+deps.get_token_payload itself is a coroutine that also checks the
+revocation list (which is loaded from the database), so it isn't called
+here: the revocation check is the same with and without the cache.
+
+Usage:
+    python -m benchmarks.bench_token_cache [--calls 100000]
+"""
+
+import argparse
+import time
+from typing import Callable
+
+from app.api import deps
+from app.core.security import create_jwt_token, verified_token_cache
+
+
+def measure(call: Callable[[], object], calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        call()
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+
+def main(calls: int) -> None:
+    token = create_jwt_token(subject=1)
+
+    def get_payload() -> object:
+        # what deps.get_token_payload does before the revocation check
+        payload = verified_token_cache.get(token)
+        if payload is None:
+            payload = deps.decode_token(token)
+            verified_token_cache.set(token, payload)
+        return payload
+
+    def uncached() -> object:
+        verified_token_cache.clear()
+        return get_payload()
+
+    # the clear() done by the uncached call is measured alone, so it can
+    # be discounted from the uncached time.
+    clear_us = measure(verified_token_cache.clear, calls)
+    uncached_us = measure(uncached, calls) - clear_us
+    cached_us = measure(get_payload, calls)
+
+    print(f"{calls} calls with the same token each")
+    print(f"{'strategy':<20}{'mean (us)':>12}")
+    print(f"{'verify every call':<20}{uncached_us:>12.2f}")
+    print(f"{'cached payload':<20}{cached_us:>12.2f}")
+    print(f"speedup: {uncached_us / cached_us:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=100_000)
+    args = parser.parse_args()
+    main(args.calls)
@@ -0,0 +1,129 @@
+"""
+Benchmark of the user loading strategies for a reseller with a big
+purchase history.
+
+It creates a temporary SQLite database with one user and 50k purchases and
+compares the time and memory spent by crud.user.get_by_id with the
+default strategy (relationships not loaded), opting in the purchases and
+the old behaviour (purchases joined on every query).
+
+Usage:
+    python -m benchmarks.bench_user_loading [--purchases 50000]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import joinedload, sessionmaker
+
+from app import crud, models
+from app.database.base import Base
+
+ITERATIONS = 20
+
+
+async def populate(db: AsyncSession, purchases: int) -> int:
+    now = datetime.utcnow()
+    status = models.PurchaseStatus(name="In validation", time_created=now)
+    user = models.User(
+        full_name="Benchmark Reseller",
+        email="benchmark@test.com",
+        cpf="00000000000",
+        hashed_password="not-a-real-hash",
+    )
+    db.add_all([status, user])
+    await db.commit()
+    rows = [
+        {
+            "code": f"bench-{i}",
+            "value": Decimal("100.00"),
+            "date": date(2022, 1, 1),
+            "cashback_value": Decimal("10.00"),
+            "status_id": status.id,
+            "user_id": user.id,
+            "time_created": now,
+            "time_updated": now,
+        }
+        for i in range(purchases)
+    ]
+    await db.execute(insert(models.Purchase), rows)
+    await db.commit()
+    return user.id
+
+
+async def measure(
+    session_factory: Callable[[], AsyncSession],
+    load: Callable[[AsyncSession], Awaitable[Any]],
+) -> Tuple[float, float]:
+    durations = []
+    peak_memory = 0
+    for _ in range(ITERATIONS):
+        # a new session per iteration, like a new request
+        async with session_factory() as db:
+            tracemalloc.start()
+            started = time.perf_counter()
+            await load(db)
+            durations.append(time.perf_counter() - started)
+            peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    return sum(durations) / len(durations) * 1000, peak_memory / 1024 / 1024
+
+
+async def main(purchases: int) -> None:
+    db_dir = tempfile.mkdtemp()
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{os.path.join(db_dir, 'bench.db')}"
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(
+        engine, expire_on_commit=False, future=True, class_=AsyncSession
+    )
+    async with session_factory() as db:
+        user_id = await populate(db, purchases)
+
+    async def default_strategy(db: AsyncSession) -> Any:
+        return await crud.user.get_by_id(db=db, id=user_id)
+
+    async def opt_in_purchases(db: AsyncSession) -> Any:
+        return await crud.user.get_by_id(
+            db=db, id=user_id, load_purchases=True
+        )
+
+    async def legacy_joined(db: AsyncSession) -> Any:
+        # what every authenticated request did when purchases_ was
+        # declared with lazy="joined"
+        result = await db.execute(
+            select(models.User)
+            .where(models.User.id == user_id)
+            .options(joinedload(models.User.purchases_))
+        )
+        return result.unique().scalar()
+
+    print(f"user with {purchases} purchases, {ITERATIONS} iterations each")
+    print(f"{'strategy':<30}{'mean (ms)':>12}{'peak (MiB)':>14}")
+    for name, load in (
+        ("default (no relationships)", default_strategy),
+        ("opt-in selectinload", opt_in_purchases),
+        ("legacy lazy=joined", legacy_joined),
+    ):
+        mean_ms, peak_mib = await measure(session_factory, load)
+        print(f"{name:<30}{mean_ms:>12.2f}{peak_mib:>14.2f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--purchases", type=int, default=50_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.purchases))
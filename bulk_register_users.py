@@ -0,0 +1,60 @@
+import argparse
+import asyncio
+import logging
+import sys
+import time
+
+from app import schemas, services
+from app.core.security import bulk_password_hash_pool
+from app.database.session import async_session
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Register the users of a JSON array or NDJSON file (one user "
+            "per line). The errors are printed, one per line."
+        )
+    )
+    parser.add_argument("file", help='path of the file, or "-" for stdin')
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="the file is NDJSON (default for .ndjson and .jsonl files)",
+    )
+    return parser.parse_args()
+
+
+async def register(content: bytes, ndjson: bool) -> schemas.UserBulkResult:
+    users = services.user_bulk.parse(content, ndjson=ndjson)
+    async with async_session() as db:
+        return await services.user_bulk.register(db=db, users=users)
+
+
+def main() -> None:
+    args = parse_args()
+    if args.file == "-":
+        content = sys.stdin.buffer.read()
+    else:
+        with open(args.file, "rb") as file:
+            content = file.read()
+    ndjson = args.ndjson or args.file.endswith((".ndjson", ".jsonl"))
+    start = time.perf_counter()
+    try:
+        result = asyncio.run(register(content, ndjson))
+    finally:
+        bulk_password_hash_pool.shutdown()
+    for row in result.results:
+        if row.error:
+            print(f"{row.index}: {row.error}")
+    logger.info(
+        f"{result.created} users created and {result.failed} failed in "
+        f"{time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
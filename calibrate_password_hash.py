@@ -0,0 +1,76 @@
+import argparse
+import logging
+
+from app.core.password_calibration import (
+    calibrate_argon2,
+    calibrate_bcrypt,
+    measure_hash_time,
+)
+from app.core.security import build_pwd_context
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Measure the password hash time on this machine and print the "
+            "settings whose hash meets the target time."
+        )
+    )
+    parser.add_argument(
+        "--scheme", choices=("bcrypt", "argon2"), default="bcrypt"
+    )
+    parser.add_argument(
+        "--target-ms",
+        type=float,
+        default=100.0,
+        help="max time of a hash, in milliseconds (default: 100)",
+    )
+    parser.add_argument(
+        "--argon2-memory-cost",
+        type=int,
+        default=65536,
+        help="argon2 memory, in KiB (default: 65536)",
+    )
+    parser.add_argument(
+        "--argon2-parallelism",
+        type=int,
+        default=4,
+        help="argon2 lanes (default: 4)",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    scheme = args.scheme
+    target = args.target_ms / 1000
+    logger.info(f"Calibrating {scheme} for {args.target_ms:.0f}ms")
+    if scheme == "argon2":
+        calibrated = calibrate_argon2(
+            target,
+            memory_cost=args.argon2_memory_cost,
+            parallelism=args.argon2_parallelism,
+        )
+        context = build_pwd_context(
+            "argon2",
+            argon2_time_cost=calibrated["PASSWORD_ARGON2_TIME_COST"],
+            argon2_memory_cost=calibrated["PASSWORD_ARGON2_MEMORY_COST"],
+            argon2_parallelism=calibrated["PASSWORD_ARGON2_PARALLELISM"],
+        )
+    else:
+        calibrated = calibrate_bcrypt(target)
+        context = build_pwd_context(
+            bcrypt_rounds=calibrated["PASSWORD_BCRYPT_ROUNDS"]
+        )
+    duration = measure_hash_time(context)
+    logger.info(f"A hash takes {duration * 1000:.0f}ms, the settings are:")
+    print(f'PASSWORD_HASH_SCHEME="{scheme}"')
+    for name, value in calibrated.items():
+        print(f"{name}={value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import argparse
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.database.partitioning import ensure_purchase_partitions
+from app.database.session import async_session
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Create the missing monthly partitions of the purchase table "
+            "(PostgreSQL only), e.g. from a scheduled job."
+        )
+    )
+    parser.add_argument(
+        "--months-ahead",
+        type=int,
+        default=settings.PURCHASE_PARTITION_MONTHS_AHEAD,
+        help="months after the current one to create (default: %(default)s)",
+    )
+    return parser.parse_args()
+
+
+async def create(months_ahead: int) -> None:
+    async with async_session() as db:
+        created = await ensure_purchase_partitions(
+            db, months_ahead=months_ahead
+        )
+    logger.info(f"Partitions created: {created or 'none'}")
+
+
+def main() -> None:
+    args = parse_args()
+    logger.info("Creating the purchase partitions")
+    asyncio.run(create(args.months_ahead))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import argparse
+import asyncio
+import logging
+from typing import Optional
+
+from app import crud
+from app.crud.cashback_rebuild import rebuild_by_user
+from app.database.session import async_session
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Rebuild the cashback balances and monthly rollups of the users "
+            "from their purchases (e.g. to reconcile a drift)."
+        )
+    )
+    parser.add_argument(
+        "--user-id",
+        type=int,
+        help="rebuild only this user (default: all users)",
+    )
+    return parser.parse_args()
+
+
+async def rebuild(user_id: Optional[int]) -> None:
+    async with async_session() as db:
+        # both aggregates of an user are rebuilt before the next one
+        await rebuild_by_user(
+            db,
+            crud.cashback_balance.rebuild_user,
+            crud.cashback_rollup.rebuild_user,
+            user_id=user_id,
+        )
+
+
+def main() -> None:
+    args = parse_args()
+    target = f"user {args.user_id}" if args.user_id else "all users"
+    logger.info(f"Rebuilding the cashback balances and rollups of {target}")
+    asyncio.run(rebuild(args.user_id))
+    logger.info("Cashback balances and rollups rebuilt")
+
+
+if __name__ == "__main__":
+    main()